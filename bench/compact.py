@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Memory and throughput benchmark of the Compact store against IOMemory.
+
+Each store is measured in a separate process:
+the memory is the increase of the resident set size
+while loading a generated graph; throughput is measured for the lookups
+that `PatchProcessor` makes, and for a patch touching a few resources.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+from argparse import ArgumentParser, SUPPRESS
+from json import dumps, loads
+from os.path import abspath, dirname
+from random import Random
+from subprocess import check_output
+from sys import executable, path
+from time import time
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import BNode, Graph, Literal, Namespace
+from rdflib.collection import Collection
+
+import ldpatch
+
+EX = Namespace("http://example.org/")
+
+PATCH = """
+@prefix ex: <http://example.org/> .
+Bind ?r ex:r%(r)s .
+Bind ?l ex:r%(r)s / ex:list .
+Delete { ?r ex:label "label %(r)s" } .
+Add { ?r ex:label "new label %(r)s" ; ex:knows ex:r0 } .
+UpdateList ?r ex:list 1..2 ( "x" "y" ) .
+"""
+
+def rss():
+    """The current resident set size, in bytes"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4096
+
+def populate(graph, resources):
+    """Add 4 triples and a list of 3 items per resource to `graph`"""
+    add = graph.add
+    for i in range(resources):
+        res = EX["r%s" % i]
+        add((res, EX.label, Literal("label %s" % i)))
+        add((res, EX.value, Literal(i)))
+        add((res, EX.knows, EX["r%s" % ((i * 7) % resources)]))
+        head = BNode()
+        add((res, EX.list, head))
+        Collection(graph, head, [ Literal(i + j) for j in range(3) ])
+
+def child(store, resources, lookups):
+    """Measure `store`, and return the results as a dict"""
+    before = rss()
+    start = time()
+    graph = Graph(store=store)
+    populate(graph, resources)
+    if hasattr(graph.store, "compact"):
+        graph.store.compact()
+    ret = {"load": time() - start, "memory": rss() - before,
+           "triples": len(graph)}
+
+    rand = Random(42)
+    keys = [ EX["r%s" % rand.randrange(resources)] for _ in range(lookups) ]
+    start = time()
+    for key in keys:
+        for _ in graph.triples((key, EX.knows, None)):
+            pass
+    ret["sp?"] = lookups / (time() - start)
+    start = time()
+    for key in keys:
+        for _ in graph.triples((None, EX.knows, key)):
+            pass
+    ret["?po"] = lookups / (time() - start)
+    start = time()
+    for key in keys:
+        graph.value(key, EX.label, any=False)
+    ret["value"] = lookups / (time() - start)
+    start = time()
+    patches = min(lookups, resources) // 10
+    for i in range(patches):
+        ldpatch.apply(PATCH % {"r": keys[i].rsplit("r", 1)[1]}, graph, EX[""])
+    ret["patch"] = patches / (time() - start)
+    return ret
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--resources", type=int, default=100000,
+                        help="number of resources (10 triples each)")
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--child", help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print dumps(child(args.child, args.resources, args.lookups))
+        return
+
+    print "%-10s %9s %10s %8s %10s %10s %10s %9s" % (
+        "store", "triples", "memory", "load", "(s,p,?)/s", "(?,p,o)/s",
+        "value/s", "patch/s")
+    for store in ("IOMemory", "Compact"):
+        res = loads(check_output([executable, abspath(__file__),
+                                  "--child", store,
+                                  "--resources", str(args.resources),
+                                  "--lookups", str(args.lookups)]))
+        print "%-10s %9d %8.1fMB %7.1fs %10.0f %10.0f %10.0f %9.0f" % (
+            store, res["triples"], res["memory"] / 1e6, res["load"],
+            res["sp?"], res["?po"], res["value"], res["patch"])
+
+if __name__ == "__main__":
+    main()
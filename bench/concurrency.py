@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Stress benchmark for ldpatch.concurrency.
+
+Many writer threads apply small patches, each one touching a random resource,
+to a shared graph. The same workload is run with a global lock
+(granularity "graph") and with finer granularities.
+
+As the processor is pure Python, threads can only run in parallel while
+the store does not hold the GIL (e.g. disk or network I/O);
+``--latency`` emulates such a store by sleeping on every store access.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from random import Random
+from sys import path
+from threading import Lock, Thread
+from time import sleep, time
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import Graph, Literal, Namespace
+
+from ldpatch.concurrency import ConcurrentPatcher
+
+EX = Namespace("http://example.org/")
+
+PATCH = """
+@prefix ex: <http://example.org/> .
+Bind ?r ex:r%(r)s .
+Delete { ?r ex:label "v%(v)s" } .
+Add { ?r ex:label "v%(w)s" } .
+"""
+
+
+class SlowGraph(object):
+    """
+    A proxy to a graph, emulating the latency of a thread-safe store.
+    """
+
+    def __init__(self, graph, latency):
+        self._graph = graph
+        self._latency = latency
+        self._mutex = Lock()
+
+    def _call(self, name, *args, **kw):
+        """Wait for the latency (releasing the GIL), then call the graph"""
+        sleep(self._latency)
+        with self._mutex:
+            ret = getattr(self._graph, name)(*args, **kw)
+            if name == "triples":
+                ret = list(ret)
+            return ret
+
+    def __contains__(self, triple):
+        return self._call("__contains__", triple)
+
+    def triples(self, pattern):
+        # pylint: disable=C0111
+        return self._call("triples", pattern)
+
+    def value(self, *args, **kw):
+        # pylint: disable=C0111
+        return self._call("value", *args, **kw)
+
+    def add(self, triple):
+        # pylint: disable=C0111
+        return self._call("add", triple)
+
+    def remove(self, triple):
+        # pylint: disable=C0111
+        return self._call("remove", triple)
+
+    def set(self, triple):
+        # pylint: disable=C0111
+        return self._call("set", triple)
+
+
+def make_graph(resources):
+    """Build the initial graph"""
+    graph = Graph()
+    for i in range(resources):
+        graph.add((EX["r%s" % i], EX.label, Literal("v0")))
+    return graph
+
+def run(granularity, args):
+    """Run the workload with the given granularity, and return its duration"""
+    graph = make_graph(args.resources)
+    if args.latency:
+        target = SlowGraph(graph, args.latency)
+        patcher = ConcurrentPatcher(target, granularity, threadsafe_store=True)
+    else:
+        patcher = ConcurrentPatcher(graph, granularity)
+    versions = [0] * args.resources
+    versions_lock = Lock()
+
+    def writer(seed):
+        """Apply `args.patches` patches to random resources"""
+        rand = Random(seed)
+        for _ in range(args.patches):
+            with versions_lock:
+                # pick a resource that no other writer is currently patching,
+                # so that every patch succeeds
+                res = rand.randrange(args.resources)
+                while versions[res] < 0:
+                    res = rand.randrange(args.resources)
+                version = versions[res]
+                versions[res] = -1
+            patcher.apply(PATCH % {"r": res, "v": version, "w": version+1},
+                          EX[""])
+            with versions_lock:
+                versions[res] = version+1
+
+    threads = [ Thread(target=writer, args=(i,)) for i in range(args.threads) ]
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time() - start
+    assert len(graph) == args.resources
+    return duration
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--patches", type=int, default=20,
+                        help="number of patches per thread")
+    parser.add_argument("--resources", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="emulated latency of each store access (in s)")
+    args = parser.parse_args()
+    total = args.threads * args.patches
+
+    baseline = None
+    for granularity in ("graph", "predicate", "subject"):
+        duration = run(granularity, args)
+        if baseline is None:
+            baseline = duration
+        print "%-10s %8.3fs %10.1f patch/s  x%.2f" % (
+            granularity, duration, total/duration, baseline/duration)
+
+if __name__ == "__main__":
+    main()
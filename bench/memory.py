@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark of the peak memory per triple of Add-heavy patches.
+
+For each size in ``--sizes``, a patch made of ``--blocks`` Add statements
+(of ``size`` triples in total) is applied to an empty graph
+with a `ldpatch.memory.MemoryProfile`, and the peak and retained memory
+of parsing and of the Add statements are reported per triple.
+
+This requires tracemalloc (Python 3.4+, or Python 2 with pytracemalloc).
+
+Results can be saved as JSON (``--output``), and compared to a previously
+saved baseline (``--baseline``); the exit status is 1 if some peak
+is higher than the baseline by more than ``--tolerance``.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+import json
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from sys import exit, path
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import Graph, Namespace
+
+from ldpatch import apply
+from ldpatch.memory import MemoryProfile
+
+EX = Namespace("http://example.org/")
+
+PREFIX = "@prefix ex: <http://example.org/> .\n"
+
+MEASURES = ["parse_peak", "parse_retained", "add_peak", "add_retained"]
+
+
+def make_patch(triples, blocks):
+    """
+    Generate a patch adding `triples` triples, in `blocks` Add statements
+    """
+    per_block = max(triples // blocks, 1)
+    statements = []
+    for i in range(0, triples, per_block):
+        body = "".join('ex:n%s ex:label "new %s" .\n' % (j, j)
+                       for j in range(i, min(i + per_block, triples)))
+        statements.append("Add {\n%s} .\n" % body)
+    return PREFIX + "".join(statements)
+
+def run(size, args):
+    """
+    Apply an Add-heavy patch of `size` triples,
+    and return a dict of memory per triple
+    """
+    patch = make_patch(size, args.blocks)
+    ret = {}
+    for _ in range(args.repeat):
+        profile = MemoryProfile()
+        apply(patch, Graph(), EX[""], observers=[profile])
+        _, add_peak, add_retained = profile.by_statement()["add"]
+        measures = {
+            "parse_peak": profile.parsing[0],
+            "parse_retained": profile.parsing[1],
+            "add_peak": add_peak,
+            "add_retained": add_retained,
+        }
+        for key, value in measures.iteritems():
+            value = float(value) / size
+            if key not in ret or value < ret[key]:
+                ret[key] = value
+    return ret
+
+def compare(results, baseline, tolerance):
+    """
+    Print the ratio of `results` to `baseline`,
+    and return the list of regressions beyond `tolerance`
+    """
+    regressions = []
+    for size, measures in sorted(results.iteritems(), key=lambda i: int(i[0])):
+        for measure in MEASURES:
+            base = baseline.get(size, {}).get(measure)
+            if not base:
+                continue
+            ratio = measures[measure] / base
+            flag = ""
+            if measure.endswith("_peak") and ratio > 1 + tolerance:
+                flag = "  REGRESSION"
+                regressions.append((size, measure, ratio))
+            print "%10s %-15s %10.1fB %10.1fB  x%.2f%s" % (
+                size, measure, measures[measure], base, ratio, flag)
+    return regressions
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated patch sizes (in triples)")
+    parser.add_argument("--blocks", type=int, default=1,
+                        help="number of Add statements in each patch")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="save the results in this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative increase reported as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes.split(","):
+        measures = results[size] = run(int(size), args)
+        for measure in MEASURES:
+            print "%10s %-15s %10.1fB/triple" % (size, measure,
+                                                 measures[measure])
+
+    if args.output:
+        params = { key: getattr(args, key) for key in ("blocks", "repeat") }
+        with open(args.output, "w") as out:
+            json.dump({"params": params, "results": results}, out,
+                      indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        print
+        if compare(results, baseline["results"], args.tolerance):
+            exit(1)
+
+if __name__ == "__main__":
+    main()
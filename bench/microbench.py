@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Micro-benchmarks of the hot paths of the parser and of PatchProcessor.
+
+A synthetic graph is generated for each size in ``--sizes``:
+every resource ex:rN has a label, ``--fanout`` ex:child arcs,
+a list of ``--list-length`` items, and a chain of ``--depth`` blank nodes.
+Each operation (parsing, path steps, Bind, Add, Delete, Cut, UpdateList)
+is timed separately, on a fresh copy of the graph,
+and the best of ``--repeat`` runs is kept.
+Delete removes the triples of the Add block,
+which are added to the copy before timing.
+
+Results can be saved as JSON (``--output``), and compared to a previously
+saved baseline (``--baseline``); the exit status is 1 if some operation
+is slower than the baseline by more than ``--tolerance``.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+import json
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from sys import exit, path
+from time import time
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import BNode, Graph, Literal, Namespace, Variable
+from rdflib.collection import Collection
+
+from ldpatch.footprint import RecordingProcessor
+from ldpatch.processor import PatchProcessor, PathConstraint
+from ldpatch.syntax import Parser
+
+EX = Namespace("http://example.org/")
+
+PREFIX = "@prefix ex: <http://example.org/> .\n"
+
+OPERATIONS = ["parse", "path_step", "bind", "add", "delete", "cut",
+              "updatelist"]
+
+
+def make_graph(size, fanout, list_length, depth):
+    """
+    Generate a graph of about `size` triples
+    (see the module docstring for its shape)
+    """
+    graph = Graph()
+    per_resource = 1 + fanout + 2 * list_length + 1 + 2 * depth
+    resources = max(size // per_resource, 1)
+    for i in range(resources):
+        res = EX["r%s" % i]
+        graph.add((res, EX.label, Literal("label %s" % i)))
+        for j in range(fanout):
+            graph.add((res, EX.child, EX["r%s" % ((i * fanout + j + 1)
+                                                  % resources)]))
+        head = BNode()
+        Collection(graph, head, [ Literal(j) for j in range(list_length) ])
+        graph.add((res, EX.list, head))
+        node = res
+        for j in range(depth):
+            child = BNode()
+            graph.add((node, EX.tree, child))
+            graph.add((child, EX.value, Literal(j)))
+            node = child
+    return graph, resources
+
+def make_patch(triples):
+    """Generate a patch with Bind, Add, Delete, Cut and UpdateList statements"""
+    body = "".join('ex:n%s ex:label "new %s" .\n' % (i, i)
+                   for i in range(triples))
+    return PREFIX + (
+        'Bind ?r ex:r0 / ex:child [ / ex:label = "label 1" ] .\n'
+        'Add {\n%s} .\n'
+        'Delete {\n%s} .\n'
+        'Bind ?t ex:r0 / ex:tree .\n'
+        'Cut ?t .\n'
+        'UpdateList ex:r0 ex:list 1..2 ( "x" "y" ) .\n') % (body, body)
+
+def copy(graph):
+    """Return a copy of `graph`"""
+    ret = Graph()
+    for triple in graph:
+        ret.add(triple)
+    return ret
+
+def best_of(repeat, setup, func):
+    """
+    Run `setup` then `func` on its result `repeat` times,
+    and return the shortest duration of `func`
+    """
+    ret = None
+    for _ in range(repeat):
+        arg = setup()
+        start = time()
+        func(arg)
+        duration = time() - start
+        if ret is None or duration < ret:
+            ret = duration
+    return ret
+
+def run(size, args):
+    """Time every operation on a graph of `size` triples, and return a dict"""
+    graph, resources = make_graph(size, args.fanout, args.list_length,
+                                  args.depth)
+    patch = make_patch(args.triples)
+    recorder = RecordingProcessor()
+    Parser(recorder, EX[""]).parseString(patch)
+    statements = { name: (args_, kw) for name, args_, kw
+                   in recorder.statements if name != "bind" }
+    processor = lambda: PatchProcessor(copy(graph))
+    def added():
+        # pylint: disable=C0111
+        proc = processor()
+        args_, kw = statements["add"]
+        proc.add(*args_, **kw)
+        return proc
+    ret = {}
+
+    ret["parse"] = best_of(
+        args.repeat, lambda: None,
+        lambda _: Parser(RecordingProcessor(), EX[""]).parseString(patch))
+
+    # frontier growing by a factor of fanout at each step
+    start = {EX.r0}
+    def path_steps(proc):
+        # pylint: disable=C0111
+        nodeset = start
+        for _ in range(args.steps):
+            nodeset = proc.do_path_step(nodeset, EX.child)
+    ret["path_step"] = best_of(args.repeat, processor, path_steps)
+
+    last = "label %s" % (args.fanout % resources)
+    bind_path = [EX.child, PathConstraint([EX.label], Literal(last))]
+    ret["bind"] = best_of(
+        args.repeat, processor,
+        lambda proc: proc.bind(Variable("r"), EX.r0, bind_path))
+
+    for name, setup in (("add", processor), ("delete", added),
+                        ("updatelist", processor)):
+        args_, kw = statements[name]
+        ret[name] = best_of(
+            args.repeat, setup,
+            lambda proc, name=name, args_=args_, kw=kw:
+                getattr(proc, name)(*args_, **kw))
+
+    tree = graph.value(EX.r0, EX.tree)
+    ret["cut"] = best_of(args.repeat, processor,
+                         lambda proc: proc.cut(None, tree))
+    return ret
+
+def compare(results, baseline, tolerance):
+    """
+    Print the ratio of `results` to `baseline`,
+    and return the list of regressions beyond `tolerance`
+    """
+    regressions = []
+    for size, timings in sorted(results.iteritems(), key=lambda i: int(i[0])):
+        for operation in OPERATIONS:
+            base = baseline.get(size, {}).get(operation)
+            if not base:
+                continue
+            ratio = timings[operation] / base
+            flag = ""
+            if ratio > 1 + tolerance:
+                flag = "  REGRESSION"
+                regressions.append((size, operation, ratio))
+            print "%10s %-12s %10.6fs %10.6fs  x%.2f%s" % (
+                size, operation, timings[operation], base, ratio, flag)
+    return regressions
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma-separated graph sizes (in triples)")
+    parser.add_argument("--fanout", type=int, default=4,
+                        help="number of ex:child arcs per resource")
+    parser.add_argument("--steps", type=int, default=3,
+                        help="number of ex:child steps for path_step")
+    parser.add_argument("--list-length", type=int, default=10)
+    parser.add_argument("--depth", type=int, default=3,
+                        help="depth of the blank node chains (for Cut)")
+    parser.add_argument("--triples", type=int, default=1000,
+                        help="number of triples in the Add and Delete blocks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="save the results in this JSON file")
+    parser.add_argument("--baseline",
+                        help="compare the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes.split(","):
+        timings = results[size] = run(int(size), args)
+        for operation in OPERATIONS:
+            print "%10s %-12s %10.6fs" % (size, operation, timings[operation])
+
+    if args.output:
+        params = { key: getattr(args, key) for key in
+                   ("fanout", "steps", "list_length", "depth", "triples",
+                    "repeat") }
+        with open(args.output, "w") as out:
+            json.dump({"params": params, "results": results}, out,
+                      indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            baseline = json.load(infile)
+        print
+        if compare(results, baseline["results"], args.tolerance):
+            exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Throughput benchmark for the row-based syntax (ldpatch.rdfpatch).
+
+The same changes (deleting then re-adding `--triples` triples) are applied
+to a graph, written in the default LD Patch syntax, in the JSON syntax,
+and as RDF Patch rows.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+import json
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from sys import path
+from time import time
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import Graph, Literal, Namespace
+
+from ldpatch import apply
+
+EX = Namespace("http://example.org/")
+
+
+def make_patches(triples):
+    """Return the equivalent patches in every syntax, as a dict"""
+    rows = [ ("ex:r%s" % i, "ex:label", '"v%s"' % i) for i in range(triples) ]
+    ldpatch = "@prefix ex: <http://example.org/> .\n" \
+        "Delete {\n%s} .\nAdd {\n%s} .\n" % (
+            "".join("%s %s %s .\n" % row for row in rows),
+            "".join("%s %s %s .\n" % row for row in rows))
+    body = [ [s, p, {"@value": o[1:-1]}] for s, p, o in rows ]
+    jsonpatch = json.dumps([
+        {"op": "Prefix", "prefix": "ex", "iri": "http://example.org/"},
+        {"op": "Delete", "triples": body},
+        {"op": "Add", "triples": body},
+    ])
+    nt_rows = [ "<%s%s> <%slabel> %s .\n" % (EX, s[3:], EX, o)
+                for s, _, o in rows ]
+    rdfpatch = "".join("D " + row for row in nt_rows) \
+        + "".join("A " + row for row in nt_rows)
+    return [("default", ldpatch), ("json", jsonpatch), ("rdfpatch", rdfpatch)]
+
+def make_graph(triples):
+    """Build the initial graph"""
+    graph = Graph()
+    for i in range(triples):
+        graph.add((EX["r%s" % i], EX.label, Literal("v%s" % i)))
+    return graph
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--triples", type=int, default=10000)
+    args = parser.parse_args()
+
+    baseline = None
+    for syntax, patch in make_patches(args.triples):
+        graph = make_graph(args.triples)
+        start = time()
+        apply(patch, graph, EX[""], syntax=syntax)
+        duration = time() - start
+        assert len(graph) == args.triples
+        if baseline is None:
+            baseline = duration
+        print "%-10s %8.3fs %10.0f triple/s  x%.2f" % (
+            syntax, duration, 2*args.triples/duration, baseline/duration)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Benchmark comparing in-memory and persistent stores for ldpatch-apply.
+
+A small patch is applied to a generated graph,
+either loaded in memory (then serialized back),
+or imported once in a persistent store, then patched in place.
+"""
+
+# invalid module name #pylint: disable=C0103
+
+from argparse import ArgumentParser
+from os.path import abspath, dirname, join
+from shutil import rmtree
+from StringIO import StringIO
+from sys import path
+from tempfile import mkdtemp
+from time import time
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from rdflib import Graph, Literal, Namespace
+from rdflib.store import VALID_STORE
+
+from ldpatch import apply
+from ldpatch.changeset import write_ntriples
+
+EX = Namespace("http://example.org/")
+
+PATCH = """
+@prefix ex: <http://example.org/> .
+Bind ?r ex:r%(r)s .
+Delete { ?r ex:label "label %(r)s" } .
+Add { ?r ex:label "new label %(r)s" ; ex:knows ex:r0 } .
+"""
+
+def make_data(size):
+    """Return the N-Triples serialization of a graph with `size` triples"""
+    graph = Graph()
+    for i in range(size // 2):
+        graph.add((EX["r%s" % i], EX.label, Literal("label %s" % i)))
+        graph.add((EX["r%s" % i], EX.value, Literal(i)))
+    out = StringIO()
+    write_ntriples(graph.triples((None, None, None)), out)
+    return out.getvalue()
+
+def timed(label, func, *args):
+    """Run `func` and print its duration"""
+    start = time()
+    ret = func(*args)
+    print "%-30s %8.3fs" % (label, time() - start)
+    return ret
+
+def in_memory(data, patch):
+    """Load `data`, apply `patch` and serialize the result, in memory"""
+    graph = Graph()
+    graph.parse(data=data, format="nt")
+    apply(patch, graph, EX[""])
+    write_ntriples(graph.triples((None, None, None)), StringIO())
+
+def import_store(store, store_path, data):
+    """Import `data` into a new persistent store"""
+    graph = Graph(store=store)
+    if graph.open(store_path, create=True) != VALID_STORE:
+        raise ValueError("can not create %s store" % store)
+    graph.parse(data=data, format="nt")
+    graph.commit()
+    graph.close()
+
+def in_store(store, store_path, patch):
+    """Apply `patch` in place to a persistent store"""
+    graph = Graph(store=store)
+    if graph.open(store_path, create=False) != VALID_STORE:
+        raise ValueError("can not open %s store" % store)
+    apply(patch, graph, EX[""])
+    graph.commit()
+    graph.close()
+
+def main():
+    """Main function"""
+    parser = ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=100000,
+                        help="number of triples in the graph")
+    parser.add_argument("--store", default="SQLite",
+                        help="the rdflib store plugin to compare with")
+    args = parser.parse_args()
+
+    data = make_data(args.size)
+    patch = PATCH % {"r": args.size // 4}
+    tmpdir = mkdtemp()
+    try:
+        timed("in memory (load+apply+dump)", in_memory, data, patch)
+        store_path = join(tmpdir, "store")
+        timed("%s import (once)" % args.store,
+              import_store, args.store, store_path, data)
+        timed("%s apply in place" % args.store,
+              in_store, args.store, store_path, patch)
+    finally:
+        rmtree(tmpdir)
+
+if __name__ == "__main__":
+    main()
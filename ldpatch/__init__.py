@@ -22,11 +22,14 @@ Python implementation of LD Patch.
 # pylint: disable=W0622,R0913
 
 from os.path import abspath
+from time import time
 from urllib import pathname2url
 
 __version__ = "0.9"
 
-def apply(patch, graph, baseiri=None, init_ns=None, init_var=None, syntax="default"):
+def apply(patch, graph, baseiri=None, init_ns=None, init_var=None, syntax="default",
+          budget=None, changeset=None, inverse=False, observers=None,
+          explain=False, slowlog=None, chunk_size=10000):
     """
     I parse `patch` (either a file-like or a string), and apply it to `graph`.
 
@@ -35,10 +38,221 @@ def apply(patch, graph, baseiri=None, init_ns=None, init_var=None, syntax="defau
     Other parameters:
     * `init_ns`: initial namespace binding
     * `init_var`: initial variables binding
-    * `syntax`: concrete syntax used in `patch`
+    * `syntax`: concrete syntax used in `patch`, "default", "json"
+      (see `ldpatch.jsonsyntax`) or "rdfpatch" (see `ldpatch.rdfpatch`)
+    * `budget`: an `ldpatch.processor.Budget` limiting the resources used
+    * `changeset`: an `ldpatch.changeset.Changeset` in which the changes
+      made to `graph` are recorded, e.g. to be sent to replicas
+    * `inverse`: if True, I return an LD Patch (as a unicode string)
+      restoring the previous state of `graph` when applied to it
+      (see `ldpatch.diff.inverse`); if it can not be computed,
+      an `ldpatch.diff.InverseError` is raised, although `graph`
+      *has been modified* (the changes are in its ``changeset``)
+    * `observers`: a list of `ldpatch.observer.Observer`s notified of
+      the patch and of each of its statements (e.g. a `Profile`)
+    * `explain`: if True, I return an `ldpatch.explain.Explanation`
+      of how each path and list was evaluated
+    * `slowlog`: an `ldpatch.slowlog.SlowPatchLog` recording the patch
+      if it is too slow (defaults to the one installed with
+      `ldpatch.slowlog.install`, if any)
+    * `chunk_size`: the number of triples of large Add and Delete statements
+      applied at once while they are parsed, so that they are never
+      entirely held in memory (None to apply them only once parsed);
+      each chunk is then notified to `observers` as a separate statement.
+      Chunking is disabled if `budget` has a ``max_modified``,
+      so that an Add or Delete exceeding it is rejected
+      before any of its triples is written
+
+    Every patch is accounted for in `ldpatch.metrics.METRICS`.
+
+    If both `inverse` and `explain` are True,
+    I return an (inverse patch, explanation) pair.
+    """
+    parser_class, patch, baseiri = _prepare(patch, baseiri, syntax)
+    target = graph
+    if inverse and changeset is None:
+        from ldpatch.changeset import Changeset
+        changeset = Changeset()
+    if changeset is not None:
+        from ldpatch.changeset import TrackingGraph
+        target = TrackingGraph(graph, changeset)
+    if explain:
+        from ldpatch.explain import Explanation
+        explanation = Explanation()
+        observers = list(observers or ()) + [explanation]
+    observers = _observers(observers, slowlog, patch, baseiri)
+    from ldpatch.metrics import METRICS
+    from ldpatch.processor import PatchProcessor
+    processor = PatchProcessor(target, init_ns, init_var, budget, observers)
+    if budget is not None and budget.max_modified is not None:
+        chunk_size = None
+    for observer in observers:
+        observer.patch_started()
+    start = time()
+    try:
+        parser_class(processor, baseiri, chunk_size=chunk_size) \
+            .parseString(patch)
+    except Exception, ex:
+        METRICS.record(processor, time() - start - processor.executing, ex)
+        for observer in observers:
+            observer.patch_ended(ex)
+        raise
+    METRICS.record(processor, time() - start - processor.executing)
+    for observer in observers:
+        observer.patch_ended()
+    if inverse:
+        from ldpatch.diff import DiffError, InverseError, \
+            inverse as inverse_patch
+        try:
+            undo = inverse_patch(changeset, graph)
+        except DiffError, ex:
+            raise InverseError(ex, changeset)
+        if explain:
+            return undo, explanation
+        return undo
+    if explain:
+        return explanation
+
+def iterapply(patch, graph, baseiri=None, init_ns=None, init_var=None,
+              syntax="default", budget=None, statements=1, triples=1000,
+              changeset=None, observers=None):
+    """
+    I parse `patch`, and apply it to `graph` step by step.
+
+    I am a generator, yielding a (done, total) pair of statement counts
+    every `statements` statements, and every `triples` triples
+    inside large Add and Delete statements.
+    Each step can therefore be interleaved with other tasks,
+    e.g. in an event loop::
+
+        for _ in iterapply(patch, graph, baseiri):
+            yield  # give control back to the loop
+
+    or run in a thread pool, one step at a time, if the store is slow::
+
+        steps = iterapply(patch, graph, baseiri)
+        while (yield executor.submit(next, steps, None)) is not None:
+            pass
+
+    NB: the whole patch is parsed before the first step is applied,
+    so syntax errors are raised before `graph` is modified.
+    Statements can not be interrupted in other places than listed above.
+
+    Other parameters have the same meaning as for `apply`,
+    except that `observers` are only notified of statements
+    (as a statement may be split into several steps, see above).
+    """
+    return _replayed(patch, graph, baseiri, init_ns, init_var, syntax, budget,
+                     changeset, observers, statements=statements,
+                     triples=triples, patch_events=False)
+
+def _replayed(patch, graph, baseiri=None, init_ns=None, init_var=None,
+              syntax="default", budget=None, changeset=None, observers=None,
+              slowlog=None, statements=1, triples=None, patch_events=True,
+              prepare=None):
+    """
+    I parse `patch` with a `ldpatch.footprint.RecordingProcessor`,
+    then apply the recorded statements to `graph`,
+    accounting for it as `apply` does.
+
+    I am a generator, yielding (done, total) pairs as described in
+    `iterapply`; if `triples` is None, statements are never split.
+
+    Patches are parsed under the parser lock of `ldpatch.concurrency`,
+    as the grammar of the default syntax is shared by all parsers,
+    so I can be used by several threads.
+
+    Other parameters:
+    * `patch_events`: whether `observers` (and `slowlog`) are notified
+      of the patch, and not only of its statements
+    * `prepare`: a function called with the `RecordingProcessor` once the
+      patch is parsed, before it is applied, and returning None or
+      a function to call once it is applied (e.g. to release locks)
+
+    Other parameters have the same meaning as for `apply`.
+    """
+    # pylint: disable=R0912,R0914
+    parser_class, patch, baseiri = _prepare(patch, baseiri, syntax)
+    from ldpatch.concurrency import _PARSER_LOCK
+    from ldpatch.footprint import RecordingProcessor
+    from ldpatch.metrics import METRICS
+    from ldpatch.processor import PatchProcessor
+    if patch_events:
+        observers = _observers(observers, slowlog, patch, baseiri)
+        patch_observers = observers
+    else:
+        observers = observers or []
+        patch_observers = ()
+    if changeset is not None:
+        from ldpatch.changeset import TrackingGraph
+        graph = TrackingGraph(graph, changeset)
+    recorder = RecordingProcessor(init_ns, init_var)
+    processor = None
+    for observer in patch_observers:
+        observer.patch_started()
+    start = time()
+    try:
+        with _PARSER_LOCK:
+            parser_class(recorder, baseiri).parseString(patch)
+        parsing = time() - start
+        processor = PatchProcessor(graph, init_ns, init_var, budget, observers)
+        release = prepare and prepare(recorder)
+        try:
+            total = len(recorder.statements)
+            for done, (name, args, kw) in enumerate(recorder.statements):
+                method = getattr(processor, name)
+                if triples is not None and name in ("add", "delete") \
+                        and len(args[0]) > triples:
+                    body = list(args[0])
+                    for i in range(0, len(body), triples):
+                        if i:
+                            yield done, total
+                        method(body[i:i+triples], *args[1:],
+                               partial=i+triples < len(body), **kw)
+                else:
+                    method(*args, **kw)
+                if (done+1) % statements == 0 or done+1 == total:
+                    yield done+1, total
+        finally:
+            if release is not None:
+                release()
+    except Exception, ex:
+        if processor is None:
+            METRICS.record(None, time() - start, ex)
+        else:
+            METRICS.record(processor, parsing, ex)
+        for observer in patch_observers:
+            observer.patch_ended(ex)
+        raise
+    METRICS.record(processor, parsing)
+    for observer in patch_observers:
+        observer.patch_ended()
+
+def _observers(observers, slowlog, patch, baseiri):
+    """
+    I return the list of `observers` of `patch`,
+    including that of `slowlog` (or of the installed one), if any.
+    """
+    if slowlog is None:
+        from ldpatch.slowlog import installed
+        slowlog = installed()
+    if slowlog is not None:
+        return list(observers or ()) + [slowlog.observer(patch, baseiri)]
+    return observers or []
+
+def _prepare(patch, baseiri, syntax):
+    """
+    I return the parser class for `syntax`,
+    the text of `patch` and its base IRI.
+
+    See `apply` for the meaning of the parameters.
     """
     if syntax == "default":
         from ldpatch.syntax import Parser
+    elif syntax == "json":
+        from ldpatch.jsonsyntax import JsonParser as Parser
+    elif syntax == "rdfpatch":
+        from ldpatch.rdfpatch import RdfPatchParser as Parser
     else:
         raise ValueError("Unknown LD-Patch syntax {}".format(syntax))
 
@@ -53,5 +267,18 @@ def apply(patch, graph, baseiri=None, init_ns=None, init_var=None, syntax="defau
     if hasattr(patch, "read"):
         patch = patch.read()
 
-    from ldpatch.processor import PatchProcessor
-    Parser(PatchProcessor(graph, init_ns, init_var), baseiri).parseString(patch)
+    return Parser, patch, baseiri
+
+def _register_plugins():
+    """
+    I register the rdflib plugins provided by this package.
+    """
+    try:
+        from rdflib import plugin
+        from rdflib.store import Store
+    except ImportError: # rdflib not installed yet (e.g. in setup.py)
+        return
+    plugin.register("Compact", Store, "ldpatch.compactstore", "CompactStore")
+    plugin.register("SQLite", Store, "ldpatch.sqlitestore", "SQLiteStore")
+
+_register_plugins()
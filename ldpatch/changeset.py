@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I record the net changes made to a graph by LD Patches,
+and write graphs and changesets as streams of rows.
+
+A changeset is a flat list of added and removed triples:
+Bind paths, Cut closures and UpdateList splices have already been resolved,
+and blank nodes are those of the patched graph, with their labels.
+Written with `write_changeset`, it can be applied by a replica
+(keeping the same blank node labels as the primary)
+with the "rdfpatch" syntax, which involves no path evaluation at all.
+
+Rows are written one triple at a time,
+so even huge graphs never need to be sorted or grouped in memory
+(as the Turtle serializer of rdflib does).
+"""
+
+from rdflib import Literal
+
+from ldpatch.processor import _get_native
+
+
+class Changeset(object):
+    """
+    The net changes made to a graph.
+
+    Attributes:
+    * ``added``: the set of triples that were not in the graph and were added
+    * ``removed``: the set of triples that were in the graph and were removed
+
+    NB: a triple that is added then removed (or vice-versa)
+    does not appear in the changeset.
+    """
+
+    def __init__(self):
+        self.added = set()
+        self.removed = set()
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+    def __repr__(self):
+        return "<Changeset +{} -{}>".format(len(self.added), len(self.removed))
+
+
+class TrackingGraph(object):
+    """
+    A proxy to a graph, recording in a `Changeset`
+    the changes that `PatchProcessor` makes to it.
+
+    The changeset is available as the ``changeset`` attribute.
+
+    The read-only native operations of `graph` (``path_step``, ``list_walk``)
+    are still available through the proxy; ``cut`` is not,
+    as the triples that it removes would not be recorded.
+    """
+
+    def __init__(self, graph, changeset=None):
+        self.graph = graph
+        if changeset is None:
+            changeset = Changeset()
+        self.changeset = changeset
+        for name in ("path_step", "list_walk"):
+            native = _get_native(graph, name)
+            if native is not None:
+                setattr(self, name, native)
+
+    def __contains__(self, triple):
+        return triple in self.graph
+
+    def __len__(self):
+        return len(self.graph)
+
+    def triples(self, pattern):
+        # pylint: disable=C0111
+        return self.graph.triples(pattern)
+
+    def value(self, *args, **kw):
+        # pylint: disable=C0111
+        return self.graph.value(*args, **kw)
+
+    def add(self, triple):
+        # pylint: disable=C0111
+        graph = self.graph
+        if triple in graph:
+            return
+        removed = self.changeset.removed
+        if triple in removed:
+            removed.discard(triple)
+        else:
+            self.changeset.added.add(triple)
+        graph.add(triple)
+
+    def remove(self, triple):
+        # pylint: disable=C0111
+        graph = self.graph
+        if triple not in graph:
+            return
+        added = self.changeset.added
+        if triple in added:
+            added.discard(triple)
+        else:
+            self.changeset.removed.add(triple)
+        graph.remove(triple)
+
+    def set(self, triple):
+        # pylint: disable=C0111
+        subj, pred, _ = triple
+        for old in list(self.graph.triples((subj, pred, None))):
+            if old != triple:
+                self.remove(old)
+        self.add(triple)
+
+
+def write_ntriples(triples, stream):
+    """
+    Write `triples` to `stream` in N-Triples, one line at a time.
+    """
+    write = stream.write
+    for subj, pred, obj in triples:
+        write(u"{} {} {} .\n".format(subj.n3(), pred.n3(), _nt_term(obj))
+              .encode("utf-8"))
+
+def write_nquads(quads, stream):
+    """
+    Write `quads` to `stream` in N-Quads, one line at a time.
+
+    Each quad is a (subject, predicate, object, graph) tuple,
+    where graph is None for the default graph.
+    The graph can also be an rdflib Graph, whose identifier is then used.
+    """
+    write = stream.write
+    for subj, pred, obj, graph in quads:
+        if graph is None:
+            write(u"{} {} {} .\n".format(subj.n3(), pred.n3(), _nt_term(obj))
+                  .encode("utf-8"))
+        else:
+            graph = getattr(graph, "identifier", graph)
+            write(u"{} {} {} {} .\n".format(subj.n3(), pred.n3(),
+                                            _nt_term(obj), graph.n3())
+                  .encode("utf-8"))
+
+def write_changeset(changeset, stream):
+    """
+    Write `changeset` to `stream` as RDF Patch rows:
+    ``D`` rows for removed triples, then ``A`` rows for added triples.
+    """
+    write = stream.write
+    for row, triples in (("D", changeset.removed), ("A", changeset.added)):
+        for subj, pred, obj in triples:
+            write(u"{} {} {} {} .\n".format(row, subj.n3(), pred.n3(),
+                                           _nt_term(obj))
+                  .encode("utf-8"))
+
+def _nt_term(node):
+    """The N-Triples representation of `node`"""
+    if type(node) is not Literal:
+        return node.n3()
+    quoted = u'"{}"'.format(node.replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+                            .replace(u'\n', u'\\n').replace(u'\r', u'\\r'))
+    if node.language:
+        return u"{}@{}".format(quoted, node.language)
+    elif node.datatype:
+        return u"{}^^<{}>".format(quoted, node.datatype)
+    return quoted
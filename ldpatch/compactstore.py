@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I provide a compact in-memory rdflib store, for very large graphs.
+
+It is registered as the "Compact" store plugin::
+
+    graph = Graph(store="Compact")
+
+Design note
+-----------
+
+Every term is stored once, in a dictionary mapping it to an integer id.
+Triples of ids are stored in three sorted tables (SPO, POS and OSP),
+each made of three arrays of C integers, and searched by bisection;
+this costs 36 bytes per triple, instead of the nested dicts of full terms
+of the default store.
+
+As sorted arrays are expensive to modify, writes go to small hash-indexed
+delta buffers (added triples, and tombstones for removed ones),
+which are merged into the tables when they exceed a fraction of the
+graph size (or when `compact` is called).
+
+Like `ldpatch.sqlitestore`, the store provides the set-based operations
+used by `PatchProcessor` (`path_step`, `cut` and `list_walk`).
+
+NB: terms are never removed from the dictionary.
+"""
+
+# pylint: disable=W0142,W0221
+
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import izip
+
+from rdflib import BNode, RDF
+from rdflib.store import Store, VALID_STORE
+
+# delta buffers are merged when larger than
+# max(_MIN_DELTA, size of the tables * _DELTA_RATIO)
+_MIN_DELTA = 10000
+_DELTA_RATIO = 0.125
+
+# the order of the columns of each table, relatively to (s, p, o)
+_SPO = (0, 1, 2)
+_POS = (1, 2, 0)
+_OSP = (2, 0, 1)
+
+
+class _Table(object):
+    """
+    Triples of ids, sorted in lexicographic order,
+    and stored column-wise in three arrays.
+    """
+    __slots__ = ["a", "b", "c"]
+
+    def __init__(self, rows=()):
+        self.a = col_a = array("i")
+        self.b = col_b = array("i")
+        self.c = col_c = array("i")
+        append_a, append_b, append_c = col_a.append, col_b.append, col_c.append
+        for x, y, z in rows:
+            append_a(x)
+            append_b(y)
+            append_c(z)
+
+    def __len__(self):
+        return len(self.a)
+
+    def range1(self, x):
+        """The range of rows starting with x"""
+        lo = bisect_left(self.a, x)
+        return lo, bisect_right(self.a, x, lo)
+
+    def range2(self, x, y):
+        """The range of rows starting with x, y"""
+        lo, hi = self.range1(x)
+        lo = bisect_left(self.b, y, lo, hi)
+        return lo, bisect_right(self.b, y, lo, hi)
+
+    def contains(self, x, y, z):
+        """Whether the table contains x, y, z"""
+        lo, hi = self.range2(x, y)
+        i = bisect_left(self.c, z, lo, hi)
+        return i < hi and self.c[i] == z
+
+    def rows(self, lo=0, hi=None):
+        """Iterate over the rows in the given range (default: all rows)"""
+        if hi is None:
+            return izip(self.a, self.b, self.c)
+        return izip(self.a[lo:hi], self.b[lo:hi], self.c[lo:hi])
+
+
+class CompactStore(Store):
+    """
+    A compact in-memory rdflib store.
+    """
+    # pylint: disable=R0902
+
+    # required by the Turtle parser of rdflib,
+    # although quoted formulae are not supported
+    formula_aware = True
+
+    def __init__(self, configuration=None, identifier=None):
+        self._ids = {}
+        self._terms = []
+        self._spo = _Table()
+        self._pos = _Table()
+        self._osp = _Table()
+        self._added = set()
+        self._by_s = {}
+        self._by_p = {}
+        self._by_o = {}
+        self._removed = set()
+        self._namespaces = {}
+        self._prefixes = {}
+        Store.__init__(self, configuration, identifier)
+
+    def open(self, configuration, create=False):
+        # pylint: disable=C0111,W0613
+        return VALID_STORE
+
+    # term dictionary
+
+    def _get_id(self, term, create=False):
+        """
+        Return the id of `term`,
+        or None if it is unknown and `create` is False.
+        """
+        ret = self._ids.get(term)
+        if ret is None and create:
+            ret = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return ret
+
+    # tables and delta buffers
+
+    def compact(self):
+        """Merge the delta buffers into the sorted tables"""
+        removed = self._removed
+        added = self._added
+        for name, perm in (("_spo", _SPO), ("_pos", _POS), ("_osp", _OSP)):
+            i, j, k = perm
+            table = getattr(self, name)
+            rows = table.rows()
+            if removed:
+                # rows are permuted, removed triples are not
+                unperm = [perm.index(n) for n in range(3)]
+                u, v, w = unperm
+                rows = ( row for row in rows
+                         if (row[u], row[v], row[w]) not in removed )
+            new = sorted((t[i], t[j], t[k]) for t in added)
+            setattr(self, name, _Table(merge(rows, new)))
+        self._added = set()
+        self._by_s = {}
+        self._by_p = {}
+        self._by_o = {}
+        self._removed = set()
+
+    def _check_delta(self):
+        """Merge the delta buffers if they are too large"""
+        delta = len(self._added) + len(self._removed)
+        if delta > _MIN_DELTA and delta > len(self._spo) * _DELTA_RATIO:
+            self.compact()
+
+    def _in_tables(self, triple):
+        """Whether the triple of ids is in the sorted tables"""
+        return self._spo.contains(*triple)
+
+    def _add_ids(self, triple):
+        """Add a triple of ids, return True if it was not present"""
+        removed = self._removed
+        if triple in removed:
+            removed.discard(triple)
+            return True
+        if triple in self._added or self._in_tables(triple):
+            return False
+        self._added.add(triple)
+        subj, pred, obj = triple
+        self._by_s.setdefault(subj, set()).add(triple)
+        self._by_p.setdefault(pred, set()).add(triple)
+        self._by_o.setdefault(obj, set()).add(triple)
+        return True
+
+    def _remove_ids(self, triple):
+        """Remove a triple of ids, return True if it was present"""
+        added = self._added
+        if triple in added:
+            added.discard(triple)
+            subj, pred, obj = triple
+            for index, key in ((self._by_s, subj), (self._by_p, pred),
+                               (self._by_o, obj)):
+                triples = index[key]
+                triples.discard(triple)
+                if not triples:
+                    del index[key]
+            return True
+        if triple in self._removed or not self._in_tables(triple):
+            return False
+        self._removed.add(triple)
+        return True
+
+    def _match(self, subj, pred, obj):
+        """
+        Return the list of triples of ids matching the given ids
+        (None matching any id).
+
+        NB: if all ids are None, return an iterator instead.
+        """
+        if subj is None and pred is None and obj is None:
+            return self._iter_all()
+
+        # sorted tables
+        if subj is not None:
+            table, perm = self._spo, _SPO
+            if pred is not None:
+                if obj is not None:
+                    if table.contains(subj, pred, obj):
+                        ret = [(subj, pred, obj)]
+                    else:
+                        ret = []
+                else:
+                    lo, hi = table.range2(subj, pred)
+                    ret = [ (subj, pred, o) for o in table.c[lo:hi] ]
+            else:
+                lo, hi = table.range1(subj)
+                ret = [ (subj, p, o) for _, p, o in table.rows(lo, hi)
+                        if obj is None or o == obj ]
+        elif pred is not None:
+            table, perm = self._pos, _POS
+            if obj is not None:
+                lo, hi = table.range2(pred, obj)
+                ret = [ (s, pred, obj) for s in table.c[lo:hi] ]
+            else:
+                lo, hi = table.range1(pred)
+                ret = [ (s, pred, o) for _, o, s in table.rows(lo, hi) ]
+        else:
+            lo, hi = self._osp.range1(obj)
+            ret = [ (s, p, obj) for _, s, p in self._osp.rows(lo, hi) ]
+        removed = self._removed
+        if removed:
+            ret = [ t for t in ret if t not in removed ]
+
+        # delta buffers
+        if self._added:
+            if subj is not None:
+                candidates = self._by_s.get(subj, ())
+            elif obj is not None:
+                candidates = self._by_o.get(obj, ())
+            else:
+                candidates = self._by_p.get(pred, ())
+            ret.extend( t for t in candidates
+                        if (subj is None or t[0] == subj)
+                        and (pred is None or t[1] == pred)
+                        and (obj is None or t[2] == obj) )
+        return ret
+
+    def _iter_all(self):
+        """Iterate over all the triples of ids"""
+        # tables are replaced, never modified, by compact
+        removed = self._removed
+        added = list(self._added)
+        for triple in self._spo.rows():
+            if triple not in removed:
+                yield triple
+        for triple in added:
+            yield triple
+
+    def _ids_of(self, pattern):
+        """
+        Return the ids of the terms in `pattern`,
+        or None if some of them is not in the store.
+        """
+        get_id = self._get_id
+        ret = []
+        for term in pattern:
+            if term is None:
+                ret.append(None)
+            else:
+                termid = get_id(term)
+                if termid is None:
+                    return None
+                ret.append(termid)
+        return ret
+
+    # RDF API
+
+    def add(self, triple, context, quoted=False):
+        # pylint: disable=C0111,W0613
+        if quoted:
+            raise ValueError("CompactStore does not support quoted formulae")
+        get_id = self._get_id
+        subj, pred, obj = triple
+        self._add_ids((get_id(subj, True), get_id(pred, True),
+                       get_id(obj, True)))
+        self._check_delta()
+
+    def remove(self, triple_pattern, context=None):
+        # pylint: disable=C0111,W0613
+        ids = self._ids_of(triple_pattern)
+        if ids is None:
+            return
+        for triple in list(self._match(*ids)):
+            self._remove_ids(triple)
+        self._check_delta()
+
+    def triples(self, triple_pattern, context=None):
+        # pylint: disable=C0111,W0613
+        ids = self._ids_of(triple_pattern)
+        if ids is None:
+            return
+        terms = self._terms
+        for subj, pred, obj in self._match(*ids):
+            yield (terms[subj], terms[pred], terms[obj]), iter(())
+
+    def __len__(self, context=None):
+        return len(self._spo) - len(self._removed) + len(self._added)
+
+    def contexts(self, triple=None):
+        # pylint: disable=C0111
+        return iter(())
+
+    def bind(self, prefix, namespace):
+        # pylint: disable=C0111
+        self._prefixes[namespace] = prefix
+        self._namespaces[prefix] = namespace
+
+    def prefix(self, namespace):
+        # pylint: disable=C0111
+        return self._prefixes.get(namespace)
+
+    def namespace(self, prefix):
+        # pylint: disable=C0111
+        return self._namespaces.get(prefix)
+
+    def namespaces(self):
+        # pylint: disable=C0111
+        return self._namespaces.iteritems()
+
+    # set-based operations used by PatchProcessor
+
+    def path_step(self, nodes, predicate, inverse=False):
+        """
+        Return the set of nodes reached from `nodes` through `predicate`
+        (or its inverse).
+        """
+        pid = self._get_id(predicate)
+        if pid is None:
+            return set()
+        get_id = self._get_id
+        match = self._match
+        reached = set()
+        for node in nodes:
+            nid = get_id(node)
+            if nid is None:
+                continue
+            if inverse:
+                reached.update(t[0] for t in match(None, pid, nid))
+            else:
+                reached.update(t[2] for t in match(nid, pid, None))
+        terms = self._terms
+        return { terms[i] for i in reached }
+
+    def cut(self, bnode):
+        """
+        Remove all the triples reachable from `bnode`
+        (through bnodes only), and all the triples whose object is `bnode`.
+
+        Return the number of removed triples.
+        """
+        bid = self._get_id(bnode)
+        if bid is None:
+            return 0
+        terms = self._terms
+        count = 0
+        queue = [bid]
+        while queue:
+            for triple in self._match(queue.pop(), None, None):
+                count += self._remove_ids(triple)
+                if type(terms[triple[2]]) is BNode:
+                    queue.append(triple[2])
+        for triple in self._match(None, None, bid):
+            count += self._remove_ids(triple)
+        self._check_delta()
+        return count
+
+    def list_walk(self, node, steps=None):
+        """
+        Follow at most `steps` ``rdf:rest`` arcs from `node`,
+        and return the list of nodes met, starting with `node`.
+
+        The walk stops early after ``rdf:nil``,
+        or on a node that has not exactly one ``rdf:rest``
+        (which is then the last node of the returned list).
+        """
+        ret = [node]
+        nid = self._get_id(node)
+        rest = self._get_id(RDF.rest)
+        nil = self._get_id(RDF.nil)
+        if nid is None or rest is None:
+            return ret
+        terms = self._terms
+        if steps is None:
+            # a longer walk would be cyclic
+            steps = len(self._match(None, rest, None))
+        while steps and nid != nil:
+            found = self._match(nid, rest, None)
+            if len(found) != 1:
+                break
+            nid = found[0][2]
+            ret.append(terms[nid])
+            steps -= 1
+        return ret
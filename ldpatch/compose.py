@@ -0,0 +1,379 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I compose a sequence of LD Patches into a single equivalent patch.
+
+The statements of all patches are concatenated
+(with variables and blank nodes renamed, so that they do not clash),
+then simplified, using their footprints (see `ldpatch.footprint`)
+to make sure that no other statement in between can observe the change:
+
+* a ground triple added or deleted by a plain Add or Delete
+  is dropped from that statement if a later Add or Delete writes it again;
+* a Bind whose value and path are statically known is dropped
+  if the same value and path were bound to a variable before,
+  and nothing they read was modified in between;
+* an UpdateList is merged into a previous UpdateList of the same list
+  when their slices overlap or are adjacent, or when both append items;
+* consecutive plain Add (resp. Delete) statements are merged.
+
+Note that the composed patch applies all the changes or none of them,
+while applying the patches in turn could fail half way.
+"""
+
+# pylint: disable=W0142
+
+from collections import defaultdict
+
+from rdflib import BNode, RDF, Variable
+
+from ldpatch.footprint import ANY, Footprint, FootprintProcessor, \
+    RecordingProcessor, _overlaps
+from ldpatch.processor import PathConstraint, Slice
+from ldpatch.syntax import add_collection
+from ldpatch.serializer import _arcs, _items, serialize
+
+
+def compose(patches, baseiri=None, init_ns=None, init_var=None,
+            syntax="default"):
+    """
+    I parse `patches` (a sequence of file-likes or strings),
+    and return an LD Patch (as a unicode string) equivalent to
+    applying all of them in turn.
+
+    Other parameters have the same meaning as for `ldpatch.apply`,
+    and apply to every patch.
+    """
+    from ldpatch import _prepare
+    statements = []
+    for rank, patch in enumerate(patches):
+        parser_class, patch, patch_baseiri = _prepare(patch, baseiri, syntax)
+        recorder = RecordingProcessor(init_ns, init_var)
+        parser_class(recorder, patch_baseiri).parseString(patch)
+        statements.extend(_rename(recorder.statements, rank))
+    return serialize(_Composer(statements, init_ns, init_var).run())
+
+
+def _rename(statements, rank):
+    """
+    Rename the variables and blank nodes of the statements of one patch,
+    and drop its prefix declarations (as IRIs are already expanded).
+    """
+    variables = {}
+    bnodes = {}
+    def node(element):
+        """Rename one node"""
+        typelt = type(element)
+        if typelt is Variable:
+            return variables.get(element, element)
+        elif typelt is BNode:
+            ret = bnodes.get(element)
+            if ret is None:
+                ret = bnodes[element] = BNode()
+            return ret
+        return element
+    def path(elements):
+        """Rename the nodes in a path"""
+        return [ PathConstraint(path(elt.path), node(elt.value))
+                 if type(elt) is PathConstraint else elt
+                 for elt in elements ]
+    def triples(graph, keep_bnodes):
+        """Rename the nodes in a graph, into a list"""
+        if keep_bnodes:
+            return list(graph)
+        return [ (node(s), node(p), node(o)) for s, p, o in graph ]
+
+    ret = []
+    for name, args, kw in statements:
+        if name == "prefix":
+            continue
+        elif name == "bind":
+            variable, value = args[:2]
+            value = node(value)
+            elements = path(args[2] if len(args) > 2 else kw.get("path", ()))
+            renamed = variables[variable] = Variable(
+                u"{}_{}".format(variable, rank))
+            ret.append(("bind", (renamed, value, elements), {}))
+        elif name in ("add", "delete"):
+            ret.append((name, (triples(args[0], kw.get("keep_bnodes")),)
+                        + args[1:], kw))
+        elif name == "cut":
+            ret.append((name, (node(args[0]),), {}))
+        elif name == "updatelist":
+            graph, subject, predicate, aslice, head = args
+            renamed = triples(graph, False)
+            ret.append((name, (renamed, node(subject), predicate, aslice,
+                               node(head)), {}))
+    return ret
+
+
+class _Composer(object):
+    """
+    I simplify a sequence of statements (see module docstring).
+    """
+
+    def __init__(self, statements, init_ns, init_var):
+        self.statements = statements
+        processor = FootprintProcessor(init_ns, init_var)
+        self.footprints = footprints = []
+        self.constants = constants = []
+        for name, args, kw in statements:
+            processor.footprint = Footprint()
+            getattr(processor, name)(*args, **kw)
+            footprints.append(processor.footprint)
+            if name == "bind":
+                value, path = args[1], args[2]
+                constants.append((processor.resolve(value),
+                                  _static_path(processor, path)))
+            else:
+                constants.append(None)
+        self.bind_count = defaultdict(int)
+        for name, args, _ in statements:
+            if name == "bind":
+                self.bind_count[args[0]] += 1
+
+    def run(self):
+        """Return the simplified list of statements"""
+        statements = self.statements
+        dropped = set()
+        removed = defaultdict(set) # statement index -> removed triple indexes
+        last_write = {} # ground triple -> (statement index, triple index)
+        binds = {} # (value, path) -> (statement index, variable)
+        renames = {}
+        lists = {} # (subject, predicate) -> (statement index, touched keys,
+                   #                        variables bound since)
+
+        for i, (name, args, kw) in enumerate(statements):
+            if renames:
+                name, args, kw = statements[i] = _rename_variables(
+                    (name, args, kw), renames)
+            footprint = self.footprints[i]
+            plain = name in ("add", "delete") and not (
+                kw.get("addnew") or kw.get("delex"))
+            touched = footprint.reads | footprint.writes
+
+            # forget what this statement may observe or alter
+            barrier = footprint.reads if plain else touched
+            if barrier:
+                for triple in [ triple for triple in last_write
+                                if _overlaps([triple[:2]], barrier) ]:
+                    del last_write[triple]
+            if footprint.writes:
+                for key, (j, _) in binds.items():
+                    if _overlaps(self.footprints[j].reads, footprint.writes):
+                        del binds[key]
+
+            if name == "updatelist":
+                merged = self._merge_list(i, lists)
+                if merged:
+                    dropped.add(i)
+                    continue
+            for key, (j, keys, bound) in lists.items():
+                if _overlaps(self.footprints[j].reads
+                             | self.footprints[j].writes, touched):
+                    del lists[key]
+                else:
+                    keys.update(touched)
+                    if name == "bind":
+                        bound.add(args[0])
+
+            if plain:
+                templates = footprint.added if name == "add" \
+                    else footprint.deleted
+                for k, triple in enumerate(templates):
+                    if not _is_ground(triple):
+                        continue
+                    previous = last_write.get(triple)
+                    if previous is not None:
+                        removed[previous[0]].add(previous[1])
+                    last_write[triple] = (i, k)
+            elif name == "bind":
+                variable = args[0]
+                value, path = self.constants[i]
+                if value is ANY or path is None \
+                        or self.bind_count[variable] != 1:
+                    continue
+                key = (value, path)
+                previous = binds.get(key)
+                if previous is not None:
+                    dropped.add(i)
+                    renames[variable] = previous[1]
+                else:
+                    binds[key] = (i, variable)
+            elif name == "updatelist":
+                subject, predicate = list(footprint.lists)[0]
+                if _is_ground((subject, predicate)):
+                    lists[subject, predicate] = (i, set(), set())
+
+        ret = []
+        for i, (name, args, kw) in enumerate(statements):
+            if i in dropped:
+                continue
+            if removed.get(i):
+                body = [ triple for k, triple in enumerate(args[0])
+                         if k not in removed[i] ]
+                if not body:
+                    continue
+                args = (body,) + args[1:]
+            if ret and name in ("add", "delete") and ret[-1][0] == name \
+                    and ret[-1][2] == kw and not (kw.get("addnew")
+                    or kw.get("delex") or kw.get("keep_bnodes")):
+                # consecutive statements of the same kind are merged
+                body = ret[-1][1][0]
+                known = set(body)
+                body.extend(triple for triple in args[0]
+                            if triple not in known)
+                continue
+            ret.append((name, (list(args[0]),) + args[1:], kw)
+                       if name in ("add", "delete") else (name, args, kw))
+        return ret
+
+    def _merge_list(self, i, lists):
+        """
+        Try to merge UpdateList statement `i` into a previous one,
+        and return True on success.
+        """
+        footprint = self.footprints[i]
+        key = list(footprint.lists)[0]
+        candidate = lists.get(key)
+        if candidate is None:
+            return False
+        j, between, bound = candidate
+        if _overlaps(footprint.reads | footprint.writes, between):
+            return False
+        # the merged statement is applied at j,
+        # before the variables bound in between
+        graph, subject = self.statements[i][1][:2]
+        if bound and (subject in bound or
+                      any(s in bound or o in bound for s, _, o in graph)):
+            return False
+        first = self.statements[j]
+        merged = _merge_updatelists(first[1], self.statements[i][1])
+        if merged is None:
+            return False
+        self.statements[j] = (first[0], merged, first[2])
+        # the merged statement touches the keys of both statements
+        self.footprints[j].reads.update(footprint.reads)
+        self.footprints[j].writes.update(footprint.writes)
+        return True
+
+
+def _static_path(processor, path):
+    """
+    Return `path` as a tuple with statically known values,
+    or None if it contains a variable or a blank node.
+    """
+    ret = []
+    for elt in path:
+        if type(elt) is PathConstraint:
+            value = elt.value
+            if value is not None:
+                value = processor.resolve(value)
+                if value is ANY:
+                    return None
+            subpath = _static_path(processor, elt.path)
+            if subpath is None:
+                return None
+            elt = PathConstraint(subpath, value)
+        ret.append(elt)
+    return tuple(ret)
+
+def _is_ground(nodes):
+    """Whether `nodes` contains no variable and no blank node"""
+    for node in nodes:
+        typnode = type(node)
+        if typnode is Variable or typnode is BNode:
+            return False
+    return True
+
+def _rename_variables(statement, renames):
+    """Replace variables in `statement` according to `renames`"""
+    name, args, kw = statement
+    def node(element):
+        """Rename one node"""
+        return renames.get(element, element)
+    if name == "bind":
+        variable, value, path = args
+        path = [ PathConstraint(elt.path, node(elt.value))
+                 if type(elt) is PathConstraint else elt
+                 for elt in path ]
+        args = (variable, node(value), path)
+    elif name in ("add", "delete"):
+        args = ([ (node(s), node(p), node(o)) for s, p, o in args[0] ],) \
+            + args[1:]
+    elif name == "cut":
+        args = (node(args[0]),)
+    elif name == "updatelist":
+        graph, subject, predicate, aslice, head = args
+        renamed = [ (node(s), p, node(o)) for s, p, o in graph ]
+        args = (renamed, node(subject), predicate, aslice, head)
+    return (name, args, kw)
+
+def _merge_updatelists(first, second):
+    """
+    Merge the arguments of two UpdateList statements of the same list,
+    and return the arguments of the merged statement,
+    or None if they can not be merged.
+    """
+    graph1, subject, predicate, slice1, head1 = first
+    graph2, _, _, slice2, head2 = second
+    arcs1, arcs2 = _arcs(graph1), _arcs(graph2)
+    items1 = _items(arcs1, head1)
+    items2 = _items(arcs2, head2)
+    if slice1.idx1 is None and slice2.idx1 is None:
+        # two appends
+        aslice = slice1
+        items = items1 + items2
+    else:
+        i, j = slice1
+        k, l = slice2
+        if None in (i, j, k, l) or min(i, j, k, l) < 0 or j < i or l < k:
+            return None
+        end1 = i + len(items1) # end of the first items in the modified list
+        if k > end1 or l < i:
+            return None
+        items = (items1[:k-i] if k > i else []) + items2 \
+            + (items1[l-i:] if l < end1 else [])
+        aslice = Slice(min(i, k), j + max(0, l - end1))
+
+    graph = []
+    for item in items:
+        if type(item) is BNode:
+            source = arcs1 if item in items1 else arcs2
+            _copy_closure(source, item, graph)
+    if items:
+        head = add_collection(graph, items)
+    else:
+        head = RDF.nil
+    return (graph, subject, predicate, aslice, head)
+
+def _copy_closure(source, node, target):
+    """
+    Copy the triples reachable from blank `node` in `source`
+    (indexed by `ldpatch.serializer._arcs`) to `target` (a list)
+    """
+    queue = [node]
+    while queue:
+        bnode = queue.pop()
+        for pred, obj in source.get(bnode, ()):
+            target.append((bnode, pred, obj))
+            if type(obj) is BNode:
+                queue.append(obj)
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I allow several threads to apply LD-Patches concurrently to a shared graph.
+
+Design note
+-----------
+
+Each patch is parsed first, computing its footprint
+(see `ldpatch.footprint`) and recording its statements.
+Locks are then acquired according to the footprint,
+before the statements are replayed on a `PatchProcessor`.
+
+Locks are organized in a hierarchy (multiple granularity locking):
+the whole graph, then each predicate, then each subject of a predicate.
+A patch takes intention locks (IS, IX) on the upper levels,
+and shared (S) or exclusive (X) locks on the finest level
+where its footprint is known.
+Locks are always acquired in the same order (top-down, then sorted),
+which prevents deadlocks.
+
+The patch-level locks isolate patches with conflicting footprints.
+Additionally, each individual call to the underlying graph is serialized
+by a short-lived mutex, unless the store is declared as thread-safe.
+
+NB: parsing itself is serialized,
+as parsers share (and bind) the module-level part of their grammar
+(see `ldpatch.syntax`).
+"""
+
+# pylint: disable=W0142
+
+from threading import Condition, Lock
+
+from ldpatch.footprint import ANY
+
+
+_COMPATIBLE = {
+    "IS": frozenset(["IS", "IX", "S"]),
+    "IX": frozenset(["IS", "IX"]),
+    "S": frozenset(["IS", "S"]),
+    "X": frozenset(),
+}
+
+_GRAPH_NODE = ()
+
+_PARSER_LOCK = Lock()
+
+
+class LockManager(object):
+    """
+    I manage hierarchical locks, identified by tuples of nodes.
+
+    A lock request is a (lock-id, mode) pair,
+    where mode is one of "IS", "IX", "S" or "X".
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._held = {}
+
+    def acquire(self, requests):
+        """
+        Acquire all `requests`, in the given order,
+        blocking until each of them is compatible with held locks.
+        """
+        held = self._held
+        with self._cond:
+            for lockid, mode in requests:
+                compatible = _COMPATIBLE[mode]
+                while True:
+                    modes = held.get(lockid)
+                    if not modes or compatible.issuperset(modes):
+                        break
+                    self._cond.wait()
+                modes = held.setdefault(lockid, {})
+                modes[mode] = modes.get(mode, 0) + 1
+
+    def release(self, requests):
+        """Release all `requests`, previously acquired"""
+        held = self._held
+        with self._cond:
+            for lockid, mode in requests:
+                modes = held[lockid]
+                modes[mode] -= 1
+                if modes[mode] == 0:
+                    del modes[mode]
+                    if not modes:
+                        del held[lockid]
+            self._cond.notify_all()
+
+
+def lock_requests(footprint, granularity="subject"):
+    """
+    Compute the ordered list of lock requests protecting `footprint`.
+
+    `granularity` can be "subject", "predicate" or "graph".
+    """
+    modes = {}
+    def request(lockid, mode):
+        """Record a lock request, combining it with previous ones"""
+        old = modes.get(lockid)
+        if old is None or old == mode or old == "IS" or mode == "X":
+            modes[lockid] = mode
+        elif mode != "IS" and old != "X":
+            # S + IX: no SIX mode, use the stronger X
+            modes[lockid] = "X"
+
+    for keys, mode, intention in ((footprint.reads, "S", "IS"),
+                                  (footprint.writes, "X", "IX")):
+        for subj, pred in keys:
+            if granularity == "graph" or pred is ANY:
+                request(_GRAPH_NODE, mode)
+                continue
+            request(_GRAPH_NODE, intention)
+            if granularity == "predicate" or subj is ANY:
+                request((pred,), mode)
+            else:
+                request((pred,), intention)
+                request((pred, subj), mode)
+
+    # locks covered by a S or X lock on their parent are useless
+    ret = []
+    for lockid, mode in sorted(modes.iteritems(), key=_lock_order):
+        covered = False
+        for i in range(len(lockid)):
+            parent_mode = modes.get(lockid[:i])
+            if parent_mode == "X" or (parent_mode == "S" and mode in ("IS", "S")):
+                covered = True
+                break
+        if not covered:
+            ret.append((lockid, mode))
+    return ret
+
+def _lock_order(item):
+    """The sort key ensuring that locks are always acquired in the same order"""
+    lockid = item[0]
+    return (len(lockid), [ node.n3() for node in lockid ])
+
+
+class ConcurrentPatcher(object):
+    """
+    I apply LD Patches to a graph shared by several threads.
+
+    Arguments:
+    * ``graph``: the shared graph
+    * ``granularity``: the finest level of locking,
+      either "subject" (default), "predicate" or "graph"
+    * ``threadsafe_store``: whether the store of ``graph`` supports
+      concurrent calls; if False (default), those calls are serialized
+    """
+
+    def __init__(self, graph, granularity="subject", threadsafe_store=False):
+        if granularity not in ("subject", "predicate", "graph"):
+            raise ValueError("Unknown granularity {}".format(granularity))
+        self.graph = graph
+        self.granularity = granularity
+        self.locks = LockManager()
+        if threadsafe_store:
+            self._target = graph
+        else:
+            self._target = _SynchronizedGraph(graph)
+
+    def apply(self, patch, baseiri=None, init_ns=None, init_var=None,
+              syntax="default", budget=None, changeset=None, observers=None,
+              slowlog=None):
+        """
+        I parse `patch` and apply it to the shared graph.
+
+        Parameters have the same meaning as for `ldpatch.apply`.
+        """
+        # pylint: disable=R0913
+        from ldpatch import _replayed
+        def lock(recorder):
+            """Acquire the locks of the patch, and return their release"""
+            requests = lock_requests(recorder.footprint, self.granularity)
+            self.locks.acquire(requests)
+            return lambda: self.locks.release(requests)
+        for _ in _replayed(patch, self._target, baseiri, init_ns, init_var,
+                           syntax, budget, changeset, observers, slowlog,
+                           prepare=lock):
+            pass
+
+
+class _SynchronizedGraph(object):
+    """
+    A proxy serializing the calls that `PatchProcessor` makes to a graph.
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+        self._mutex = Lock()
+
+    def __contains__(self, triple):
+        with self._mutex:
+            return triple in self._graph
+
+    def triples(self, pattern):
+        # pylint: disable=C0111
+        with self._mutex:
+            return list(self._graph.triples(pattern))
+
+    def value(self, *args, **kw):
+        # pylint: disable=C0111
+        with self._mutex:
+            return self._graph.value(*args, **kw)
+
+    def add(self, triple):
+        # pylint: disable=C0111
+        with self._mutex:
+            self._graph.add(triple)
+
+    def remove(self, triple):
+        # pylint: disable=C0111
+        with self._mutex:
+            self._graph.remove(triple)
+
+    def set(self, triple):
+        # pylint: disable=C0111
+        with self._mutex:
+            self._graph.set(triple)
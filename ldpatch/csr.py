@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I provide a graph proxy evaluating path steps with NumPy,
+over a CSR (compressed sparse row) snapshot of the graph.
+
+This is useful for read-heavy Bind evaluation on big static graphs,
+where path steps have large frontiers::
+
+    csr = CSRGraph(graph)
+    apply(patch, csr, baseiri)
+
+Design note
+-----------
+
+Nodes are mapped to integer ids. For each predicate, the snapshot holds
+an adjacency matrix in CSR format, and its transpose (for inverse steps).
+As most nodes have no arc with a given predicate, only non-empty rows
+are stored (``rows`` gives their ids, ``indptr`` their offsets into
+``indices``), so that memory does not grow with
+predicates x nodes.
+
+Frontiers returned by `path_step` are `NodeArray` objects
+(frozensets of nodes, which also keep their ids),
+so chained steps never look up the ids of their nodes again.
+
+Writes go to the underlying graph, and to an overlay
+(arcs added or removed since the snapshot), which path steps take into
+account. `rebuild` makes a new snapshot, and empties the overlay.
+"""
+
+# pylint: disable=W0142
+
+import numpy as np
+
+
+class CSRGraph(object):
+    """
+    A proxy to `graph`, providing a vectorized `path_step`
+    to `PatchProcessor`.
+
+    Other operations are delegated to `graph`.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self):
+        """Make a new snapshot of the graph, and empty the overlay"""
+        ids = {}
+        terms = []
+        subjects = []
+        predicates = []
+        objects = []
+        for subj, pred, obj in self.graph.triples((None, None, None)):
+            for node, column in ((subj, subjects), (pred, predicates),
+                                 (obj, objects)):
+                nid = ids.get(node)
+                if nid is None:
+                    nid = ids[node] = len(terms)
+                    terms.append(node)
+                column.append(nid)
+        subjects = np.array(subjects, dtype=np.int64)
+        predicates = np.array(predicates, dtype=np.int64)
+        objects = np.array(objects, dtype=np.int64)
+
+        self._ids = ids
+        self._terms = terms
+        self._snapshot_size = len(terms)
+        self._matrices = {}
+        order = np.lexsort((objects, subjects, predicates))
+        bounds = np.flatnonzero(np.diff(predicates[order])) + 1
+        for segment in np.split(order, bounds):
+            if len(segment) == 0:
+                continue
+            pred = terms[predicates[segment[0]]]
+            self._matrices[pred] = (_CSR(subjects[segment], objects[segment]),
+                                    _CSR(objects[segment], subjects[segment]))
+        # overlay: {predicate: set of (subject-id, object-id)}
+        self._added = {}
+        self._removed = {}
+        self.generation = getattr(self, "generation", -1) + 1
+
+    def _get_id(self, node, create=False):
+        """Return the id of `node` (or None if unknown and not `create`)"""
+        ret = self._ids.get(node)
+        if ret is None and create:
+            ret = self._ids[node] = len(self._terms)
+            self._terms.append(node)
+        return ret
+
+    # set-based operation used by PatchProcessor
+
+    def path_step(self, nodes, predicate, inverse=False):
+        """
+        Return the `NodeArray` of nodes reached from `nodes`
+        through `predicate` (or its inverse).
+        """
+        if isinstance(nodes, NodeArray) and nodes.graph is self \
+           and nodes.generation == self.generation:
+            frontier = nodes.ids
+        else:
+            get_id = self._get_id
+            frontier = np.unique(np.array(
+                [ i for i in (get_id(node) for node in nodes)
+                  if i is not None ], dtype=np.int64))
+
+        matrices = self._matrices.get(predicate)
+        if matrices is not None:
+            matrix = matrices[1] if inverse else matrices[0]
+            removed = self._removed.get(predicate)
+            src, dst = matrix.expand(frontier, with_sources=bool(removed))
+            if removed:
+                # encode arcs as single integers to filter them
+                size = len(self._terms)
+                removed = np.array([ s * size + o for s, o in removed ],
+                                   dtype=np.int64)
+                if inverse:
+                    arcs = dst * size + src
+                else:
+                    arcs = src * size + dst
+                dst = dst[np.in1d(arcs, removed, invert=True)]
+        else:
+            dst = np.empty(0, dtype=np.int64)
+
+        added = self._added.get(predicate)
+        if added:
+            if inverse:
+                added = [ (o, s) for s, o in added ]
+            sources = np.array([ s for s, _ in added ], dtype=np.int64)
+            hits = np.in1d(sources, frontier)
+            if hits.any():
+                extra = np.array([ o for (_, o), hit in zip(added, hits) if hit ],
+                                 dtype=np.int64)
+                dst = np.concatenate((dst, extra))
+        return NodeArray(self, np.unique(dst))
+
+    # graph API used by PatchProcessor
+
+    def __contains__(self, triple):
+        return triple in self.graph
+
+    def __len__(self):
+        return len(self.graph)
+
+    def triples(self, pattern):
+        # pylint: disable=C0111
+        return self.graph.triples(pattern)
+
+    def value(self, *args, **kw):
+        # pylint: disable=C0111
+        return self.graph.value(*args, **kw)
+
+    def add(self, triple):
+        # pylint: disable=C0111
+        if triple in self.graph:
+            return
+        subj, pred, obj = triple
+        arc = (self._get_id(subj, True), self._get_id(obj, True))
+        removed = self._removed.get(pred)
+        if removed and arc in removed:
+            removed.discard(arc)
+        else:
+            self._added.setdefault(pred, set()).add(arc)
+        self.graph.add(triple)
+
+    def remove(self, triple):
+        # pylint: disable=C0111
+        if triple not in self.graph:
+            return
+        subj, pred, obj = triple
+        arc = (self._get_id(subj, True), self._get_id(obj, True))
+        added = self._added.get(pred)
+        if added and arc in added:
+            added.discard(arc)
+        else:
+            self._removed.setdefault(pred, set()).add(arc)
+        self.graph.remove(triple)
+
+    def set(self, triple):
+        # pylint: disable=C0111
+        subj, pred, _ = triple
+        for old in list(self.graph.triples((subj, pred, None))):
+            if old != triple:
+                self.remove(old)
+        self.add(triple)
+
+
+class NodeArray(frozenset):
+    """
+    A set of nodes, reached by `CSRGraph.path_step`,
+    which also keeps their ids (as a sorted array).
+    """
+
+    def __new__(cls, graph, ids):
+        self = frozenset.__new__(cls, map(graph._terms.__getitem__, # pylint: disable=W0212
+                                          ids.tolist()))
+        self.graph = graph
+        self.generation = graph.generation
+        self.ids = ids
+        return self
+
+    def __init__(self, graph, ids):
+        # pylint: disable=W0231,W0613
+        # everything is done in __new__
+        pass
+
+    def __repr__(self):
+        if len(self) > 10:
+            return "<NodeArray of {} nodes>".format(len(self))
+        return "NodeArray({!r})".format(list(self))
+
+
+class _CSR(object):
+    """
+    A sparse adjacency matrix, where only non-empty rows are stored.
+    """
+    # pylint: disable=R0903
+
+    def __init__(self, sources, targets):
+        order = np.lexsort((targets, sources))
+        sources = sources[order]
+        self.indices = targets[order]
+        self.rows, starts = np.unique(sources, return_index=True)
+        self.indptr = np.append(starts, len(sources))
+
+    def expand(self, frontier, with_sources=False):
+        """
+        Return the arcs starting from the ids in `frontier`,
+        as an array of sources (or None, unless `with_sources`)
+        and an array of targets.
+        """
+        rows = self.rows
+        if len(rows) == 0 or len(frontier) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        pos = np.minimum(np.searchsorted(rows, frontier), len(rows) - 1)
+        hit = rows[pos] == frontier
+        pos = pos[hit]
+        starts = self.indptr[pos]
+        lengths = self.indptr[pos + 1] - starts
+        total = lengths.sum()
+        # offsets of every target, computed without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) \
+                  + np.arange(total)
+        targets = self.indices[offsets]
+        if with_sources:
+            return np.repeat(frontier[hit], lengths), targets
+        return None, targets
@@ -0,0 +1,743 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I compute an LD Patch transforming a graph into another one.
+
+Ground triples are compared as sets.
+Blank nodes are matched through a hash of their content (the subtree of
+arcs below them), so unchanged blank nodes are never compared pairwise.
+Then, among the blank nodes of a given subject and predicate:
+
+* the ones that only exist in the old graph are addressed with ``Bind``
+  and removed with ``Cut``;
+* the ones that only exist in the new graph are added with ``Add``;
+* pairs of blank nodes sharing some of their arcs are considered as
+  the same node, modified; their differences are computed recursively.
+
+Lists which are the only object of their subject and predicate
+are compared item by item, and modified with ``UpdateList``.
+
+Blank nodes that are shared by several arcs or involved in cycles are only
+supported if they are left unchanged; otherwise a `DiffError` is raised,
+as is the case when a blank node can not be addressed by a path.
+
+I also compute the inverse of the changes made by a patch (see `inverse`),
+from its `ldpatch.changeset.Changeset` rather than from a copy of the graph.
+Blank nodes removed by the patch (e.g. with ``Cut`` or ``UpdateList``)
+are restored from the changeset, so the inverse patch restores the previous
+state of the graph exactly, up to blank node renaming.
+"""
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+from hashlib import sha1
+
+from rdflib import BNode, RDF
+
+from ldpatch.changeset import _nt_term
+
+
+class DiffError(Exception):
+    """Raised when no LD Patch can be computed between two graphs"""
+    pass
+
+class InverseError(DiffError):
+    """
+    Raised by `ldpatch.apply` when the patch has been applied,
+    but no inverse patch can be computed.
+
+    The changes made to the graph are available in ``changeset``,
+    so that the caller can still undo them (e.g. by rolling back the store).
+    """
+    def __init__(self, error, changeset):
+        DiffError.__init__(self, "Patch applied, but can not be inverted: {}"
+                           .format(error))
+        self.changeset = changeset
+
+
+def diff(old, new):
+    """
+    I return an LD Patch (as a unicode string) transforming graph `old`
+    into graph `new` (up to blank node renaming).
+    """
+    return _Differ(old, new).run()
+
+
+def inverse(changeset, graph):
+    """
+    I return an LD Patch (as a unicode string) undoing the changes
+    recorded in `changeset` (an `ldpatch.changeset.Changeset`),
+    when applied to `graph`, which those changes have produced.
+
+    The cost is proportional to the size of the changeset,
+    not to the size of the graph.
+    Blank nodes which were removed are restored with new identifiers.
+    """
+    return _Inverter(changeset, graph).run()
+
+
+class _Index(object):
+    """
+    The blank node structure of a graph, computed in a single pass.
+    """
+    # pylint: disable=R0903
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.ground = ground = set()
+        self.out = out = defaultdict(list)
+        self.bnode_objects = bnode_objects = defaultdict(
+            lambda: defaultdict(list))
+        self.in_count = in_count = defaultdict(int)
+        for triple in graph:
+            subj, pred, obj = triple
+            if type(subj) is BNode:
+                out[subj].append((pred, obj))
+                if type(obj) is BNode:
+                    in_count[obj] += 1
+            elif type(obj) is BNode:
+                in_count[obj] += 1
+                bnode_objects[subj][pred].append(obj)
+            else:
+                ground.add(triple)
+        self.roots = [ bnode for bnode in out if bnode not in in_count ]
+        self._sigs = {}
+        self._lists = {}
+
+    def arcs(self, bnode):
+        """The arcs of `bnode` grouped by predicate, as a dict"""
+        ret = defaultdict(list)
+        for pred, obj in self.out.get(bnode, ()):
+            ret[pred].append(obj)
+        return ret
+
+    def list_items(self, node):
+        """
+        The items of the list starting at `node`,
+        or None if it is not a well formed list owned by a single arc.
+        """
+        if node == RDF.nil:
+            return []
+        if type(node) is not BNode:
+            return None
+        ret = self._lists.get(node, 0)
+        if ret != 0:
+            return ret
+        ret = []
+        cell = node
+        seen = set()
+        while cell != RDF.nil:
+            arcs = self.out.get(cell, ())
+            if type(cell) is not BNode or cell in seen or len(arcs) != 2 \
+                    or self.in_count.get(cell) != 1:
+                ret = None
+                break
+            seen.add(cell)
+            arcs = dict(arcs)
+            if RDF.first not in arcs or RDF.rest not in arcs:
+                ret = None
+                break
+            ret.append(arcs[RDF.first])
+            cell = arcs[RDF.rest]
+        self._lists[node] = ret
+        return ret
+
+    def sig(self, node, _visiting=None):
+        """
+        A hash of `node` and of the subtree below it,
+        equal for isomorphic subtrees.
+        """
+        if type(node) is not BNode:
+            return _nt_term(node)
+        ret = self._sigs.get(node)
+        if ret is not None:
+            return ret
+        if _visiting is None:
+            _visiting = set()
+        elif node in _visiting:
+            raise DiffError("Cycle of blank nodes through {}".format(node.n3()))
+        _visiting.add(node)
+        items = self.list_items(node)
+        if items is not None:
+            txt = u"( {} )".format(u" ".join(self.sig(item, _visiting)
+                                             for item in items))
+        else:
+            txt = u"[ {} ]".format(u" ; ".join(sorted(
+                u"{} {}".format(pred.n3(), self.sig(obj, _visiting))
+                for pred, obj in self.out.get(node, ()))))
+        _visiting.discard(node)
+        ret = self._sigs[node] = "_:" + sha1(txt.encode("utf-8")).hexdigest()
+        return ret
+
+    def check_tree(self, node):
+        """Raise DiffError if `node` or its descendants have several parents"""
+        queue = [node]
+        while queue:
+            bnode = queue.pop()
+            if self.in_count.get(bnode, 0) > 1:
+                raise DiffError("Blank node {} has several parents"
+                                .format(bnode.n3()))
+            queue.extend(obj for _, obj in self.out.get(bnode, ())
+                         if type(obj) is BNode)
+
+
+class _Differ(object):
+    """
+    I compute the LD Patch between two graphs.
+    """
+
+    def __init__(self, old, new):
+        self.old = _Index(old)
+        self.new = _Index(new)
+        self.binds = []
+        self.cuts = []
+        self.updatelists = []
+        self.deletes = []
+        self.adds = []
+        self.var_count = 0
+
+    def run(self):
+        """Return the patch"""
+        old, new = self.old, self.new
+        deleted = old.ground - new.ground
+        added = new.ground - old.ground
+
+        for subj in set(old.bnode_objects).union(new.bnode_objects):
+            old_preds = old.bnode_objects.get(subj, {})
+            new_preds = new.bnode_objects.get(subj, {})
+            for pred in set(old_preds).union(new_preds):
+                if sorted(old.sig(obj) for obj in old_preds.get(pred, ())) \
+                        == sorted(new.sig(obj) for obj in new_preds.get(pred, ())):
+                    continue # unchanged blank nodes
+                old_objs = list(old.graph.objects(subj, pred))
+                new_objs = list(new.graph.objects(subj, pred))
+                if self.diff_objects(subj.n3(), subj, pred, old_objs, new_objs):
+                    # the list was modified in place
+                    deleted.discard((subj, pred, RDF.nil))
+                    added.discard((subj, pred, RDF.nil))
+
+        pairs, old_only, new_only = self.match(old.roots, new.roots)
+        for old_node, new_node in pairs:
+            var = self.address(None, None, old_node, ())
+            self.diff_node(var, old_node, new_node)
+        for old_node in old_only:
+            old.check_tree(old_node)
+            self.cuts.append(self.address(None, None, old_node, ()))
+        for new_node in new_only:
+            new.check_tree(new_node)
+            self.adds.append(u"{} .".format(self.render(new_node)))
+
+        self.deletes.extend(u"{} {} {} .".format(s.n3(), p.n3(), _nt_term(o))
+                            for s, p, o in deleted)
+        self.adds.extend(u"{} {} {} .".format(s.n3(), p.n3(), _nt_term(o))
+                         for s, p, o in added)
+        return self.render_patch()
+
+    def diff_node(self, var, old_node, new_node):
+        """Compute the differences between two blank nodes bound to `var`"""
+        old_arcs = self.old.arcs(old_node)
+        new_arcs = self.new.arcs(new_node)
+        for pred in set(old_arcs).union(new_arcs):
+            old_objs = old_arcs.get(pred, [])
+            new_objs = new_arcs.get(pred, [])
+            in_place = self.diff_objects(var, old_node, pred,
+                                         old_objs, new_objs)
+            old_ground = set(obj for obj in old_objs if type(obj) is not BNode)
+            new_ground = set(obj for obj in new_objs if type(obj) is not BNode)
+            if in_place:
+                old_ground.discard(RDF.nil)
+                new_ground.discard(RDF.nil)
+            self.deletes.extend(u"{} {} {} .".format(var, pred.n3(),
+                                                     _nt_term(obj))
+                                for obj in old_ground - new_ground)
+            self.adds.extend(u"{} {} {} .".format(var, pred.n3(),
+                                                  _nt_term(obj))
+                             for obj in new_ground - old_ground)
+
+    def diff_objects(self, subj_txt, old_subj, pred, old_objs, new_objs):
+        """
+        Compute the differences between the blank node objects
+        of `pred` for the subject rendered as `subj_txt`.
+
+        Return True if the objects are lists, modified in place.
+        """
+        # pylint: disable=R0913
+        old, new = self.old, self.new
+        if len(old_objs) == 1 and len(new_objs) == 1:
+            old_items = old.list_items(old_objs[0])
+            new_items = new.list_items(new_objs[0])
+            if old_items is not None and new_items is not None:
+                self.diff_list(subj_txt, pred, old_items, new_items)
+                return True
+
+        pairs, old_only, new_only = self.match(
+            [ obj for obj in old_objs if type(obj) is BNode ],
+            [ obj for obj in new_objs if type(obj) is BNode ])
+        for old_node, new_node in pairs:
+            var = self.address(subj_txt, (old_subj, pred), old_node, old_objs)
+            self.diff_node(var, old_node, new_node)
+        for old_node in old_only:
+            old.check_tree(old_node)
+            self.cuts.append(self.address(subj_txt, (old_subj, pred),
+                                          old_node, old_objs))
+        for new_node in new_only:
+            new.check_tree(new_node)
+            self.adds.append(u"{} {} {} .".format(subj_txt, pred.n3(),
+                                                  self.render(new_node)))
+        return False
+
+    def diff_list(self, subj_txt, pred, old_items, new_items):
+        """Compute the UpdateList statements transforming a list"""
+        old_sigs = [ self.old.sig(item) for item in old_items ]
+        new_sigs = [ self.new.sig(item) for item in new_items ]
+        if old_sigs == new_sigs:
+            return
+        matcher = SequenceMatcher(None, old_sigs, new_sigs, autojunk=False)
+        # from the end, so that the indexes of the next slices are unchanged
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                continue
+            for item in new_items[j1:j2]:
+                if type(item) is BNode:
+                    self.new.check_tree(item)
+            self.updatelists.append(u"UpdateList {} {} {}..{} ( {} ) .".format(
+                subj_txt, pred.n3(), i1, i2,
+                u" ".join(self.render(item) for item in new_items[j1:j2])))
+
+    def match(self, old_nodes, new_nodes):
+        """
+        Match blank nodes from the old and the new graph.
+
+        Return the list of (old, new) pairs with different content,
+        the list of old nodes without a match,
+        and the list of new nodes without a match.
+        Nodes with the same content are matched and not returned.
+        """
+        old, new = self.old, self.new
+        new_by_sig = defaultdict(list)
+        for node in new_nodes:
+            new_by_sig[new.sig(node)].append(node)
+        old_only = []
+        for node in old_nodes:
+            same = new_by_sig.get(old.sig(node))
+            if same:
+                same.pop()
+            else:
+                old_only.append(node)
+        new_only = [ node for nodes in new_by_sig.itervalues()
+                     for node in nodes ]
+        if not old_only or not new_only:
+            return [], old_only, new_only
+
+        # pair nodes sharing arcs, using an index of the new nodes' arcs
+        by_arc = defaultdict(list)
+        for node in new_only:
+            if new.list_items(node) is None:
+                for pred, obj in new.out.get(node, ()):
+                    by_arc[pred, new.sig(obj)].append(node)
+        pairs = []
+        unpaired_old = []
+        paired_new = set()
+        for node in old_only:
+            scores = defaultdict(int)
+            if old.list_items(node) is None:
+                for pred, obj in old.out.get(node, ()):
+                    for candidate in by_arc.get((pred, old.sig(obj)), ()):
+                        if candidate not in paired_new:
+                            scores[candidate] += 1
+            if scores:
+                best = max(scores, key=scores.get)
+                paired_new.add(best)
+                pairs.append((node, best))
+            else:
+                unpaired_old.append(node)
+        return (pairs, unpaired_old,
+                [ node for node in new_only if node not in paired_new ])
+
+    def address(self, subj_txt, arc, node, siblings):
+        """
+        Bind a new variable to blank `node` of the old graph,
+        object of `arc` (a subject-predicate pair) with `siblings`
+        (or a root if `arc` is None), and return the variable.
+        """
+        graph = self.old.graph
+        arcs = self.old.out.get(node, ())
+        path = None
+        if arc is not None:
+            step = u"{} / {}".format(subj_txt, arc[1].n3())
+            others = [ obj for obj in siblings if obj != node ]
+            if not others:
+                path = step
+            else:
+                constraint = _constraint(graph, arcs, others)
+                if constraint is not None:
+                    path = u"{} {}".format(step, constraint)
+        if path is None:
+            path = _inverse_step(graph, arcs, node)
+        var = u"?b{}".format(self.var_count)
+        self.var_count += 1
+        self.binds.append(u"Bind {} {} .".format(var, path))
+        return var
+
+    def render(self, node):
+        """Render `node` of the new graph as a Turtle object"""
+        if type(node) is not BNode:
+            return _nt_term(node)
+        new = self.new
+        items = new.list_items(node)
+        if items is not None:
+            return u"( {} )".format(u" ".join(self.render(item)
+                                              for item in items))
+        return u"[ {} ]".format(u" ; ".join(sorted(
+            u"{} {}".format(pred.n3(), self.render(obj))
+            for pred, obj in new.out.get(node, ()))))
+
+    def render_patch(self):
+        """Return the text of the patch"""
+        return _render_patch(self)
+
+
+def _render_patch(differ):
+    """
+    Return the text of the patch computed by `differ`
+    (either a `_Differ` or an `_Inverter`)
+    """
+    statements = list(differ.binds)
+    statements.extend(u"Cut {} .".format(var) for var in differ.cuts)
+    statements.extend(differ.updatelists)
+    if differ.deletes:
+        statements.append(u"Delete {{\n{}\n}} .".format(
+            u"\n".join(sorted(differ.deletes))))
+    if differ.adds:
+        statements.append(u"Add {{\n{}\n}} .".format(
+            u"\n".join(sorted(differ.adds))))
+    return u"".join(u"{}\n".format(stmt) for stmt in statements)
+
+
+class _Inverter(object):
+    """
+    I compute the LD Patch undoing a changeset.
+
+    Triples are looked up in the current graph (after the changes),
+    or in the *old view*, i.e. the current graph without the added triples
+    and with the removed ones.
+    """
+
+    def __init__(self, changeset, graph):
+        self.graph = graph
+        self.added = added = changeset.added
+        self.removed = removed = changeset.removed
+        self.removed_sp = defaultdict(list)
+        self.removed_o = defaultdict(list)
+        for subj, pred, obj in removed:
+            self.removed_sp[subj, pred].append(obj)
+            self.removed_o[obj].append((subj, pred))
+        self.bnodes_new = set()
+        self.bnodes_gone = set()
+        for triples, check, target in ((added, self._existed, self.bnodes_new),
+                                       (removed, self._exists, self.bnodes_gone)):
+            for triple in triples:
+                for node in (triple[0], triple[2]):
+                    if type(node) is BNode and node not in target \
+                            and not check(node):
+                        target.add(node)
+        self.handled = set()
+        self.vars = {}
+        self.gone_labels = {}
+        self.binds = []
+        self.cuts = []
+        self.updatelists = []
+        self.deletes = []
+        self.adds = []
+
+    def _exists(self, node):
+        """Whether `node` is in the current graph"""
+        graph = self.graph
+        for _ in graph.triples((node, None, None)):
+            return True
+        for _ in graph.triples((None, None, node)):
+            return True
+        return False
+
+    def _existed(self, node):
+        """Whether `node` was in the graph before the changes"""
+        if self.removed_o.get(node):
+            return True
+        added = self.added
+        graph = self.graph
+        for triple in graph.triples((node, None, None)):
+            if triple not in added:
+                return True
+        for triple in graph.triples((None, None, node)):
+            if triple not in added:
+                return True
+        return any(subj == node for subj, _ in self.removed_sp)
+
+    def old_objects(self, subj, pred):
+        """The objects of `subj` and `pred` in the old view"""
+        added = self.added
+        ret = [ obj for obj in self.graph.objects(subj, pred)
+                if (subj, pred, obj) not in added ]
+        ret.extend(self.removed_sp.get((subj, pred), ()))
+        return ret
+
+    def old_in(self, node):
+        """The (subject, predicate) pairs of the arcs to `node` in the old view"""
+        added = self.added
+        ret = [ (subj, pred) for subj, pred in self.graph.subject_predicates(node)
+                if (subj, pred, node) not in added ]
+        ret.extend(self.removed_o.get(node, ()))
+        return ret
+
+    def new_objects(self, subj, pred):
+        """The objects of `subj` and `pred` in the current graph"""
+        return list(self.graph.objects(subj, pred))
+
+    def new_in(self, node):
+        """The (subject, predicate) pairs of the arcs to `node` in the current graph"""
+        return list(self.graph.subject_predicates(node))
+
+    def run(self):
+        """Return the inverse patch"""
+        self.invert_lists()
+        self.cut_new_subtrees()
+        term = self.term
+        for subj, pred, obj in self.added:
+            if (subj, pred, obj) not in self.handled:
+                self.deletes.append(u"{} {} {} .".format(
+                    term(subj), pred.n3(), term(obj)))
+        for subj, pred, obj in self.removed:
+            if (subj, pred, obj) not in self.handled:
+                self.adds.append(u"{} {} {} .".format(
+                    term(subj), pred.n3(), term(obj)))
+        return _render_patch(self)
+
+    def invert_lists(self):
+        """Restore the lists modified by the changes with UpdateList"""
+        owners = set()
+        for triples, view_in in ((self.added, self.new_in),
+                                 (self.removed, self.old_in)):
+            for subj, pred, _ in triples:
+                if pred == RDF.first or pred == RDF.rest:
+                    owner = _list_owner(subj, view_in)
+                    if owner is not None:
+                        owners.add(owner)
+        for owner in owners:
+            self.invert_list(*owner)
+
+    def invert_list(self, subj, pred):
+        """Restore the list of `subj` and `pred` with UpdateList"""
+        old_cells, old_items = _walk_list(subj, pred, self.old_objects)
+        new_cells, new_items = _walk_list(subj, pred, self.new_objects)
+        if old_cells is None or new_cells is None:
+            return
+        handled = self.handled
+        for cells in (old_cells, new_cells):
+            handled.add((subj, pred, cells[0]))
+            for cell, nxt, item in zip(cells, cells[1:], old_items
+                                       if cells is old_cells else new_items):
+                handled.add((cell, RDF.first, item))
+                handled.add((cell, RDF.rest, nxt))
+        matcher = SequenceMatcher(None, new_items, old_items, autojunk=False)
+        subj_txt = self.term(subj)
+        for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+            if tag == "equal":
+                continue
+            for item in new_items[i1:i2]:
+                if item in self.bnodes_new:
+                    # cut by UpdateList
+                    handled.update(_closure(item, self.new_objects_of))
+            self.updatelists.append(u"UpdateList {} {} {}..{} ( {} ) .".format(
+                subj_txt, pred.n3(), i1, i2,
+                u" ".join(self.render_old(item) for item in old_items[j1:j2])))
+
+    def new_objects_of(self, node):
+        """The outgoing arcs of `node` in the current graph"""
+        return list(self.graph.predicate_objects(node))
+
+    def old_objects_of(self, node):
+        """The outgoing arcs of `node` in the old view"""
+        added = self.added
+        ret = [ (pred, obj) for pred, obj in self.graph.predicate_objects(node)
+                if (node, pred, obj) not in added ]
+        ret.extend((pred, obj) for (subj, pred), objs
+                   in self.removed_sp.iteritems() if subj == node
+                   for obj in objs)
+        return ret
+
+    def render_old(self, node):
+        """Render `node` as a Turtle object, as it was in the old view"""
+        if node not in self.bnodes_gone:
+            return self.term(node)
+        arcs = self.old_objects_of(node)
+        self.handled.update((node, pred, obj) for pred, obj in arcs)
+        return u"[ {} ]".format(u" ; ".join(sorted(
+            u"{} {}".format(pred.n3(), self.render_old(obj))
+            for pred, obj in arcs)))
+
+    def cut_new_subtrees(self):
+        """Remove the trees of new blank nodes with Cut"""
+        bnodes_new = self.bnodes_new
+        for node in bnodes_new:
+            incoming = self.new_in(node)
+            if any(subj in bnodes_new for subj, _ in incoming):
+                continue
+            closure = _closure(node, self.new_objects_of)
+            if any(type(obj) is BNode and obj not in bnodes_new
+                   for _, _, obj in closure):
+                continue
+            if any((subj, pred, node) in self.handled
+                   for subj, pred in incoming):
+                continue
+            self.cuts.append(self.address(node))
+            self.handled.update(closure)
+            self.handled.update((subj, pred, node) for subj, pred in incoming)
+
+    def term(self, node):
+        """Render a node, binding a variable to current blank nodes"""
+        if type(node) is not BNode:
+            return _nt_term(node)
+        if node in self.bnodes_gone:
+            label = self.gone_labels.get(node)
+            if label is None:
+                label = self.gone_labels[node] = u"_:g{}".format(
+                    len(self.gone_labels))
+            return label
+        return self.address(node)
+
+    def address(self, node, _visiting=None):
+        """Bind a variable to blank `node` of the current graph, and return it"""
+        var = self.vars.get(node)
+        if var is not None:
+            return var
+        if _visiting is None:
+            _visiting = set()
+        _visiting.add(node)
+        graph = self.graph
+        arcs = self.new_objects_of(node)
+        path = None
+        for subj, pred in self.new_in(node):
+            if type(subj) is BNode:
+                if subj in _visiting:
+                    continue
+                try:
+                    base = self.address(subj, _visiting)
+                except DiffError:
+                    continue
+            else:
+                base = _nt_term(subj)
+            others = [ obj for obj in graph.objects(subj, pred) if obj != node ]
+            if not others:
+                path = u"{} / {}".format(base, pred.n3())
+                break
+            constraint = _constraint(graph, arcs, others)
+            if constraint is not None:
+                path = u"{} / {} {}".format(base, pred.n3(), constraint)
+                break
+        if path is None:
+            path = _inverse_step(graph, arcs, node)
+        var = self.vars[node] = u"?i{}".format(len(self.vars))
+        self.binds.append(u"Bind {} {} .".format(var, path))
+        return var
+
+
+def _list_owner(cell, view_in):
+    """
+    Return the (subject, predicate) pair owning the list containing `cell`,
+    or None if it can not be found.
+    """
+    seen = set()
+    while cell not in seen:
+        seen.add(cell)
+        incoming = view_in(cell)
+        rests = [ subj for subj, pred in incoming if pred == RDF.rest ]
+        if not rests:
+            others = [ arc for arc in incoming if arc[1] != RDF.first ]
+            if len(others) == 1:
+                return others[0]
+            return None
+        if len(rests) > 1:
+            return None
+        cell = rests[0]
+    return None
+
+def _walk_list(subj, pred, objects):
+    """
+    Return the cells (including the final rdf:nil) and the items of the list
+    of `subj` and `pred`, using `objects` to look up the graph;
+    cells is None if the list is malformed.
+    """
+    heads = objects(subj, pred)
+    if len(heads) != 1:
+        return None, None
+    cells = [heads[0]]
+    items = []
+    seen = set()
+    cell = heads[0]
+    while cell != RDF.nil:
+        firsts = objects(cell, RDF.first)
+        rests = objects(cell, RDF.rest)
+        if len(firsts) != 1 or len(rests) != 1 or cell in seen:
+            return None, None
+        seen.add(cell)
+        items.append(firsts[0])
+        cell = rests[0]
+        cells.append(cell)
+    return cells, items
+
+def _closure(node, arcs_of):
+    """The triples reachable from blank `node`, using `arcs_of`"""
+    ret = set()
+    queue = [node]
+    while queue:
+        bnode = queue.pop()
+        for pred, obj in arcs_of(bnode):
+            triple = (bnode, pred, obj)
+            if triple not in ret:
+                ret.add(triple)
+                if type(obj) is BNode:
+                    queue.append(obj)
+    return ret
+
+def _constraint(graph, arcs, others):
+    """
+    Return a path constraint satisfied by the node whose outgoing `arcs`
+    are given, but not by `others` in `graph`, or None.
+    """
+    for key, val in arcs:
+        if type(val) is not BNode and not any(
+                (other, key, val) in graph for other in others):
+            return u"[ / {} = {} ]".format(key.n3(), _nt_term(val))
+    for key in set(key for key, _ in arcs):
+        if not any(graph.value(other, key) is not None for other in others):
+            return u"[ / {} ]".format(key.n3())
+    return None
+
+def _inverse_step(graph, arcs, node):
+    """
+    Return a path from a ground value to `node` (whose outgoing `arcs`
+    are given) through an inverse step, or raise DiffError.
+    """
+    for key, val in arcs:
+        if type(val) is not BNode \
+                and list(graph.subjects(key, val)) == [node]:
+            return u"{} / ^{}".format(_nt_term(val), key.n3())
+    raise DiffError("Can not address blank node {}".format(node.n3()))
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I estimate the cost of an LD-Patch, without applying it.
+
+The cost of a statement is the estimated number of triples that the
+processor will visit or modify when applying it. It is computed from
+`GraphStatistics`, which can be computed once and reused for many patches.
+
+Expensive constructs (such as leading inverse steps on predicates with a
+high fan-in, or large list indexes) are reported as warnings.
+"""
+
+# pylint: disable=W0142
+
+from collections import namedtuple
+
+from rdflib import BNode, RDF, URIRef as IRI, Variable
+
+from ldpatch.footprint import FootprintProcessor
+from ldpatch.processor import InvIRI, PathConstraint, UNICITY_CONSTRAINT
+
+
+def estimate(patch, graph, baseiri=None, init_ns=None, init_var=None,
+             syntax="default", hot_fanout=100, max_index=1000):
+    """
+    I parse `patch` (either a file-like or a string),
+    and return its `Estimate` against `graph`, without applying it.
+
+    `graph` can also be a `GraphStatistics`,
+    to avoid recomputing them for every patch.
+
+    Other parameters have the same meaning as for `ldpatch.apply`, except:
+    * `hot_fanout`: the fan-out above which a path step is reported
+    * `max_index`: the list index above which a path step or a slice is reported
+    """
+    # pylint: disable=R0913
+    from ldpatch import _prepare
+    if isinstance(graph, GraphStatistics):
+        stats = graph
+    else:
+        stats = GraphStatistics(graph)
+    parser_class, patch, baseiri = _prepare(patch, baseiri, syntax)
+    processor = EstimateProcessor(stats, init_ns, init_var,
+                                  hot_fanout, max_index)
+    parser_class(processor, baseiri).parseString(patch)
+    return processor.estimate
+
+
+class GraphStatistics(object):
+    """
+    Statistics about a graph, used to estimate the cost of patches.
+
+    Attributes:
+    * ``size``: the number of triples in the graph
+    * ``fanout``: a dict giving, for each predicate,
+      the average number of objects per subject
+    * ``fanin``: a dict giving, for each predicate,
+      the average number of subjects per object
+    * ``bnode_closure``: the average number of triples
+      reachable from a blank node which is not the object of a blank node
+      (i.e. the average cost of a Cut)
+    * ``list_length``: the average length of RDF lists
+    """
+    # pylint: disable=R0903
+
+    def __init__(self, graph):
+        counts = {}
+        subjects = {}
+        objects = {}
+        bnode_triples = 0
+        bnode_subjects = set()
+        bnode_objects = set()
+        for subj, pred, obj in graph.triples((None, None, None)):
+            counts[pred] = counts.get(pred, 0) + 1
+            subjects.setdefault(pred, set()).add(subj)
+            objects.setdefault(pred, set()).add(obj)
+            if type(subj) is BNode:
+                bnode_triples += 1
+                bnode_subjects.add(subj)
+                if type(obj) is BNode:
+                    bnode_objects.add(obj)
+
+        self.size = sum(counts.itervalues())
+        self.fanout = { pred: float(count) / len(subjects[pred])
+                        for pred, count in counts.iteritems() }
+        self.fanin = { pred: float(count) / len(objects[pred])
+                       for pred, count in counts.iteritems() }
+        roots = len(bnode_subjects - bnode_objects) or 1
+        self.bnode_closure = float(bnode_triples) / roots
+        lists = sum(1 for _ in graph.triples((None, RDF.rest, RDF.nil))) or 1
+        self.list_length = float(counts.get(RDF.first, 0)) / lists
+
+
+class Estimate(object):
+    """
+    The estimated cost of a patch.
+
+    Attributes:
+    * ``cost``: the total estimated cost
+    * ``statements``: a list of `StatementEstimate`, one per statement
+    * ``warnings``: a list of `CostWarning`
+    """
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self.cost = 0.0
+        self.statements = []
+        self.warnings = []
+
+StatementEstimate = namedtuple("StatementEstimate",
+                               ["index", "statement", "cost", "frontiers"])
+""" The estimated cost of a statement.
+
+    * ``index``: the rank of the statement in the patch (starting at 0)
+    * ``statement``: a short description of the statement
+    * ``cost``: the estimated cost
+    * ``frontiers``: for Bind, the estimated size of the frontier
+      after each path step (empty for other statements)
+"""
+
+CostWarning = namedtuple("CostWarning", ["index", "statement", "message"])
+""" A construct reported as expensive.
+
+    * ``index``: the rank of the statement in the patch (starting at 0)
+    * ``statement``: a short description of the statement
+    * ``message``: an explanation
+"""
+
+
+class EstimateProcessor(FootprintProcessor):
+    """
+    An LD Patch processor estimating the cost of a patch,
+    instead of applying it.
+
+    The estimate is available as the ``estimate`` attribute.
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, stats, init_ns=None, init_vars=None,
+                 hot_fanout=100, max_index=1000):
+        FootprintProcessor.__init__(self, init_ns, init_vars)
+        self.stats = stats
+        self.hot_fanout = hot_fanout
+        self.max_index = max_index
+        self.estimate = Estimate()
+
+    def _record(self, statement, cost, frontiers=()):
+        """Record the estimated cost of a statement"""
+        index = len(self.estimate.statements)
+        self.estimate.statements.append(
+            StatementEstimate(index, statement, cost, list(frontiers)))
+        self.estimate.cost += cost
+
+    def _warn(self, statement, message):
+        """Record a warning about the current statement"""
+        index = len(self.estimate.statements)
+        self.estimate.warnings.append(CostWarning(index, statement, message))
+
+    def path_cost(self, statement, path, frontier=1.0, frontiers=None):
+        """
+        Estimate the cost of `path` starting from `frontier` nodes.
+
+        Return the cost and the size of the resulting frontier.
+        """
+        stats = self.stats
+        cost = 0.0
+        for i, step in enumerate(path):
+            typstep = type(step)
+            if typstep is IRI:
+                fanout = stats.fanout.get(step, 0.0)
+                if fanout > self.hot_fanout:
+                    self._warn(statement, "step {} has a fan-out of {:.0f}"
+                               .format(step.n3(), fanout))
+                cost += frontier * max(fanout, 1.0)
+                frontier *= fanout
+            elif typstep is InvIRI:
+                fanin = stats.fanin.get(step.iri, 0.0)
+                if i == 0 and fanin > self.hot_fanout:
+                    self._warn(statement,
+                               "leading inverse step ^{} has a fan-in of {:.0f}"
+                               .format(step.iri.n3(), fanin))
+                elif fanin > self.hot_fanout:
+                    self._warn(statement, "step ^{} has a fan-in of {:.0f}"
+                               .format(step.iri.n3(), fanin))
+                cost += frontier * max(fanin, 1.0)
+                frontier *= fanin
+            elif typstep is int:
+                if step > self.max_index:
+                    self._warn(statement, "large list index {}".format(step))
+                cost += frontier * (step + 1)
+            elif typstep is PathConstraint:
+                subcost, _ = self.path_cost(statement, step.path)
+                cost += frontier * subcost
+            elif step is UNICITY_CONSTRAINT:
+                frontier = min(frontier, 1.0)
+            if frontiers is not None:
+                frontiers.append(frontier)
+        return cost, frontier
+
+    # ldpatch commands
+
+    def prefix(self, prefix, iri):
+        """Process a Prefix command"""
+        FootprintProcessor.prefix(self, prefix, iri)
+        self._record("@prefix {}:".format(prefix), 0)
+
+    def bind(self, variable, value, path=()):
+        """Process a Bind command"""
+        path = list(path)
+        statement = "Bind ?{}".format(variable)
+        frontiers = []
+        cost, _ = self.path_cost(statement, path, frontiers=frontiers)
+        FootprintProcessor.bind(self, variable, value, path)
+        self._record(statement, cost, frontiers)
+
+    def add(self, add_graph, addnew=False, keep_bnodes=False):
+        """Process an Add or AddNew command"""
+        cost = len(add_graph) * (2 if addnew else 1)
+        FootprintProcessor.add(self, add_graph, addnew, keep_bnodes)
+        self._record("AddNew" if addnew else "Add", cost)
+
+    def delete(self, del_graph, delex=False, keep_bnodes=False):
+        """Process a Delete or DeleteExisting command"""
+        cost = len(del_graph) * (2 if delex else 1)
+        FootprintProcessor.delete(self, del_graph, delex, keep_bnodes)
+        self._record("DeleteExisting" if delex else "Delete", cost)
+
+    def cut(self, var):
+        """Process a Cut command"""
+        FootprintProcessor.cut(self, var)
+        self._record("Cut ?{}".format(var), self.stats.bnode_closure)
+
+    def updatelist(self, udl_graph, subject, predicate, aslice, udl_head):
+        """Process an UpdateList command"""
+        statement = "UpdateList {}".format(_short(predicate))
+        length = self.stats.list_length
+        imin, imax = aslice.idx1, aslice.idx2
+        largest = max(abs(idx) for idx in (imin, imax, 0) if idx is not None)
+        if largest > self.max_index:
+            self._warn(statement, "large list index {}".format(largest))
+        if imin is None or imax is None or imin < 0 or imax < 0:
+            # the whole list must be walked
+            walked = max(length, imin)
+        else:
+            walked = imax
+        if imin is None or imin == imax:
+            removed = 0.0
+        elif imax is None:
+            removed = max(length - (imin if imin >= 0 else length + imin), 0)
+        else:
+            removed = max(imax - imin, 0)
+        cost = walked + removed * (1 + self.stats.bnode_closure) \
+             + len(udl_graph)
+        FootprintProcessor.updatelist(self, udl_graph, subject, predicate,
+                                      aslice, udl_head)
+        self._record(statement, cost)
+
+
+def _short(node):
+    """Short representation of a node in a statement description"""
+    if type(node) is Variable:
+        return "?{}".format(node)
+    return node.n3()
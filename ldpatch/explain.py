@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I explain how a patch was actually evaluated (like EXPLAIN ANALYZE).
+
+Unlike `ldpatch.estimate`, which predicts costs from statistics,
+an `Explanation` is an observer (see `ldpatch.observer`) recording,
+while the patch is applied:
+
+* for each Bind, every path step with the number of nodes before and after
+  it and its duration (for a constraint, the difference is the number
+  of nodes it pruned);
+* for each UpdateList, the number of list cells walked and removed.
+
+It is returned by ``ldpatch.apply(..., explain=True)``,
+and can be rendered as a tree of dicts (`Explanation.tree`)
+or as text (`Explanation.text`).
+"""
+
+from ldpatch.observer import Observer
+from ldpatch.processor import PathConstraint
+from ldpatch.serializer import _bind, _cut, _path, _prefix, _term
+
+
+class Explanation(Observer):
+    """
+    The explanation of a patch evaluation.
+
+    The `StatementEvent`s are available in the ``events`` attribute.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def patch_started(self):
+        # pylint: disable=C0111
+        self.events = []
+
+    def statement_ended(self, event):
+        # pylint: disable=C0111
+        describe(event)
+        self.events.append(event)
+
+    def tree(self):
+        """
+        Return the explanation as a list of dicts (one per statement),
+        suitable for JSON serialization.
+        """
+        return [ explain_event(event) for event in self.events ]
+
+    def text(self):
+        """Return the explanation as text"""
+        lines = []
+        for i, node in enumerate(self.tree()):
+            line = u"%d %s  (%.6fs, visited %d, modified %d)" % (
+                i, node["statement"], node["duration"], node["visited"],
+                node["modified"])
+            if "error" in node:
+                line += u"  error: %s" % node["error"]
+            lines.append(line)
+            for step in node.get("steps", ()):
+                out = "!" if step["out"] is None else step["out"]
+                line = u"    %-40s %6s -> %-6s %.6fs" % (
+                    step["step"], step["in"], out, step["duration"])
+                if step.get("pruned"):
+                    line += u"  pruned %d" % step["pruned"]
+                lines.append(line)
+            if node.get("cells_walked") is not None:
+                lines.append(u"    cells walked %d, removed %d" % (
+                    node["cells_walked"], node["cells_removed"]))
+        return u"".join(u"{}\n".format(line) for line in lines)
+
+
+def explain_event(event):
+    """
+    Return a dict explaining `event` (an `ldpatch.observer.StatementEvent`),
+    as an item of `Explanation.tree`
+    """
+    ret = {
+        "statement": describe(event),
+        "duration": event.duration,
+        "visited": event.visited,
+        "modified": event.modified,
+    }
+    if event.error is not None:
+        ret["error"] = event.error.__class__.__name__
+    if event.statement == "bind":
+        ret["steps"] = steps = []
+        for step in event.steps:
+            step_node = {
+                "step": _path([step.step]).strip(),
+                "in": step.size_in,
+                "out": step.size_out,
+                "duration": step.duration,
+            }
+            if type(step.step) is PathConstraint \
+               and step.size_out is not None:
+                step_node["pruned"] = step.size_in - step.size_out
+            steps.append(step_node)
+    elif event.statement == "updatelist":
+        ret["cells_walked"] = event.cells_walked
+        ret["cells_removed"] = event.cells_removed
+    return ret
+
+def describe(event):
+    """
+    Return a short description of the statement of `event`.
+
+    It is computed from the arguments of the statement, so it must first
+    be called before the statement has ended (see `StatementEvent`);
+    it is then kept in ``event.description``.
+    """
+    if event.description is None:
+        event.description = _describe(event)
+    return event.description
+
+_SERIALIZERS = {
+    "prefix": _prefix,
+    "bind": _bind,
+    "cut": _cut,
+}
+
+def _describe(event):
+    """A short description of the statement of `event`"""
+    name, args = event.statement, event.args
+    if name in _SERIALIZERS:
+        # without the final " ."
+        return _SERIALIZERS[name](*args)[:-2]
+    elif name == "updatelist":
+        _, subject, predicate, aslice, _ = args
+        if aslice.idx1 is None:
+            slice_txt = u".."
+        else:
+            slice_txt = u"{}..{}".format(
+                aslice.idx1, "" if aslice.idx2 is None else aslice.idx2)
+        return u"UpdateList {} {} {}".format(_term(subject), _term(predicate),
+                                             slice_txt)
+    else:
+        flag = "addnew" if name == "add" else "delex"
+        if len(args) > 1:
+            checked = args[1]
+        else:
+            checked = event.kw.get(flag, False)
+        keyword = {
+            ("add", False): u"Add", ("add", True): u"AddNew",
+            ("delete", False): u"Delete", ("delete", True): u"DeleteExisting",
+        }[name, bool(checked)]
+        return u"{} ({} triples)".format(keyword, len(args[0]))
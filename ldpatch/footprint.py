@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I compute the footprint of an LD-Patch, without applying it.
+
+The footprint is a conservative approximation of the part of a graph
+that a patch may read or modify.
+It is expressed as sets of *keys*;
+a key is a (subject, predicate) pair,
+where any element may be ``ANY`` if it can not be statically determined
+(e.g. a variable bound through a path, or a Cut that may remove arcs
+with any predicate).
+
+Two patches whose footprints do not conflict can be applied concurrently
+to the same graph, and in any order.
+"""
+
+# pylint: disable=W0142
+
+from rdflib import BNode, RDF, URIRef as IRI, Variable
+
+from ldpatch.processor import InvIRI, PathConstraint, UNICITY_CONSTRAINT, \
+    UndefinedPrefixError
+
+
+class _AnySingleton(object):
+    """A singleton class for representing an unknown node in footprints"""
+    #pylint: disable=R0903
+    def __repr__(self):
+        return "ANY"
+ANY = _AnySingleton()
+
+
+def footprint(patch, baseiri=None, init_ns=None, init_var=None,
+              syntax="default"):
+    """
+    I parse `patch` (either a file-like or a string),
+    and return its `Footprint`, without applying it.
+
+    Parameters have the same meaning as for `ldpatch.apply`;
+    values in `init_var` are considered as statically known.
+    """
+    from ldpatch import _prepare
+    parser_class, patch, baseiri = _prepare(patch, baseiri, syntax)
+    processor = FootprintProcessor(init_ns, init_var)
+    parser_class(processor, baseiri).parseString(patch)
+    return processor.footprint
+
+
+class Footprint(object):
+    """
+    The read/write footprint of an LD Patch.
+
+    Attributes:
+    * ``reads``: the set of keys read by the patch
+    * ``writes``: the set of keys that the patch may modify
+    * ``added``: the triple templates of Add, AddNew and UpdateList
+    * ``deleted``: the triple templates of Delete and DeleteExisting
+    * ``lists``: the (subject, predicate) pairs of the lists
+      touched by UpdateList
+
+    NB: triple templates and list pairs may contain variables and bnodes,
+    except for variables whose value is statically known.
+    """
+
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+        self.added = []
+        self.deleted = []
+        self.lists = set()
+
+    @property
+    def subjects(self):
+        """The set of known subjects read or written by the patch"""
+        return { subj for subj, _ in self.reads | self.writes
+                 if subj is not ANY }
+
+    @property
+    def predicates(self):
+        """The set of known predicates read or written by the patch"""
+        return { pred for _, pred in self.reads | self.writes
+                 if pred is not ANY }
+
+    def may_affect(self, subject=ANY, predicate=ANY):
+        """
+        Whether the patch may modify arcs with the given subject
+        and predicate (e.g. to invalidate a cache entry).
+        """
+        return _overlaps(self.writes, [(subject, predicate)])
+
+    def conflicts_with(self, other):
+        """
+        Whether this footprint conflicts with `other`,
+        i.e. if one of them may write something that the other reads or writes.
+        """
+        return _overlaps(self.writes, other.writes) \
+            or _overlaps(self.writes, other.reads) \
+            or _overlaps(other.writes, self.reads)
+
+    def __repr__(self):
+        return "<Footprint reads={!r} writes={!r}>".format(
+            sorted(self.reads), sorted(self.writes))
+
+
+def _overlaps(keys1, keys2):
+    """
+    Whether some key in `keys1` may designate the same arcs as
+    some key in `keys2`.
+    """
+    if not keys1 or not keys2:
+        return False
+    subjects_by_pred = {}
+    for subj, pred in keys2:
+        subjects_by_pred.setdefault(pred, set()).add(subj)
+    all_subjects = set().union(*subjects_by_pred.values())
+    any_pred_subjects = subjects_by_pred.get(ANY, ())
+    for subj, pred in keys1:
+        if pred is ANY:
+            candidates = (all_subjects,)
+        else:
+            candidates = (subjects_by_pred.get(pred, ()), any_pred_subjects)
+        for subjects in candidates:
+            if subjects and (subj is ANY or subj in subjects
+                             or ANY in subjects):
+                return True
+    return False
+
+
+class FootprintProcessor(object):
+    """
+    An LD Patch processor computing the footprint of a patch,
+    instead of applying it.
+
+    The footprint is available as the ``footprint`` attribute.
+    """
+
+    def __init__(self, init_ns=None, init_vars=None):
+        self.footprint = Footprint()
+        self._namespaces = {}
+        self._constants = {}
+        if init_ns is not None:
+            self._namespaces.update(init_ns)
+        if init_vars is not None:
+            self._constants.update(init_vars)
+
+    # helper methods
+
+    def expand_pname(self, prefix, suffix=""):
+        """
+        Convert prefixed name to IRI.
+        """
+        iriprefix = self._namespaces.get(prefix)
+        if iriprefix is None:
+            raise UndefinedPrefixError(
+                "{}:{}".format(prefix, suffix))
+        return IRI(iriprefix + suffix)
+
+    def substitute(self, element):
+        """
+        Replace variables whose value is statically known,
+        and return anything else unchanged.
+        """
+        if type(element) is Variable:
+            return self._constants.get(element, element)
+        return element
+
+    def resolve(self, element):
+        """
+        Return `element` if it is statically known, ANY otherwise.
+        """
+        element = self.substitute(element)
+        if type(element) in (Variable, BNode):
+            return ANY
+        return element
+
+    def read_path(self, start, path):
+        """Record the keys read by `path` starting at `start`"""
+        reads = self.footprint.reads
+        subj = start
+        for step in path:
+            typstep = type(step)
+            if typstep is IRI:
+                reads.add((subj, step))
+                subj = ANY
+            elif typstep is InvIRI:
+                reads.add((ANY, step.iri))
+                subj = ANY
+            elif typstep is int:
+                if step == 0:
+                    reads.add((subj, RDF.first))
+                else:
+                    reads.update([(subj, RDF.rest), (ANY, RDF.rest),
+                                  (ANY, RDF.first)])
+                subj = ANY
+            elif typstep is PathConstraint:
+                self.read_path(subj, step.path)
+            elif step is not UNICITY_CONSTRAINT:
+                raise TypeError("Unrecognized path element {!r}".format(step))
+
+    def _record_triples(self, triples, templates, check):
+        """Record the keys written by an Add or Delete command"""
+        footprint = self.footprint
+        substitute = self.substitute
+        resolve = self.resolve
+        keys = set()
+        for subject, predicate, objct in triples:
+            templates.append((substitute(subject), substitute(predicate),
+                              substitute(objct)))
+            keys.add((resolve(subject), resolve(predicate)))
+        footprint.writes.update(keys)
+        if check:
+            footprint.reads.update(keys)
+
+    # ldpatch commands
+
+    def prefix(self, prefix, iri):
+        """Process a Prefix command"""
+        self._namespaces[prefix] = iri
+
+    def bind(self, variable, value, path=()):
+        """Process a Bind command"""
+        assert isinstance(variable, Variable)
+        path = list(path)
+        start = self.resolve(value)
+        self.read_path(start, path)
+        if start is not ANY and all(
+                type(step) is PathConstraint or step is UNICITY_CONSTRAINT
+                for step in path):
+            self._constants[variable] = start
+        else:
+            self._constants.pop(variable, None)
+
+    def add(self, add_graph, addnew=False, keep_bnodes=False):
+        """Process an Add or AddNew command"""
+        # pylint: disable=W0613
+        self._record_triples(add_graph, self.footprint.added, addnew)
+
+    def delete(self, del_graph, delex=False, keep_bnodes=False):
+        """Process a Delete or DeleteExisting command"""
+        # pylint: disable=W0613
+        self._record_triples(del_graph, self.footprint.deleted, delex)
+
+    def cut(self, var):
+        """Process a Cut command"""
+        # pylint: disable=W0613
+        # arcs with any predicate may be reached from the cut bnode
+        self.footprint.reads.add((ANY, ANY))
+        self.footprint.writes.add((ANY, ANY))
+
+    def updatelist(self, udl_graph, subject, predicate, aslice, udl_head):
+        """Process an UpdateList command"""
+        # pylint: disable=R0913,W0613
+        footprint = self.footprint
+        footprint.lists.add((self.substitute(subject),
+                             self.substitute(predicate)))
+        keys = [(self.resolve(subject), self.resolve(predicate)),
+                (ANY, RDF.first), (ANY, RDF.rest)]
+        if aslice.idx1 is not None and aslice.idx1 != aslice.idx2:
+            # removed items may be bnodes, which are then cut
+            keys.append((ANY, ANY))
+        footprint.reads.update(keys)
+        footprint.writes.update(keys)
+        # the items may be blank nodes with arcs of their own
+        self._record_triples(udl_graph, footprint.added, False)
+
+
+class RecordingProcessor(FootprintProcessor):
+    """
+    A footprint processor also recording the statements of the patch,
+    so that they can be replayed on another processor.
+
+    The statements are available in the ``statements`` attribute,
+    as (method name, args, kwargs) tuples.
+    """
+
+    def __init__(self, init_ns=None, init_vars=None):
+        FootprintProcessor.__init__(self, init_ns, init_vars)
+        self.statements = []
+
+    def prefix(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("prefix", args, kw))
+        FootprintProcessor.prefix(self, *args, **kw)
+
+    def bind(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("bind", args, kw))
+        FootprintProcessor.bind(self, *args, **kw)
+
+    def add(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("add", args, kw))
+        FootprintProcessor.add(self, *args, **kw)
+
+    def delete(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("delete", args, kw))
+        FootprintProcessor.delete(self, *args, **kw)
+
+    def cut(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("cut", args, kw))
+        FootprintProcessor.cut(self, *args, **kw)
+
+    def updatelist(self, *args, **kw):
+        # pylint: disable=C0111
+        self.statements.append(("updatelist", args, kw))
+        FootprintProcessor.updatelist(self, *args, **kw)
+
+    def replay(self, processor):
+        """Apply the recorded statements with `processor`"""
+        for name, args, kw in self.statements:
+            getattr(processor, name)(*args, **kw)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I implement a parser for a JSON syntax of LD-Patch.
+
+A patch is a JSON array of statements,
+each of them being an object with an ``op`` key::
+
+    [
+      {"op": "Prefix", "prefix": "foaf", "iri": "http://xmlns.com/foaf/0.1/"},
+      {"op": "Bind", "var": "x", "value": "<#me>",
+       "path": ["foaf:knows", {"path": ["foaf:name"], "value": {"@value": "Bob"}},
+                "!"]},
+      {"op": "Add", "triples": [["?x", "foaf:nick", {"@value": "bob"}]]},
+      {"op": "Delete", "triples": [["?x", "foaf:age", 42]]},
+      {"op": "Cut", "var": "y"},
+      {"op": "UpdateList", "subject": "?x", "predicate": "<#prefs>",
+       "slice": [1, 2], "list": [{"@value": "fr"}, {"@value": "en"}]}
+    ]
+
+``op`` can also be "AddNew" or "DeleteExisting".
+
+Nodes are strings:
+``<iri>`` (resolved against the base IRI), ``prefix:local``,
+``_:label`` (blank node) and ``?name`` (variable).
+Literals are JSON numbers and booleans,
+or objects with a ``@value`` and an optional ``@language`` or ``@type``.
+In triples, an object can also be a collection, as ``{"@list": [...]}``.
+
+Path elements are nodes (IRI steps), ``^``-prefixed nodes (inverse steps),
+integers (list indexes), ``"!"`` (unicity constraint), or objects with
+a ``path`` and an optional ``value`` (path constraints).
+
+A slice is a pair of indexes, where the second one can be ``null``
+(until the end); ``[null, null]`` means "after the end".
+"""
+
+from json import loads
+
+import rdflib
+
+from ldpatch.processor import InvIRI, PathConstraint, Slice, \
+    UNICITY_CONSTRAINT, Variable
+from ldpatch.syntax import add_collection, ParserError
+
+XSD = rdflib.XSD
+
+
+class _Number(unicode):
+    """
+    The lexical form of a non-integer JSON number.
+
+    Used as the ``parse_float`` hook of `json.loads`,
+    so that the literal keeps the form of the patch.
+    """
+    __slots__ = ()
+
+
+class JsonParser(object):
+    """
+    An LD Patch parser for the JSON syntax.
+
+    Arguments are the same as for `ldpatch.syntax.Parser`;
+    in strict mode, prefix declarations must appear first,
+    and Add[New]/Delete[Existing] must not be empty.
+    `chunk_size` is accepted for compatibility but has no effect,
+    as the whole JSON document is loaded at once.
+    """
+
+    def __init__(self, processor, baseiri, strict=False, chunk_size=None):
+        # pylint: disable=W0613
+        self.processor = processor
+        self.baseiri = rdflib.URIRef(baseiri)
+        self.strict = strict
+        self._commands = {
+            "Prefix": self._do_prefix,
+            "Bind": self._do_bind,
+            "Add": self._do_add,
+            "AddNew": self._do_add,
+            "Delete": self._do_delete,
+            "DeleteExisting": self._do_delete,
+            "Cut": self._do_cut,
+            "UpdateList": self._do_updatelist,
+        }
+
+    def parseString(self, txt):
+        """Parse txt as an LD Patch in JSON and apply it"""
+        try:
+            statements = loads(txt, parse_float=_Number)
+        except ValueError, ex:
+            raise ParserError(ex)
+        if type(statements) is not list:
+            raise ParserError("A JSON LD Patch must be an array")
+        in_prologue = True
+        for stmt in statements:
+            if type(stmt) is not dict:
+                raise ParserError("Statement must be an object: {!r}"
+                                  .format(stmt))
+            command = self._commands.get(stmt.get("op"))
+            if command is None:
+                raise ParserError("Unknown op in {!r}".format(stmt))
+            if command == self._do_prefix:
+                if self.strict and not in_prologue:
+                    raise ParserError("Prefix declaration can only appear at "
+                                      "the start (in strict mode)")
+            else:
+                in_prologue = False
+            command(stmt)
+
+    # statements
+
+    def _do_prefix(self, stmt):
+        # pylint: disable=C0111
+        self.processor.prefix(_get(stmt, "prefix", unicode),
+                              rdflib.URIRef(_get(stmt, "iri", unicode)))
+
+    def _do_bind(self, stmt):
+        # pylint: disable=C0111
+        variable = Variable(_get(stmt, "var", unicode))
+        value = self._term(_get(stmt, "value"))
+        path = self._path(stmt.get("path", []))
+        self.processor.bind(variable, value, path)
+
+    def _do_add(self, stmt):
+        # pylint: disable=C0111
+        self.processor.add(self._triples(stmt),
+                           addnew=(stmt["op"] == "AddNew"))
+
+    def _do_delete(self, stmt):
+        # pylint: disable=C0111
+        self.processor.delete(self._triples(stmt),
+                              delex=(stmt["op"] == "DeleteExisting"))
+
+    def _do_cut(self, stmt):
+        # pylint: disable=C0111
+        self.processor.cut(Variable(_get(stmt, "var", unicode)))
+
+    def _do_updatelist(self, stmt):
+        # pylint: disable=C0111
+        subject = self._node(_get(stmt, "subject"))
+        predicate = self._node(_get(stmt, "predicate"))
+        aslice = _get(stmt, "slice", list)
+        if len(aslice) != 2 or not all(
+                idx is None or type(idx) is int for idx in aslice):
+            raise ParserError("Invalid slice {!r}".format(aslice))
+        graph = []
+        head = self._collection(graph, _get(stmt, "list", list))
+        self.processor.updatelist(graph, subject, predicate, Slice(*aslice),
+                                  head)
+
+    # structures
+
+    def _triples(self, stmt):
+        """
+        Return the graph (a list of triples) of an Add or Delete statement
+        """
+        triples = _get(stmt, "triples", list)
+        if self.strict and not triples:
+            raise ParserError("Empty graph")
+        graph = []
+        add = graph.append
+        for triple in triples:
+            if type(triple) is not list or len(triple) != 3:
+                raise ParserError("Invalid triple {!r}".format(triple))
+            subj, pred, obj = triple
+            if type(obj) is dict and "@list" in obj:
+                obj = self._collection(graph, _get(obj, "@list", list))
+            else:
+                obj = self._term(obj)
+            add((self._node(subj), self._node(pred), obj))
+        return graph
+
+    def _collection(self, graph, items):
+        """Add the collection of `items` to `graph`, and return its head"""
+        if not items:
+            return rdflib.RDF.nil
+        return add_collection(graph, [ self._term(item) for item in items ])
+
+    def _path(self, path):
+        """Convert a JSON path to a list of path elements"""
+        if type(path) is not list:
+            raise ParserError("Invalid path {!r}".format(path))
+        ret = []
+        for step in path:
+            typstep = type(step)
+            if typstep is int:
+                ret.append(step)
+            elif typstep is dict:
+                value = step.get("value")
+                if value is not None:
+                    value = self._term(value)
+                ret.append(PathConstraint(self._path(_get(step, "path")),
+                                          value))
+            elif step == "!":
+                ret.append(UNICITY_CONSTRAINT)
+            elif typstep is unicode and step.startswith("^"):
+                ret.append(InvIRI(self._node(step[1:])))
+            else:
+                ret.append(self._node(step))
+        return ret
+
+    def _node(self, node):
+        """Convert a JSON string to an IRI, a bnode or a variable"""
+        if type(node) is not unicode or not node:
+            raise ParserError("Invalid node {!r}".format(node))
+        first = node[0]
+        if first == "<" and node[-1] == ">":
+            return rdflib.URIRef(node[1:-1], self.baseiri)
+        elif first == "?":
+            return Variable(node[1:])
+        elif node.startswith("_:"):
+            return rdflib.BNode(node[2:])
+        prefix, colon, suffix = node.partition(":")
+        if not colon:
+            raise ParserError("Invalid node {!r}".format(node))
+        return self.processor.expand_pname(prefix, suffix)
+
+    def _term(self, term):
+        """Convert a JSON value to a node or a literal"""
+        typterm = type(term)
+        if typterm is unicode:
+            return self._node(term)
+        elif typterm is bool:
+            return rdflib.Literal(term and "true" or "false",
+                                  datatype=XSD.boolean)
+        elif typterm is int or typterm is long:
+            return rdflib.Literal(unicode(term), datatype=XSD.integer)
+        elif typterm is _Number:
+            if "e" in term or "E" in term:
+                return rdflib.Literal(unicode(term), datatype=XSD.double)
+            return rdflib.Literal(unicode(term), datatype=XSD.decimal)
+        elif typterm is dict and "@value" in term:
+            value = _get(term, "@value", unicode)
+            datatype = term.get("@type")
+            if datatype is not None:
+                datatype = self._node(datatype)
+            return rdflib.Literal(value, term.get("@language"), datatype)
+        raise ParserError("Invalid term {!r}".format(term))
+
+
+def _get(obj, key, typ=None):
+    """Get a mandatory member of `obj`, optionally checking its type"""
+    try:
+        ret = obj[key]
+    except (KeyError, TypeError):
+        raise ParserError("Missing {!r} in {!r}".format(key, obj))
+    if typ is not None and type(ret) is not typ:
+        raise ParserError("Invalid {!r} in {!r}".format(key, obj))
+    return ret
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I account for the memory allocated while a patch is applied, by phase.
+
+`MemoryProfile` is an observer (see `ldpatch.observer`) using `tracemalloc`
+(part of the standard library since Python 3.4, available for Python 2
+with the pytracemalloc patch), which must be installed for this module
+to be imported::
+
+    profile = MemoryProfile()
+    apply(patch, graph, baseiri, observers=[profile])
+    print profile.report()
+
+The patch is split into phases: each statement, and *parsing*,
+i.e. everything happening between statements (including building the
+graph of an Add or Delete statement, which is done by the parser).
+For each phase, it reports:
+
+* the *peak*: the highest amount of memory allocated during the phase
+  (above what was allocated before it);
+* the *retained* memory: the memory allocated during the phase
+  and still allocated at its end (e.g. the triples added to the store).
+
+Design note
+-----------
+
+Between phases, traces are cleared (`tracemalloc.clear_traces`),
+which resets both counters of `tracemalloc.get_traced_memory`.
+As a consequence, memory freed during a phase is only accounted for
+if it was allocated during the same phase, and traces collected by other
+users of `tracemalloc` are lost: this mode is meant for diagnosis,
+not for production.
+"""
+
+import tracemalloc
+
+from ldpatch.observer import Observer
+
+
+class MemoryProfile(Observer):
+    """
+    I account for the memory allocated by each phase of a patch
+    (see the module docstring).
+
+    Attributes:
+    * ``parsing``: a (peak, retained) pair of byte counts for parsing
+      (the peak being the highest of all parsing phases,
+      the retained memory their sum)
+    * ``statements``: a list of (`StatementEvent`, peak, retained) tuples
+    * ``top``: if ``top_lines`` was given, the list of the
+      `tracemalloc.Statistic` of the lines having allocated the most memory
+      during each statement, in the same order as ``statements``
+    """
+
+    def __init__(self, top_lines=0):
+        self.top_lines = top_lines
+        self.parsing = (0, 0)
+        self.statements = []
+        self.top = []
+        self._started = False
+
+    def _end_phase(self):
+        """
+        Return the (peak, retained) memory of the current phase,
+        and start a new one
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.clear_traces()
+        return peak, current
+
+    def _end_parsing(self):
+        """End the current parsing phase"""
+        peak, retained = self._end_phase()
+        old_peak, old_retained = self.parsing
+        self.parsing = (max(peak, old_peak), retained + old_retained)
+
+    def patch_started(self):
+        # pylint: disable=C0111
+        self.parsing = (0, 0)
+        self.statements = []
+        self.top = []
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        tracemalloc.clear_traces()
+
+    def patch_ended(self, error=None):
+        # pylint: disable=C0111
+        self._end_parsing()
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def statement_started(self, event):
+        # pylint: disable=C0111
+        self._end_parsing()
+
+    def statement_ended(self, event):
+        # pylint: disable=C0111
+        if self.top_lines:
+            statistics = tracemalloc.take_snapshot().statistics("lineno")
+            self.top.append(statistics[:self.top_lines])
+        peak, retained = self._end_phase()
+        self.statements.append((event, peak, retained))
+
+    @property
+    def peak(self):
+        """The highest peak of all phases, in bytes"""
+        return max([self.parsing[0]]
+                   + [ peak for _, peak, _ in self.statements ])
+
+    @property
+    def retained(self):
+        """The memory retained by all phases, in bytes"""
+        return self.parsing[1] + sum(retained
+                                     for _, _, retained in self.statements)
+
+    def by_statement(self):
+        """
+        Return a dict giving, for each kind of statement,
+        a (count, peak, retained) tuple, where peak is the highest peak.
+        """
+        ret = {}
+        for event, peak, retained in self.statements:
+            count, old_peak, old_retained = ret.get(event.statement, (0, 0, 0))
+            ret[event.statement] = (count + 1, max(peak, old_peak),
+                                    retained + old_retained)
+        return ret
+
+    def report(self):
+        """Return a text report of the memory profile"""
+        lines = []
+        lines.append("%-10s %6s %12s %12s" % (
+            "phase", "count", "peak", "retained"))
+        lines.append("%-10s %6s %12d %12d" % (
+            "parsing", "", self.parsing[0], self.parsing[1]))
+        for statement, (count, peak, retained) in sorted(
+                self.by_statement().iteritems()):
+            lines.append("%-10s %6d %12d %12d" % (
+                statement, count, peak, retained))
+        lines.append("%-10s %6s %12d %12d" % (
+            "total", "", self.peak, self.retained))
+        for i, stats in enumerate(self.top):
+            lines.append("")
+            lines.append("statement %d (%s):" % (
+                i, self.statements[i][0].statement))
+            for stat in stats:
+                lines.append("    %s" % stat)
+        return "\n".join(lines) + "\n"
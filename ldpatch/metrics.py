@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I maintain process-wide metrics about the patches applied.
+
+`PatchProcessor` keeps plain counters while a patch is applied
+(see its docstring); `ldpatch.apply` and `ldpatch.iterapply` then add them
+to `METRICS` once per patch, so the graph itself is never wrapped,
+and the lock protecting the metrics is only taken once per patch.
+
+The metrics are available as a dict (`Metrics.snapshot`)
+or in the Prometheus text exposition format (`Metrics.prometheus`).
+"""
+
+from threading import Lock
+
+#: the upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram(object):
+    """
+    A histogram of values, with cumulative `BUCKETS`.
+
+    Attributes:
+    * ``buckets``: the number of values lower than or equal to each bound
+      in `BUCKETS`
+    * ``count``, ``sum``: the number and the sum of all values
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add `value` to the histogram"""
+        buckets = self.buckets
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return the histogram as a dict"""
+        return {
+            "buckets": dict(zip(BUCKETS, self.buckets)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class Metrics(object):
+    """
+    Counters and histograms about the patches applied.
+
+    See `snapshot` for the available metrics.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all metrics to 0"""
+        with self._lock:
+            self._patches = {"success": 0, "error": 0}
+            self._statements = {}
+            self._triples = {"added": 0, "removed": 0}
+            self._calls = {"triples": 0, "value": 0}
+            self._errors = {}
+            self._parse = Histogram()
+            self._execute = Histogram()
+
+    def record(self, processor, parsing, error=None):
+        """
+        Add the counters of `processor` (a `PatchProcessor`)
+        after it applied a patch,
+        which took `parsing` seconds of parsing (or anything but statements),
+        and raised `error` (if not None).
+
+        `processor` is None if the patch failed before being executed.
+        """
+        with self._lock:
+            self._patches["error" if error is not None else "success"] += 1
+            if error is not None:
+                key = (error.__class__.__name__,
+                       getattr(error, "statusCode", None))
+                self._errors[key] = self._errors.get(key, 0) + 1
+            self._parse.observe(parsing)
+            if processor is None:
+                return
+            statements = self._statements
+            for name, count in processor.counts.iteritems():
+                statements[name] = statements.get(name, 0) + count
+            self._triples["added"] += processor.triples_added
+            self._triples["removed"] += processor.triples_removed
+            self._calls["triples"] += processor.triples_calls
+            self._calls["value"] += processor.value_calls
+            self._execute.observe(processor.executing)
+
+    def snapshot(self):
+        """
+        Return the metrics as a dict, with the following keys:
+        * ``patches``: the number of patches, by outcome
+          ("success" or "error")
+        * ``statements``: the number of statements executed, by name
+        * ``triples``: the number of triples "added" and "removed"
+        * ``store_calls``: the number of calls to the "triples" and "value"
+          methods of graphs
+        * ``errors``: the number of errors, by (class name, statusCode) pair
+        * ``parse_seconds``, ``execute_seconds``: the histograms (as dicts)
+          of the time spent, per patch, in parsing and in executing statements
+        """
+        with self._lock:
+            return {
+                "patches": dict(self._patches),
+                "statements": dict(self._statements),
+                "triples": dict(self._triples),
+                "store_calls": dict(self._calls),
+                "errors": dict(self._errors),
+                "parse_seconds": self._parse.snapshot(),
+                "execute_seconds": self._execute.snapshot(),
+            }
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        def counter(name, doc, label, values):
+            """Add the lines of a counter with one label"""
+            lines.append("# HELP {} {}".format(name, doc))
+            lines.append("# TYPE {} counter".format(name))
+            for key, value in sorted(values.iteritems()):
+                lines.append('{}{{{}="{}"}} {}'.format(name, label, key, value))
+
+        counter("ldpatch_patches_total", "Patches applied, by outcome.",
+                "outcome", snapshot["patches"])
+        counter("ldpatch_statements_total", "Statements executed, by name.",
+                "statement", snapshot["statements"])
+        counter("ldpatch_triples_total",
+                "Triples added to or removed from graphs.",
+                "change", snapshot["triples"])
+        counter("ldpatch_store_calls_total",
+                "Calls to the triples and value methods of graphs.",
+                "method", snapshot["store_calls"])
+        lines.append("# HELP ldpatch_errors_total "
+                     "Patches failed, by error class and status code.")
+        lines.append("# TYPE ldpatch_errors_total counter")
+        for (error, status), value in sorted(snapshot["errors"].iteritems()):
+            lines.append('ldpatch_errors_total{{error="{}",status_code="{}"}} {}'
+                         .format(error, status or "", value))
+
+        for name, doc in (
+                ("parse_seconds", "Time spent in parsing, per patch."),
+                ("execute_seconds", "Time spent in executing statements, "
+                                    "per patch.")):
+            histogram = snapshot[name]
+            name = "ldpatch_" + name
+            lines.append("# HELP {} {}".format(name, doc))
+            lines.append("# TYPE {} histogram".format(name))
+            for bound in BUCKETS:
+                lines.append('{}_bucket{{le="{}"}} {}'.format(
+                    name, bound, histogram["buckets"][bound]))
+            lines.append('{}_bucket{{le="+Inf"}} {}'.format(
+                name, histogram["count"]))
+            lines.append("{}_sum {}".format(name, repr(histogram["sum"])))
+            lines.append("{}_count {}".format(name, histogram["count"]))
+        return "".join("{}\n".format(line) for line in lines)
+
+
+METRICS = Metrics()
+""" The process-wide metrics, maintained by `ldpatch.apply`. """
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I define the observers that `PatchProcessor` notifies of each statement.
+
+Observers are passed to `ldpatch.apply` (or to `PatchProcessor`)
+with the `observers` parameter; when none is given,
+statements are executed without any instrumentation.
+
+`Profile` is an observer aggregating the events of a patch into a report,
+distinguishing the time spent in parsing from the time spent
+in each statement.
+"""
+
+from collections import namedtuple
+from time import time
+
+
+class StatementEvent(object):
+    """
+    The execution of a statement by a `PatchProcessor`.
+
+    Attributes:
+    * ``statement``: the name of the statement, i.e. the name of the
+      processor method ("prefix", "bind", "add", "delete", "cut"
+      or "updatelist")
+    * ``args``, ``kw``: the positional and keyword arguments of the method;
+      they are only available until observers are notified of the end
+      of the statement (then None), so that retained events do not keep
+      the triples of Add or Delete statements in memory
+    * ``description``: a short description of the statement, set by
+      observers needing it (see `ldpatch.explain.describe`)
+    * ``start``: the time at which the statement started
+    * ``duration``: its duration, in seconds (None until it ends)
+    * ``visited``: the number of triples read
+      (see `ldpatch.processor.PatchProcessor`)
+    * ``modified``: the number of triples written
+    * ``frontiers``: for Bind, the number of nodes after each path step
+    * ``steps``: for Bind, a `PathStep` for each path step
+    * ``cells_walked``, ``cells_removed``: for UpdateList, the number of
+      list cells walked to find the slice, and removed from the list
+    * ``error``: the exception raised by the statement, if any
+
+    NB: ``visited``, ``modified``, ``frontiers`` and ``steps``
+    are only complete when the statement has ended.
+    """
+    # pylint: disable=R0902,R0903
+
+    def __init__(self, statement, args, kw):
+        self.statement = statement
+        self.args = args
+        self.kw = kw
+        self.description = None
+        self.start = time()
+        self.duration = None
+        self.visited = 0
+        self.modified = 0
+        self.frontiers = []
+        self.steps = []
+        self.cells_walked = None
+        self.cells_removed = None
+        self.error = None
+
+    def __repr__(self):
+        return "<StatementEvent {} {:.6f}s>".format(self.statement,
+                                                   self.duration or 0.0)
+
+
+PathStep = namedtuple("PathStep", ["step", "size_in", "size_out", "duration"])
+""" The evaluation of a path step in a Bind statement.
+
+    * ``step``: the path element (as passed to `PatchProcessor.do_path_step`)
+    * ``size_in``: the number of nodes before the step
+    * ``size_out``: the number of nodes after the step
+      (None if the step raised a `NoUniqueMatchError`)
+    * ``duration``: the duration of the step, in seconds
+"""
+
+
+class Observer(object):
+    """
+    The interface of observers; every method does nothing by default.
+    """
+
+    def patch_started(self):
+        """Called before a patch is parsed"""
+        pass
+
+    def patch_ended(self, error=None):
+        """
+        Called after a patch has been applied,
+        or has failed with exception `error`
+        """
+        pass
+
+    def statement_started(self, event):
+        """Called before a statement is executed, with a `StatementEvent`"""
+        pass
+
+    def statement_ended(self, event):
+        """Called after a statement is executed, with a `StatementEvent`"""
+        pass
+
+
+class Profile(Observer):
+    """
+    I aggregate the `StatementEvent`s of a patch.
+
+    Attributes:
+    * ``events``: the list of `StatementEvent`s
+    * ``duration``: the total duration of the patch, in seconds
+
+    See also `report`.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.duration = None
+        self._start = None
+
+    def patch_started(self):
+        # pylint: disable=C0111
+        self.events = []
+        self.duration = None
+        self._start = time()
+
+    def patch_ended(self, error=None):
+        # pylint: disable=C0111
+        self.duration = time() - self._start
+
+    def statement_ended(self, event):
+        # pylint: disable=C0111
+        self.events.append(event)
+
+    @property
+    def executing(self):
+        """The time spent in executing statements, in seconds"""
+        return sum(event.duration for event in self.events)
+
+    @property
+    def parsing(self):
+        """The time spent in parsing (and anything but statements), in seconds"""
+        if self.duration is None:
+            return None
+        return max(self.duration - self.executing, 0.0)
+
+    def by_statement(self):
+        """
+        Return a dict giving, for each kind of statement, a
+        (count, duration, visited, modified) tuple.
+        """
+        ret = {}
+        for event in self.events:
+            count, duration, visited, modified = \
+                ret.get(event.statement, (0, 0.0, 0, 0))
+            ret[event.statement] = (count + 1, duration + event.duration,
+                                    visited + event.visited,
+                                    modified + event.modified)
+        return ret
+
+    def report(self):
+        """Return a text report of the profile"""
+        lines = []
+        if self.duration is not None:
+            lines.append("total       %10.6fs" % self.duration)
+            lines.append("parsing     %10.6fs" % self.parsing)
+        lines.append("executing   %10.6fs" % self.executing)
+        lines.append("")
+        lines.append("%-10s %6s %11s %10s %10s" % (
+            "statement", "count", "time", "visited", "modified"))
+        for statement, (count, duration, visited, modified) in sorted(
+                self.by_statement().iteritems(), key=lambda i: -i[1][1]):
+            lines.append("%-10s %6d %10.6fs %10d %10d" % (
+                statement, count, duration, visited, modified))
+        lines.append("")
+        for i, event in enumerate(self.events):
+            line = "%4d %-10s %10.6fs %10d %10d" % (
+                i, event.statement, event.duration, event.visited,
+                event.modified)
+            if event.frontiers:
+                line += "  frontiers: %s" % " ".join(
+                    str(frontier) for frontier in event.frontiers)
+            if event.error is not None:
+                line += "  error: %s" % event.error.__class__.__name__
+            lines.append(line)
+        return "\n".join(lines) + "\n"
@@ -24,6 +24,7 @@ I implement a processor executing an LD-Patch.
 # pylint: disable=W0142,R0801
 
 from collections import namedtuple
+from time import time
 
 from rdflib import BNode, RDF, URIRef as IRI, Variable
 from rdflib.exceptions import UniquenessError
@@ -53,25 +54,48 @@ class _UnicityConstraintSingleton(object):
         return "UNICITY_CONSTRAINT"
 UNICITY_CONSTRAINT = _UnicityConstraintSingleton()
 
+_BudgetBase = namedtuple("Budget", ["max_frontier", "max_visited",
+                                    "max_modified", "timeout"])
+class Budget(_BudgetBase):
+    """The resources that a PatchProcessor is allowed to use.
+
+    * max_frontier: the maximum number of nodes after any path step
+    * max_visited: the maximum number of triples read from the graph
+    * max_modified: the maximum number of triples added or removed
+    * timeout: the maximum duration (in seconds) of the whole patch
+
+    None means "unlimited".
+    """
+    #pylint: disable=R0903
+    def __new__(cls, max_frontier=None, max_visited=None, max_modified=None,
+                timeout=None):
+        return _BudgetBase.__new__(cls, max_frontier, max_visited,
+                                   max_modified, timeout)
+
+
+_STATEMENTS = ("prefix", "bind", "add", "delete", "cut", "updatelist")
 
 def _get_last_node(graph, lst):
     """
-    Find the last node of a non-empty list
+    Find the last node of a non-empty list,
+    and return it with the number of cells of the list
     """
     assert lst != RDF.nil
     last = lst
     graph_value = graph.value
+    cells = 0
     while True:
         try:
             nxt = graph_value(last, RDF.rest, any=False)
         except UniquenessError:
             nxt = None
+        cells += 1
         if nxt is None:
             raise ValueError("Malformed list passed to UpdateList")
         if nxt == RDF.nil:
             break
         last = nxt
-    return last
+    return last, cells
 
 def _get_list_length(graph, lst):
     """
@@ -89,24 +113,152 @@ def _get_list_length(graph, lst):
         ret += 1
     return ret
 
+def _get_native(graph, name):
+    """
+    Return the set-based operation `name` of `graph` or of its store,
+    or None if they do not provide it.
+    """
+    ret = getattr(graph, name, None)
+    if ret is None:
+        ret = getattr(getattr(graph, "store", None), name, None)
+    return ret
+
 
 class PatchProcessor(object):
     """
     An object actually doing the ldpatch
+
+    If a `Budget` is provided, the processor stops (raising a subclass of
+    `BudgetExceededError`) as soon as one of its limits is exceeded.
+    The numbers of triples visited and modified so far are available
+    in the ``visited`` and ``modified`` attributes
+    (for path steps evaluated natively by the store, ``visited`` counts
+    the distinct nodes reached rather than the triples read).
+
+    Some counters are also maintained for `ldpatch.metrics`:
+    * ``counts``: the number of statements successfully executed, by name
+      (e.g. "bind", "updatelist")
+    * ``executing``: the time spent in executing statements, in seconds
+    * ``triples_calls``, ``value_calls``: the number of calls to the
+      ``triples`` and ``value`` methods of the graph
+    * ``triples_added``, ``triples_removed``: the number of triples
+      passed to the ``add`` and ``remove`` methods of the graph
+      (whether or not they were already in the graph)
+
+    If `observers` are provided (see `ldpatch.observer`),
+    they are notified of the start and end of each statement
+    (or of each chunk of a statement, see `add`).
     """
 
-    def __init__(self, graph, init_ns=None, init_vars=None):
+    def __init__(self, graph, init_ns=None, init_vars=None, budget=None,
+                 observers=None):
+        # pylint: disable=R0913
         self._graph = graph
+        # set-based operations provided by some graphs or stores
+        # (see ldpatch.sqlitestore, ldpatch.compactstore and ldpatch.csr)
+        self._path_step = _get_native(graph, "path_step")
+        self._native_cut = _get_native(graph, "cut")
+        self._list_walk = _get_native(graph, "list_walk")
         self._namespaces = {}
         self._variables = {}
         self._bnodes = {}
+        # triples changed by the previous chunks of a partial statement
+        self._chunks = set()
         if init_ns is not None:
             self._namespaces.update(init_ns)
         if init_vars is not None:
             self._variables.update(init_vars)
+        self.visited = 0
+        self.modified = 0
+        self.counts = dict.fromkeys(_STATEMENTS, 0)
+        self.executing = 0.0
+        self.triples_calls = self.value_calls = 0
+        self.triples_added = self.triples_removed = 0
+        self._budget = budget
+        self._deadline = None
+        self._cancelled = False
+        if budget is not None and budget.timeout is not None:
+            self._deadline = time() + budget.timeout
+        self._event = None
+        if observers:
+            # instrument statements only if required
+            for name in _STATEMENTS:
+                setattr(self, name,
+                        self._observed(name, getattr(self, name), observers))
+
+    def _observed(self, name, method, observers):
+        """
+        Wrap the statement `method` so that `observers` are notified of it
+        """
+        from ldpatch.observer import StatementEvent
+        def wrapper(*args, **kw):
+            # pylint: disable=C0111
+            if self._event is not None:
+                # nested call (e.g. add or cut inside updatelist)
+                return method(*args, **kw)
+            event = self._event = StatementEvent(name, args, kw)
+            visited, modified = self.visited, self.modified
+            for observer in observers:
+                observer.statement_started(event)
+            try:
+                return method(*args, **kw)
+            except Exception, ex:
+                event.error = ex
+                raise
+            finally:
+                event.duration = time() - event.start
+                event.visited = self.visited - visited
+                event.modified = self.modified - modified
+                self._event = None
+                for observer in observers:
+                    observer.statement_ended(event)
+                event.args = event.kw = None
+        return wrapper
+
+    def _account(self, name, start, partial=False):
+        """
+        Account for statement `name`, started at time `start`
+        (only counted once complete, i.e. if not `partial`)
+        """
+        if not partial:
+            self.counts[name] += 1
+        self.executing += time() - start
 
     # helper methods
 
+    def check_budget(self, frontier=None):
+        """
+        Raise a `BudgetExceededError` if the budget is exceeded,
+        or if the processor has been cancelled.
+        """
+        budget = self._budget
+        if budget is None:
+            return
+        if self._cancelled:
+            raise PatchCancelledError()
+        if frontier is not None and budget.max_frontier is not None \
+           and frontier > budget.max_frontier:
+            raise FrontierBudgetError(frontier, budget.max_frontier)
+        if budget.max_visited is not None \
+           and self.visited > budget.max_visited:
+            raise VisitedBudgetError(self.visited, budget.max_visited)
+        if budget.max_modified is not None \
+           and self.modified > budget.max_modified:
+            raise ModifiedBudgetError(self.modified, budget.max_modified)
+        if self._deadline is not None and time() > self._deadline:
+            raise DeadlineExceededError(budget.timeout)
+
+    def cancel(self):
+        """
+        Request this processor to stop as soon as possible;
+        it will then raise a `PatchCancelledError`.
+
+        This can be called from another thread.
+        """
+        self._cancelled = True
+        if self._budget is None:
+            self._budget = Budget()
+
     def expand_pname(self, prefix, suffix=""):
         """
         Convert prefixed name to IRI.
@@ -145,21 +297,35 @@ class PatchProcessor(object):
             ret = element
         return ret
 
+    def _get_stable_node(self, element):
+        """
+        Like `get_node`, but return bnodes unchanged.
+        """
+        if type(element) is BNode:
+            return element
+        return self.get_node(element)
+
     def do_path_step(self, nodeset, pathelt):
         """Process one step of a Path Expression"""
         typelt = type(pathelt)
         if typelt is IRI:
-            return { trpl[2]
-                     for subj in nodeset
-                     for trpl in self._graph.triples((subj, pathelt, None))
-                   }
+            if self._path_step is None:
+                return self._triples_step(nodeset, pathelt, False)
+            ret = self._path_step(nodeset, pathelt)
+            self.visited += len(ret)
+            if self._budget is not None:
+                self.check_budget(len(ret))
+            return ret
         elif typelt is InvIRI:
-            return { trpl[0]
-                     for obj in nodeset
-                     for trpl in self._graph.triples((None, pathelt.iri, obj))
-                   }
+            if self._path_step is None:
+                return self._triples_step(nodeset, pathelt.iri, True)
+            ret = self._path_step(nodeset, pathelt.iri, True)
+            self.visited += len(ret)
+            if self._budget is not None:
+                self.check_budget(len(ret))
+            return ret
         elif typelt is int:
-            ret = set(nodeset)
+            ret = nodeset
             for _ in range(pathelt):
                 ret = self.do_path_step(ret, RDF.rest)
             ret = self.do_path_step(ret, RDF.first)
@@ -173,6 +339,57 @@ class PatchProcessor(object):
         else:
             raise TypeError("Unrecognized path element {!r}".format(pathelt))
 
+    def _triples_step(self, nodeset, predicate, inverse):
+        """
+        Process an IRI step (or an inverse one) with the ``triples`` method
+        of the graph, checking the budget after each node of `nodeset`,
+        so that a step fanning out over the graph is stopped early.
+        """
+        triples = self._graph.triples
+        if self._budget is None:
+            if inverse:
+                found = [ trpl[0] for node in nodeset
+                          for trpl in triples((None, predicate, node)) ]
+            else:
+                found = [ trpl[2] for node in nodeset
+                          for trpl in triples((node, predicate, None)) ]
+            self.triples_calls += len(nodeset)
+            self.visited += len(found)
+            return set(found)
+        ret = set()
+        add = ret.add
+        for node in nodeset:
+            visited = 0
+            if inverse:
+                for trpl in triples((None, predicate, node)):
+                    add(trpl[0])
+                    visited += 1
+            else:
+                for trpl in triples((node, predicate, None)):
+                    add(trpl[2])
+                    visited += 1
+            self.triples_calls += 1
+            self.visited += visited
+            self.check_budget(len(ret))
+        return ret
+
+    def _observed_path_step(self, event, nodeset, pathelt):
+        """
+        Process one step of the path of a Bind,
+        recording it in `event` (see `ldpatch.observer.StatementEvent`)
+        """
+        from ldpatch.observer import PathStep
+        size_in = len(nodeset)
+        start = time()
+        try:
+            ret = self.do_path_step(nodeset, pathelt)
+        except NoUniqueMatchError:
+            event.steps.append(PathStep(pathelt, size_in, None, time() - start))
+            raise
+        event.steps.append(PathStep(pathelt, size_in, len(ret), time() - start))
+        event.frontiers.append(len(ret))
+        return ret
+
     def test_path_constraint(self, node, constraint):
         """Check a constraint in a Path Expression"""
         nodeset = {node}
@@ -201,16 +418,76 @@ class PatchProcessor(object):
     def prefix(self, prefix, iri):
         """Process a Prefix command"""
         self._namespaces[prefix] = iri
+        self.counts["prefix"] += 1
 
     def bind(self, variable, value, path=()):
         """Process a Bind command"""
+        start = time()
+        self._bind(variable, value, path)
+        self._account("bind", start)
+
+    def add(self, add_graph, addnew=False, keep_bnodes=False, partial=False):
+        """Process an Add or AnnNew command
+
+        `add_graph` is a sized iterable of triples, e.g. a list
+        (as produced by the parsers) or an rdflib Graph;
+        it may contain duplicates.
+
+        If `keep_bnodes` is true, blank nodes in `add_graph` denote
+        themselves, rather than fresh blank nodes (as in RDF Patch).
+
+        If `partial` is true, `add_graph` is only a chunk of the statement,
+        and the next call will process the next chunk
+        (the last one with `partial` false).
+        AddNew does not fail on the triples added by the previous chunks,
+        so it keeps them in memory until the last one.
+        """
+        # pylint: disable=R0913
+        start = time()
+        self._add(add_graph, addnew, keep_bnodes, partial)
+        self._account("add", start, partial)
+
+    def delete(self, del_graph, delex=False, keep_bnodes=False,
+               partial=False):
+        """Process a Delete or DeleteExisting command
+
+        See `add` for `del_graph`, `keep_bnodes` and `partial`.
+        """
+        # pylint: disable=R0913
+        start = time()
+        self._delete(del_graph, delex, keep_bnodes, partial)
+        self._account("delete", start, partial)
+
+    def cut(self, var, _override=None):
+        """Process a Cut command"""
+        start = time()
+        self._cut(_override or self.get_node(var))
+        self._account("cut", start)
+
+    def updatelist(self, udl_graph, subject, predicate, aslice, udl_head):
+        """Process an UpdateList command"""
+        # pylint: disable=R0913
+        start = time()
+        self._updatelist(udl_graph, subject, predicate, aslice, udl_head)
+        self._account("updatelist", start)
+
+    # implementation of ldpatch commands
+
+    def _bind(self, variable, value, path):
+        """Implement `bind`"""
         assert isinstance(variable, Variable)
         path = list(path)
+        if self._budget is not None:
+            self.check_budget()
 
         nodeset = {self.get_node(value)}
+        event = self._event
         try:
             for step in path:
-                nodeset = self.do_path_step(nodeset, step)
+                if event is None:
+                    nodeset = self.do_path_step(nodeset, step)
+                else:
+                    nodeset = self._observed_path_step(event, nodeset, step)
         except NoUniqueMatchError, ex:
             ex.variable = variable
             raise
@@ -218,89 +495,174 @@ class PatchProcessor(object):
             raise NoUniqueMatchError(variable, "end", nodeset)
         self._variables[variable] =  iter(nodeset).next()
 
-    def add(self, add_graph, addnew=False):
-        """Process an Add or AnnNew command"""
-        get_node = self.get_node
+    def _add(self, add_graph, addnew=False, keep_bnodes=False, partial=False):
+        """Implement `add`"""
+        self.modified += len(add_graph)
+        if self._budget is not None:
+            self.check_budget()
+        get_node = self._get_stable_node if keep_bnodes else self.get_node
         graph = self._graph
         graph_add = graph.add
-        for subject, predicate, objct in add_graph:
-            subject = get_node(subject)
-            predicate = get_node(predicate)
-            objct = get_node(objct)
-            triple = (subject, predicate, objct)
-            if addnew and triple in graph:
-                raise AddNewError(triple)
-            graph_add(triple)
-
-    def delete(self, del_graph, delex=False):
-        """Process a Delete or DeleteExisting command"""
-        get_node = self.get_node
+        if addnew:
+            # checked beforehand, as add_graph may contain duplicates,
+            # also in the previous chunks of the statement
+            chunks = self._chunks
+            triples = [ (get_node(subject), get_node(predicate),
+                         get_node(objct))
+                        for subject, predicate, objct in add_graph ]
+            for triple in triples:
+                if triple in graph and triple not in chunks:
+                    raise AddNewError(triple)
+            for triple in triples:
+                graph_add(triple)
+            if partial:
+                chunks.update(triples)
+            else:
+                chunks.clear()
+        else:
+            for subject, predicate, objct in add_graph:
+                graph_add((get_node(subject), get_node(predicate),
+                           get_node(objct)))
+        self.triples_added += len(add_graph)
+
+    def _delete(self, del_graph, delex, keep_bnodes, partial=False):
+        """Implement `delete`"""
+        self.modified += len(del_graph)
+        if self._budget is not None:
+            self.check_budget()
+        get_node = self._get_stable_node if keep_bnodes else self.get_node
         graph = self._graph
         graph_rem = graph.remove
-        for subject, predicate, objct in del_graph:
-            subject = get_node(subject)
-            predicate = get_node(predicate)
-            objct= get_node(objct)
-            triple = (subject, predicate, objct)
-            if delex and triple not in graph:
-                raise DeleteExistingError(triple)
-            graph_rem(triple)
-
-    def cut(self, var, _override=None):
-        """Process a Cut command"""
-        if _override:
-            start = _override
+        if delex:
+            # checked beforehand, as del_graph may contain duplicates,
+            # also in the previous chunks of the statement
+            chunks = self._chunks
+            triples = [ (get_node(subject), get_node(predicate),
+                         get_node(objct))
+                        for subject, predicate, objct in del_graph ]
+            for triple in triples:
+                if triple not in graph and triple not in chunks:
+                    raise DeleteExistingError(triple)
+            for triple in triples:
+                graph_rem(triple)
+            if partial:
+                chunks.update(triples)
+            else:
+                chunks.clear()
         else:
-            start = self.get_node(var)
+            for subject, predicate, objct in del_graph:
+                graph_rem((get_node(subject), get_node(predicate),
+                           get_node(objct)))
+        self.triples_removed += len(del_graph)
+
+    def _cut(self, start):
+        """Implement `cut`, starting from node `start`"""
         if type(start) is not BNode:
             raise CutExpectsBnodeError()
 
-        did_something = False
+        if self._native_cut is not None:
+            count = self._native_cut(start)
+            self.visited += count
+            self.modified += count
+            self.triples_removed += count
+            if not count:
+                raise CurRemovedNothing()
+            if self._budget is not None:
+                self.check_budget()
+            return
+
+        count = synced = 0
         get_triples = self._graph.triples
         rem_triple = self._graph.remove
+        check = self._budget is not None
         queue = [start,]
         while queue:
             bnode = queue.pop()
+            self.triples_calls += 1
             for trpl in get_triples((bnode, None, None)):
-                did_something = True
+                count += 1
                 rem_triple(trpl)
                 if type(trpl[2]) is BNode:
                     queue.append(trpl[2])
+            if check:
+                self.visited += count - synced
+                self.modified += count - synced
+                synced = count
+                self.check_budget()
+        self.triples_calls += 1
         for trpl in get_triples((None, None, start)):
-            did_something = True
+            count += 1
             rem_triple(trpl)
-        if not did_something:
+        self.visited += count - synced
+        self.modified += count - synced
+        self.triples_removed += count
+        if not count:
             raise CurRemovedNothing()
 
 
-    def updatelist(self, udl_graph, subject, predicate, aslice, udl_head):
-        """Process an UpdateList command"""
+    def _get_list_length(self, lst):
+        """
+        Find the length of an RDF list
+        """
+        if self._list_walk is None:
+            ret = _get_list_length(self._graph, lst)
+            self.value_calls += ret
+            return ret
+        cells = self._list_walk(lst)
+        if cells[-1] != RDF.nil:
+            raise MalformedListError()
+        return len(cells) - 1
+
+    def _updatelist(self, udl_graph, subject, predicate, aslice, udl_head):
+        """Implement `updatelist`"""
         #pylint: disable=R0912,R0913,R0914,R0915
         try:
             target = self._graph
+            check = self._budget is not None
             spre = self.get_node(subject)
             ppre = self.get_node(predicate)
             try:
                 opre = target.value(spre, ppre, any=False)
             except UniquenessError:
                 opre = None
+            self.visited += 1
+            self.value_calls += 1
             if opre is None:
                 raise NoUniqueMatchError("UpdateList", ppre, opre)
             imin, imax = aslice.idx1, aslice.idx2
             length = None
+            walked = 0
             if imin is not None and imin < 0:
-                length = _get_list_length(target, opre)
+                length = self._get_list_length(opre)
+                self.visited += length
+                walked += length
                 imin += length
                 if imin < 0:
                     raise OutOfBoundUpdateListError("imin too small")
             if imax is not None and imax < 0:
                 if length is None:
-                    length = _get_list_length(target, opre)
+                    length = self._get_list_length(opre)
+                    self.visited += length
+                    walked += length
                 imax += length
                 if imax < 0:
                     raise OutOfBoundUpdateListError("imax too small")
 
             i = 0
+            if imin and self._list_walk is not None:
+                cells = self._list_walk(opre, imin)
+                i = len(cells) - 1
+                self.visited += i
+                if i < imin:
+                    if cells[-1] == RDF.nil:
+                        raise OutOfBoundUpdateListError(
+                            "imin (%s) is greater than the length (%s)"
+                            % (imin, i))
+                    raise MalformedListError(
+                        "Item %s has not exactly one rdf:rest" % i)
+                spre, ppre, opre = cells[-2], RDF.rest, cells[-1]
+                if check:
+                    self.check_budget()
             while (imin is not None and i < imin) \
                or (imin is None and opre != RDF.nil):
                 if opre == RDF.nil:
@@ -314,7 +676,13 @@ class PatchProcessor(object):
                 if opre is None:
                     raise MalformedListError("Item %s has not exactly one rdf:rest" % i)
                 i += 1
+                self.visited += 1
+                self.value_calls += 1
+                if check:
+                    self.check_budget()
 
+            walked += i
+            first_removed = i
             spost, ppost, opost = spre, ppre, opre
             while (imax is not None and i < imax) \
                or (imax is None and opost != RDF.nil):
@@ -322,6 +690,7 @@ class PatchProcessor(object):
                     raise OutOfBoundUpdateListError(
                         "imax (%s) is greater than the length (%s)" % (imin, i))
                 target.remove((spost, ppost, opost))
+                self.modified += 1
                 try:
                     elt = target.value(opost, RDF.first, any=False)
                 except UniquenessError:
@@ -329,8 +698,9 @@ class PatchProcessor(object):
                 if elt is None:
                     raise MalformedListError("Item %s has not exactly one rdf:first" % i)
                 if type(elt) is BNode:
-                    self.cut(None, elt)
+                    self._cut(elt)
                 target.remove((opost, RDF.first, elt))
+                self.modified += 1
                 try:
                     spost, ppost, opost = \
                         opost, RDF.rest, target.value(opost, RDF.rest, any=False)
@@ -339,18 +709,33 @@ class PatchProcessor(object):
                 if opost is None:
                     raise MalformedListError("Item %s has not exactly one rdf:rest" % i)
                 i += 1
-
+                self.visited += 2
+                self.value_calls += 2
+                self.triples_removed += 2
+                if check:
+                    self.check_budget()
+
+            if self._event is not None:
+                self._event.cells_walked = walked
+                self._event.cells_removed = i - first_removed
             target.remove((spre, ppre, opre))
             target.remove((spost, ppost, opost))
+            self.modified += 2
+            self.triples_removed += 2
 
             if udl_head == RDF.nil:
                 target.add((spre, ppre, opost))
+                self.modified += 1
+                self.triples_added += 1
             else:
-                self.add(udl_graph)
+                self._add(udl_graph)
                 fst = self.get_node(udl_head)
-                lst = _get_last_node(target, fst)
+                lst, cells = _get_last_node(target, fst)
                 target.add((spre, ppre, fst))
                 target.set((lst, RDF.rest, opost))
+                self.modified += 2
+                self.triples_added += 2
+                self.value_calls += cells
 
         except UniquenessError, ex:
             raise MalformedListError(ex.msg)
@@ -410,3 +795,36 @@ class UndefinedPrefixError(PatchEvalError):
     """Error raised when using an undefined prefix"""
     statusCode = 400
 
+class BudgetExceededError(PatchEvalError):
+    """Subclass of all errors raised when the Budget of a processor
+    is exceeded"""
+    def __init__(self, value, limit):
+        PatchEvalError.__init__(self, "{} exceeds {}".format(value, limit))
+        self.value = value
+        self.limit = limit
+
+class FrontierBudgetError(BudgetExceededError):
+    """Error raised when a path step matches too many nodes"""
+    pass
+
+class VisitedBudgetError(BudgetExceededError):
+    """Error raised when too many triples have been read"""
+    pass
+
+class ModifiedBudgetError(BudgetExceededError):
+    """Error raised when too many triples are added or removed"""
+    statusCode = 413
+
+class DeadlineExceededError(BudgetExceededError):
+    """Error raised when the patch takes too long to apply"""
+    statusCode = 503
+    def __init__(self, timeout):
+        BudgetExceededError.__init__(self, "duration", "{}s".format(timeout))
+
+class PatchCancelledError(BudgetExceededError):
+    """Error raised when the processor has been cancelled"""
+    statusCode = 503
+    def __init__(self):
+        PatchEvalError.__init__(self, "cancelled")
+        self.value = self.limit = None
+
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I implement a parser for a row-based syntax, inspired by RDF Patch.
+
+Each line is a row, which can be:
+
+* ``A <s> <p> <o> .`` adding a triple,
+* ``D <s> <p> <o> .`` deleting a triple,
+* ``@prefix p: <iri> .`` declaring a prefix,
+* empty, or a comment starting with ``#``.
+
+Terms are written as in N-Triples, or as prefixed names.
+Unlike LD Patch, blank node labels denote the blank nodes of the patched
+graph, so that a replica can apply the changes recorded by
+`ldpatch.changeset.write_changeset` on the primary.
+
+Rows are parsed one at a time, without lookahead,
+and consecutive rows of the same kind are passed in batches
+to the ``add`` or ``delete`` method of the processor.
+"""
+
+import re
+
+import rdflib
+
+from ldpatch.syntax import ParserError
+
+BATCH_SIZE = 10000
+CACHE_SIZE = 10000
+
+_ABSOLUTE_IRI = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+_ESCAPE = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+_ESCAPED_CHARS = {
+    "t": u"\t", "b": u"\b", "n": u"\n", "r": u"\r", "f": u"\f",
+    '"': u'"', "'": u"'", "\\": u"\\",
+}
+
+
+class RdfPatchParser(object):
+    """
+    A parser for the row-based syntax.
+
+    Arguments are the same as for `ldpatch.syntax.Parser`;
+    `strict` and `chunk_size` are accepted for compatibility
+    but have no effect (rows are passed in batches of `BATCH_SIZE`).
+
+    IRIs and blank nodes are cached, so that repeated terms are converted
+    once; the cache is emptied whenever it reaches `CACHE_SIZE` entries.
+    """
+
+    def __init__(self, processor, baseiri, strict=False, chunk_size=None):
+        # pylint: disable=W0613
+        self.processor = processor
+        self.baseiri = rdflib.URIRef(baseiri)
+        self._nodes = {}
+
+    def parseString(self, txt):
+        """Parse txt as a row-based patch and apply it"""
+        if isinstance(txt, str):
+            txt = txt.decode("utf8")
+        self.parse_lines(txt.splitlines())
+
+    def parse_lines(self, lines):
+        """Parse and apply the rows of the given iterable of lines"""
+        processor = self.processor
+        parse_term = self._parse_term
+        batch = []
+        batch_op = None
+        for lineno, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line[0] == "#":
+                continue
+            try:
+                opr, subj, pred, obj = line.split(None, 3)
+            except ValueError:
+                raise ParserError("Invalid row (line {})".format(lineno))
+            if obj[-1] != ".":
+                raise ParserError("Missing final '.' (line {})".format(lineno))
+            obj = obj[:-1].rstrip()
+            if opr != batch_op or len(batch) >= BATCH_SIZE:
+                self._flush(batch_op, batch)
+                batch = []
+                batch_op = opr
+            try:
+                if opr == "A" or opr == "D":
+                    batch.append((parse_term(subj), parse_term(pred),
+                                  parse_term(obj)))
+                elif opr == "@prefix" and pred[0] == "<" and subj[-1] == ":" \
+                        and not obj:
+                    processor.prefix(subj[:-1], self._parse_iri(pred[1:-1]))
+                else:
+                    raise ParserError("Invalid row")
+            except ParserError, ex:
+                raise ParserError("{} (line {})".format(ex, lineno))
+        self._flush(batch_op, batch)
+
+    def _flush(self, opr, batch):
+        """Apply a batch of rows"""
+        if not batch:
+            return
+        if opr == "A":
+            self.processor.add(batch, keep_bnodes=True)
+        else:
+            self.processor.delete(batch, keep_bnodes=True)
+
+    def _parse_term(self, term):
+        """Convert the representation of a term to a node"""
+        ret = self._nodes.get(term)
+        if ret is not None:
+            return ret
+        elif not term:
+            raise ParserError("Missing term")
+        first = term[0]
+        if first == '"':
+            return _parse_literal(term, self._parse_term)
+        elif first == "<" and term[-1] == ">":
+            ret = self._parse_iri(term[1:-1])
+        elif term.startswith("_:") and len(term) > 2:
+            ret = rdflib.BNode(term[2:])
+        else:
+            prefix, colon, suffix = term.partition(":")
+            if not colon:
+                raise ParserError("Invalid term {}".format(term))
+            # not cached, as prefixes can be redefined
+            return self.processor.expand_pname(prefix, suffix)
+        if len(self._nodes) >= CACHE_SIZE:
+            self._nodes.clear()
+        self._nodes[term] = ret
+        return ret
+
+    def _parse_iri(self, iri):
+        """Convert an IRI, resolving it if it is relative"""
+        if "\\" in iri:
+            iri = _unescape(iri)
+        if _ABSOLUTE_IRI.match(iri):
+            return rdflib.URIRef(iri)
+        return rdflib.URIRef(iri, self.baseiri)
+
+
+def _parse_literal(term, parse_term):
+    """Convert the representation of a literal to a Literal"""
+    end = term.rfind('"')
+    if end == 0:
+        raise ParserError("Invalid literal {}".format(term))
+    value = term[1:end]
+    if "\\" in value:
+        value = _unescape(value)
+    suffix = term[end+1:]
+    if not suffix:
+        return rdflib.Literal(value)
+    elif suffix[0] == "@":
+        return rdflib.Literal(value, lang=suffix[1:])
+    elif suffix.startswith("^^"):
+        return rdflib.Literal(value, datatype=parse_term(suffix[2:]))
+    raise ParserError("Invalid literal {}".format(term))
+
+def _unescape(txt):
+    """Decode the escape sequences of N-Triples"""
+    return _ESCAPE.sub(_unescape_match, txt)
+
+def _unescape_match(match):
+    """Decode one escape sequence"""
+    short, long_, char = match.groups()
+    if char is not None:
+        ret = _ESCAPED_CHARS.get(char)
+        if ret is None:
+            raise ParserError("Invalid escape sequence \\{}".format(char))
+        return ret
+    return _unichr(int(short or long_, 16))
+
+def _unichr(code):
+    """unichr, also supporting non-BMP characters on narrow builds"""
+    try:
+        return unichr(code)
+    except ValueError:
+        return ("\\U%08x" % code).decode("unicode-escape")
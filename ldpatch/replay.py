@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I capture the LD Patch requests received by a service,
+and replay them later as a load test.
+
+A capture file contains one JSON object per line, with the keys
+``patch`` (the text of the patch), ``baseiri``, ``syntax``,
+``snapshot`` (an identifier of the graph to which the patch was applied,
+chosen by the service) and ``time`` (the timestamp of the request).
+
+Replaying a capture applies each patch to a fresh copy of its snapshot,
+with a given number of concurrent threads,
+and reports the throughput, the latency percentiles,
+and the number of errors of each class (see `ReplayReport`).
+
+As the grammar of the default syntax is shared by all parsers,
+patches are parsed one at a time (under the lock also used by
+`ldpatch.concurrency`) by a `RecordingProcessor`,
+whose statements are then applied concurrently.
+"""
+
+import json
+from collections import namedtuple
+from threading import Lock, Thread
+from time import time
+
+
+CapturedRequest = namedtuple("CapturedRequest",
+                             ["patch", "baseiri", "syntax", "snapshot", "time"])
+""" A captured LD Patch request (see the module docstring). """
+
+
+class Capture(object):
+    """
+    I write LD Patch requests to `out`, a file-like object.
+
+    I can be used concurrently by several threads.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self._mutex = Lock()
+
+    def record(self, patch, baseiri, snapshot=None, syntax="default"):
+        """Record a request; `patch` must be a string"""
+        if type(patch) is str:
+            patch = patch.decode("utf8")
+        line = json.dumps({
+            "patch": patch,
+            "baseiri": baseiri,
+            "syntax": syntax,
+            "snapshot": snapshot,
+            "time": time(),
+        }, sort_keys=True)
+        with self._mutex:
+            self.out.write(line)
+            self.out.write("\n")
+            self.out.flush()
+
+    def apply(self, patch, graph, baseiri, snapshot=None, syntax="default",
+              **kw):
+        """
+        Record a request, then apply it with `ldpatch.apply`.
+
+        Other parameters have the same meaning as for `ldpatch.apply`.
+        """
+        # pylint: disable=R0913
+        from ldpatch import apply
+        if hasattr(patch, "read"):
+            patch = patch.read()
+        self.record(patch, baseiri, snapshot, syntax)
+        return apply(patch, graph, baseiri, syntax=syntax, **kw)
+
+
+def read_capture(infile):
+    """I iter over the `CapturedRequest`s in a capture file"""
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        yield CapturedRequest(obj["patch"], obj.get("baseiri"),
+                              obj.get("syntax", "default"),
+                              obj.get("snapshot"), obj.get("time"))
+
+
+class ReplayReport(object):
+    """
+    The outcome of `replay`.
+
+    Attributes:
+    * ``count``: the number of requests replayed
+    * ``duration``: the total duration of the replay, in seconds
+    * ``latencies``: the sorted list of the latencies of each request
+      (whose graph could be retrieved), in seconds
+    * ``errors``: a dict giving, for each error class name
+      (e.g. ``NoUniqueMatchError``), the number of requests that raised it
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.latencies = []
+        self.errors = {}
+
+    @property
+    def throughput(self):
+        """The number of requests per second"""
+        if not self.duration:
+            return 0.0
+        return self.count / self.duration
+
+    def percentile(self, pct):
+        """The latency below which `pct` percent of the requests fall"""
+        latencies = self.latencies
+        if not latencies:
+            return 0.0
+        idx = int(round(pct / 100.0 * (len(latencies) - 1)))
+        return latencies[idx]
+
+    def __repr__(self):
+        return "<ReplayReport count={} errors={}>".format(
+            self.count, sum(self.errors.itervalues()))
+
+
+def replay(requests, get_graph, concurrency=1, **kw):
+    """
+    I apply `requests` (an iterable of `CapturedRequest`),
+    and return a `ReplayReport`.
+
+    Parameters:
+    * `get_graph`: a function taking a snapshot identifier,
+      and returning a graph to which the patch will be applied
+      (usually a fresh copy of the snapshot);
+      its duration is not counted in the latency of the request,
+      and its errors are counted as errors of the request
+    * `concurrency`: the number of threads applying the requests
+
+    Other keyword parameters (`init_ns`, `init_var`, `budget`,
+    `observers` and `slowlog`) have the same meaning as for `ldpatch.apply`.
+    """
+    report = ReplayReport()
+    requests = iter(requests)
+    mutex = Lock()
+
+    def worker():
+        """Apply requests until there is none left"""
+        while True:
+            with mutex:
+                request = next(requests, None)
+            if request is None:
+                return
+            error = latency = None
+            try:
+                graph = get_graph(request.snapshot)
+            except Exception, ex: # pylint: disable=W0703
+                error = ex.__class__.__name__
+            else:
+                start = time()
+                try:
+                    _apply(request, graph, **kw)
+                except Exception, ex: # pylint: disable=W0703
+                    error = ex.__class__.__name__
+                latency = time() - start
+            with mutex:
+                report.count += 1
+                if latency is not None:
+                    report.latencies.append(latency)
+                if error is not None:
+                    report.errors[error] = report.errors.get(error, 0) + 1
+
+    threads = [ Thread(target=worker) for _ in range(concurrency) ]
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report.duration = time() - start
+    report.latencies.sort()
+    return report
+
+def _apply(request, graph, **kw):
+    """
+    Apply `request` to `graph` as `ldpatch.apply` would,
+    but parsing it under the parser lock (see the module docstring).
+    """
+    from ldpatch import _replayed
+    for _ in _replayed(request.patch, graph, request.baseiri,
+                       syntax=request.syntax, **kw):
+        pass
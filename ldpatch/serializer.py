@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I serialize LD Patch statements in the default syntax.
+
+Statements are (method name, args, kwargs) tuples,
+as recorded by `ldpatch.footprint.RecordingProcessor`;
+IRIs are always written in full.
+"""
+
+# pylint: disable=W0142
+
+from rdflib import BNode, RDF, Variable
+
+from ldpatch.changeset import _nt_term
+from ldpatch.processor import InvIRI, PathConstraint, UNICITY_CONSTRAINT
+
+
+def serialize(statements):
+    """
+    I return the text (as unicode) of an LD Patch made of `statements`.
+    """
+    return u"".join(u"{}\n".format(_STATEMENTS[name](*args, **kw))
+                    for name, args, kw in statements)
+
+
+def _prefix(prefix, iri):
+    """Serialize a Prefix statement"""
+    return u"@prefix {}: <{}> .".format(prefix, iri)
+
+def _bind(variable, value, path=()):
+    """Serialize a Bind statement"""
+    return u"Bind ?{} {}{} .".format(variable, _term(value), _path(path))
+
+def _add(graph, addnew=False, keep_bnodes=False):
+    """Serialize an Add or AddNew statement"""
+    return _graph_statement("AddNew" if addnew else "Add", graph, keep_bnodes)
+
+def _delete(graph, delex=False, keep_bnodes=False):
+    """Serialize a Delete or DeleteExisting statement"""
+    return _graph_statement("DeleteExisting" if delex else "Delete", graph,
+                            keep_bnodes)
+
+def _cut(var):
+    """Serialize a Cut statement"""
+    return u"Cut ?{} .".format(var)
+
+def _updatelist(graph, subject, predicate, aslice, head):
+    """Serialize an UpdateList statement"""
+    # pylint: disable=R0913
+    if aslice.idx1 is None:
+        slice_txt = u".."
+    elif aslice.idx2 is None:
+        slice_txt = u"{}..".format(aslice.idx1)
+    else:
+        slice_txt = u"{}..{}".format(aslice.idx1, aslice.idx2)
+    if head == RDF.nil:
+        collection = u"( )"
+    else:
+        collection = _object(_arcs(graph), head)
+    return u"UpdateList {} {} {} {} .".format(
+        _term(subject), _term(predicate), slice_txt, collection)
+
+_STATEMENTS = {
+    "prefix": _prefix,
+    "bind": _bind,
+    "add": _add,
+    "delete": _delete,
+    "cut": _cut,
+    "updatelist": _updatelist,
+}
+
+
+def _graph_statement(keyword, graph, keep_bnodes):
+    """Serialize an Add or Delete statement of any kind"""
+    triples = [ u"{} {} {} .".format(_term(subj), _term(pred), _term(obj))
+                for subj, pred, obj in graph ]
+    if keep_bnodes and any(type(node) is BNode
+                           for triple in graph for node in triple):
+        raise ValueError("Blank nodes denoting themselves (as in RDF Patch) "
+                         "can not be serialized in LD Patch")
+    return u"{} {{\n{}\n}} .".format(keyword, u"\n".join(triples))
+
+def _term(node):
+    """Serialize a term"""
+    typnode = type(node)
+    if typnode is Variable:
+        return u"?{}".format(node)
+    elif typnode is BNode:
+        return u"_:{}".format(node)
+    return _nt_term(node)
+
+def _path(path):
+    """Serialize a path (with a leading space if not empty)"""
+    ret = []
+    for step in path:
+        typstep = type(step)
+        if typstep is InvIRI:
+            ret.append(u"/ ^{}".format(_term(step.iri)))
+        elif typstep is PathConstraint:
+            if step.value is None:
+                ret.append(u"[{} ]".format(_path(step.path)))
+            else:
+                ret.append(u"[{} = {} ]".format(_path(step.path),
+                                                _term(step.value)))
+        elif step is UNICITY_CONSTRAINT:
+            ret.append(u"!")
+        else:
+            ret.append(u"/ {}".format(_term(step) if typstep is not int
+                                      else step))
+    return u"".join(u" {}".format(elt) for elt in ret)
+
+def _arcs(graph):
+    """
+    Index the triples of `graph` (an iterable of triples) by subject,
+    as a dict of lists of (predicate, object) pairs
+    """
+    ret = {}
+    for subj, pred, obj in graph:
+        ret.setdefault(subj, []).append((pred, obj))
+    return ret
+
+def _items(arcs, head):
+    """Return the items of the collection starting at `head` in `arcs`"""
+    ret = []
+    while head != RDF.nil:
+        first = rest = None
+        for pred, obj in arcs.get(head, ()):
+            if pred == RDF.first:
+                first = obj
+            elif pred == RDF.rest:
+                rest = obj
+        if first is None or rest is None:
+            break # malformed collection
+        ret.append(first)
+        head = rest
+    return ret
+
+def _object(arcs, node):
+    """
+    Serialize `node` as an object,
+    including the collection or the blank node property list
+    that it heads in `arcs` (see `_arcs`).
+    """
+    if type(node) is not BNode:
+        return _term(node)
+    node_arcs = arcs.get(node, ())
+    if any(pred == RDF.first for pred, _ in node_arcs):
+        return u"( {} )".format(u" ".join(_object(arcs, item)
+                                          for item in _items(arcs, node)))
+    return u"[ {} ]".format(u" ; ".join(
+        u"{} {}".format(_term(pred), _object(arcs, obj))
+        for pred, obj in node_arcs))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+I log the patches whose application takes longer than a threshold.
+
+A `SlowPatchLog` is installed process-wide with `install`
+(or passed to `ldpatch.apply` with the `slowlog` parameter).
+Every patch is then applied with a lightweight observer
+(see `ldpatch.observer`) keeping its statement events;
+only when the patch exceeds the threshold are they turned into a record,
+which is a dict with the following keys:
+
+* ``time``: the timestamp at which the patch ended
+* ``duration``, ``parsing``: the total and parsing durations, in seconds
+* ``baseiri``: the base IRI of the patch
+* ``patch``: the text of the patch, truncated to ``max_length`` characters
+* ``patch_length``: the length of the whole text
+* ``error``: the class name of the exception raised by the patch, if any
+* ``statements``: the timings and path step cardinalities of each statement,
+  as in `ldpatch.explain.Explanation.tree`
+
+Records are passed to a callback, and/or appended as JSON lines
+to a rotating file.
+"""
+
+import json
+import logging
+from logging.handlers import RotatingFileHandler
+from time import time
+
+from ldpatch.explain import describe, explain_event
+from ldpatch.observer import Profile
+
+
+_INSTALLED = None
+
+def install(slowlog):
+    """
+    Install `slowlog` (a `SlowPatchLog`) for all subsequent calls
+    to `ldpatch.apply`; None uninstalls it.
+    """
+    global _INSTALLED # pylint: disable=W0603
+    _INSTALLED = slowlog
+
+def installed():
+    """Return the installed `SlowPatchLog`, or None"""
+    return _INSTALLED
+
+
+class SlowPatchLog(object):
+    """
+    I record the patches lasting longer than `threshold` seconds.
+
+    Arguments:
+    * ``threshold``: the duration (in seconds) above which a patch is logged
+    * ``callback``: a function called with each record
+    * ``filename``: a file to which records are appended as JSON lines;
+      it is rotated when it reaches ``max_bytes``,
+      keeping ``backup_count`` old files
+    * ``max_length``: the maximum length of the patch text in records
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, threshold, callback=None, filename=None,
+                 max_bytes=10*1024*1024, backup_count=5, max_length=1000):
+        self.threshold = threshold
+        self.callback = callback
+        self.max_length = max_length
+        self._logger = None
+        if filename is not None:
+            handler = RotatingFileHandler(filename, maxBytes=max_bytes,
+                                          backupCount=backup_count)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logger = logging.Logger("ldpatch.slowlog")
+            logger.addHandler(handler)
+
+    def observer(self, patch, baseiri):
+        """
+        Return an observer checking the duration of `patch`,
+        to be notified of its application
+        """
+        return _SlowPatchObserver(self, patch, baseiri)
+
+    def record(self, profile, patch, baseiri, error=None):
+        """Return the record of a patch, given its `Profile`"""
+        if len(patch) > self.max_length:
+            text = patch[:self.max_length] + u"..."
+        else:
+            text = patch
+        return {
+            "time": time(),
+            "duration": profile.duration,
+            "parsing": profile.parsing,
+            "baseiri": baseiri,
+            "patch": text,
+            "patch_length": len(patch),
+            "error": error and error.__class__.__name__,
+            "statements": [ explain_event(event) for event in profile.events ],
+        }
+
+    def write(self, record):
+        """Write `record` to the callback and/or the file"""
+        if self.callback is not None:
+            self.callback(record)
+        if self._logger is not None:
+            self._logger.warning(json.dumps(record, sort_keys=True))
+
+    def close(self):
+        """Close the file, if any"""
+        if self._logger is not None:
+            for handler in self._logger.handlers:
+                handler.close()
+
+
+class _SlowPatchObserver(Profile):
+    """
+    A `Profile` writing its record to a `SlowPatchLog`
+    if the patch exceeds the threshold.
+    """
+
+    def __init__(self, slowlog, patch, baseiri):
+        Profile.__init__(self)
+        self.slowlog = slowlog
+        self.patch = patch
+        self.baseiri = baseiri
+
+    def statement_ended(self, event):
+        # pylint: disable=C0111
+        # the arguments of the statement are not retained (see StatementEvent)
+        describe(event)
+        Profile.statement_ended(self, event)
+
+    def patch_ended(self, error=None):
+        # pylint: disable=C0111
+        Profile.patch_ended(self, error)
+        slowlog = self.slowlog
+        if self.duration > slowlog.threshold:
+            patch = self.patch
+            if type(patch) is str:
+                patch = patch.decode("utf8", "replace")
+            slowlog.write(slowlog.record(self, patch, self.baseiri, error))
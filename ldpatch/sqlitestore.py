@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+I provide an rdflib store backed by SQLite, tuned for LD Patch.
+
+It is registered as the "SQLite" store plugin::
+
+    graph = Graph(store="SQLite")
+    graph.open("/path/to/file.db", create=True)
+
+Design note
+-----------
+
+Terms are stored once in a dictionary table, and triples are stored as
+triples of integer ids, with three covering indexes (SPO, POS and OSP).
+Blank nodes have negative ids, and other terms positive ids,
+so that queries can tell them apart without joining the dictionary.
+
+Besides the generic store API, the store provides set-based operations,
+which `PatchProcessor` uses instead of per-triple calls
+when they are available on the store of its graph:
+
+* `path_step` evaluates a path step for a whole frontier in one query;
+* `cut` computes the bnode closure with a recursive query,
+  and deletes it with a single statement;
+* `list_walk` follows ``rdf:rest`` arcs with a recursive query
+  (used by UpdateList to reach the spliced cells).
+
+Changes are grouped in a transaction, until `commit` or `rollback`.
+"""
+
+# pylint: disable=W0142,W0221
+
+import sqlite3
+
+from rdflib import BNode, Literal, RDF, URIRef
+from rdflib.store import NO_STORE, Store, VALID_STORE
+
+_SCHEMA = """
+CREATE TABLE terms (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE);
+CREATE TABLE triples (
+    s INTEGER NOT NULL, p INTEGER NOT NULL, o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX pos ON triples (p, o, s);
+CREATE INDEX osp ON triples (o, s, p);
+CREATE TABLE namespaces (prefix TEXT PRIMARY KEY, iri TEXT NOT NULL);
+"""
+
+# SQLite limits the number of parameters of a statement
+_CHUNK = 500
+
+_CACHE_SIZE = 100000
+
+
+class SQLiteStore(Store):
+    """
+    An rdflib store backed by SQLite.
+
+    The configuration is the path of the database file
+    (or ":memory:").
+    """
+    # pylint: disable=R0904
+
+    transaction_aware = True
+    # required by the Turtle parser of rdflib,
+    # although quoted formulae are not supported
+    formula_aware = True
+
+    def __init__(self, configuration=None, identifier=None):
+        self._db = None
+        self._in_transaction = False
+        self._ids = {}
+        self._terms = {}
+        self._rest = self._first = self._nil = None
+        Store.__init__(self, configuration, identifier)
+
+    # database management
+
+    def open(self, configuration, create=False):
+        # pylint: disable=C0111
+        db = sqlite3.connect(configuration, isolation_level=None,
+                             check_same_thread=False)
+        exists = db.execute("SELECT count(*) FROM sqlite_master "
+                            "WHERE name = 'triples'").fetchone()[0]
+        if not exists:
+            if not create:
+                db.close()
+                return NO_STORE
+            db.executescript(_SCHEMA)
+        self._db = db
+        self._rest = self._get_id(RDF.rest, True)
+        self._first = self._get_id(RDF.first, True)
+        self._nil = self._get_id(RDF.nil, True)
+        self.commit()
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        # pylint: disable=C0111
+        if self._db is None:
+            return
+        if commit_pending_transaction:
+            self.commit()
+        else:
+            self.rollback()
+        self._db.close()
+        self._db = None
+
+    def destroy(self, configuration):
+        # pylint: disable=C0111
+        from os import remove
+        self.close()
+        if configuration != ":memory:":
+            remove(configuration)
+
+    def commit(self):
+        # pylint: disable=C0111
+        if self._in_transaction:
+            self._db.execute("COMMIT")
+            self._in_transaction = False
+
+    def rollback(self):
+        # pylint: disable=C0111
+        if self._in_transaction:
+            self._db.execute("ROLLBACK")
+            self._in_transaction = False
+            # ids allocated during the transaction are no longer valid
+            self._ids.clear()
+            self._terms.clear()
+
+    def _begin(self):
+        """Start a transaction if none is in progress"""
+        if not self._in_transaction:
+            self._db.execute("BEGIN")
+            self._in_transaction = True
+
+    # term dictionary
+
+    def _get_id(self, term, create=False):
+        """
+        Return the id of `term`,
+        or None if it is unknown and `create` is False.
+        """
+        ret = self._ids.get(term)
+        if ret is not None:
+            return ret
+        key = _key(term)
+        row = self._db.execute("SELECT id FROM terms WHERE key = ?",
+                               (key,)).fetchone()
+        if row is not None:
+            ret = row[0]
+        elif not create:
+            return None
+        else:
+            self._begin()
+            if type(term) is BNode:
+                newid = "SELECT min(coalesce(min(id), 0), 0) - 1 FROM terms"
+            else:
+                newid = "SELECT max(coalesce(max(id), 0), 0) + 1 FROM terms"
+            ret = self._db.execute(newid).fetchone()[0]
+            self._db.execute("INSERT INTO terms VALUES (?, ?)", (ret, key))
+        self._cache(term, ret)
+        return ret
+
+    def _get_term(self, termid):
+        """Return the term with the given id"""
+        ret = self._terms.get(termid)
+        if ret is None:
+            key = self._db.execute("SELECT key FROM terms WHERE id = ?",
+                                   (termid,)).fetchone()[0]
+            ret = _term(key)
+            self._cache(ret, termid)
+        return ret
+
+    def _cache(self, term, termid):
+        """Cache the id of a term, and vice-versa"""
+        if len(self._ids) >= _CACHE_SIZE:
+            self._ids.clear()
+            self._terms.clear()
+        self._ids[term] = termid
+        self._terms[termid] = term
+
+    def _where(self, pattern):
+        """
+        Return the WHERE clause and parameters matching `pattern`,
+        or None if some term of the pattern is not in the store.
+        """
+        clauses = []
+        params = []
+        for column, term in zip("spo", pattern):
+            if term is not None:
+                termid = self._get_id(term)
+                if termid is None:
+                    return None
+                clauses.append("{} = ?".format(column))
+                params.append(termid)
+        if clauses:
+            return " WHERE " + " AND ".join(clauses), params
+        return "", params
+
+    # RDF API
+
+    def add(self, triple, context, quoted=False):
+        # pylint: disable=C0111,W0613
+        if quoted:
+            raise ValueError("SQLiteStore does not support quoted formulae")
+        get_id = self._get_id
+        ids = tuple(get_id(term, True) for term in triple)
+        self._begin()
+        self._db.execute("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)", ids)
+
+    def addN(self, quads):
+        # pylint: disable=C0111
+        get_id = self._get_id
+        rows = [ (get_id(s, True), get_id(p, True), get_id(o, True))
+                 for s, p, o, _ in quads ]
+        self._begin()
+        self._db.executemany("INSERT OR IGNORE INTO triples VALUES (?, ?, ?)",
+                             rows)
+
+    def remove(self, triple_pattern, context=None):
+        # pylint: disable=C0111,W0613
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        self._begin()
+        self._db.execute("DELETE FROM triples" + where[0], where[1])
+
+    def triples(self, triple_pattern, context=None):
+        # pylint: disable=C0111,W0613
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        cursor = self._db.execute("SELECT s, p, o FROM triples" + where[0],
+                                  where[1])
+        if where[1]:
+            # callers may modify the store while iterating (e.g. Cut)
+            cursor = cursor.fetchall()
+        get_term = self._get_term
+        for sid, pid, oid in cursor:
+            yield (get_term(sid), get_term(pid), get_term(oid)), iter(())
+
+    def __len__(self, context=None):
+        return self._db.execute("SELECT count(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        # pylint: disable=C0111
+        return iter(())
+
+    def bind(self, prefix, namespace):
+        # pylint: disable=C0111
+        self._begin()
+        self._db.execute("INSERT OR REPLACE INTO namespaces VALUES (?, ?)",
+                         (prefix, namespace))
+
+    def prefix(self, namespace):
+        # pylint: disable=C0111
+        row = self._db.execute("SELECT prefix FROM namespaces WHERE iri = ?",
+                               (namespace,)).fetchone()
+        return row and row[0]
+
+    def namespace(self, prefix):
+        # pylint: disable=C0111
+        row = self._db.execute("SELECT iri FROM namespaces WHERE prefix = ?",
+                               (prefix,)).fetchone()
+        return row and URIRef(row[0])
+
+    def namespaces(self):
+        # pylint: disable=C0111
+        rows = self._db.execute("SELECT prefix, iri FROM namespaces").fetchall()
+        for prefix, iri in rows:
+            yield prefix, URIRef(iri)
+
+    # set-based operations used by PatchProcessor
+
+    def path_step(self, nodes, predicate, inverse=False):
+        """
+        Return the set of nodes reached from `nodes` through `predicate`
+        (or its inverse).
+        """
+        pid = self._get_id(predicate)
+        if pid is None:
+            return set()
+        get_id = self._get_id
+        ids = [ i for i in (get_id(node) for node in nodes) if i is not None ]
+        if inverse:
+            query = "SELECT DISTINCT s FROM triples WHERE p = ? AND o IN ({})"
+        else:
+            query = "SELECT DISTINCT o FROM triples WHERE p = ? AND s IN ({})"
+        reached = set()
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i:i+_CHUNK]
+            reached.update(row[0] for row in self._db.execute(
+                query.format(", ".join("?" * len(chunk))), [pid] + chunk))
+        get_term = self._get_term
+        return { get_term(i) for i in reached }
+
+    def cut(self, bnode):
+        """
+        Remove all the triples reachable from `bnode`
+        (through bnodes only), and all the triples whose object is `bnode`.
+
+        Return the number of removed triples.
+        """
+        bid = self._get_id(bnode)
+        if bid is None:
+            return 0
+        self._begin()
+        count = self._db.execute(
+            "DELETE FROM triples WHERE s IN ("
+            " WITH RECURSIVE reach(n) AS ("
+            "  SELECT ? UNION"
+            "  SELECT t.o FROM triples t JOIN reach ON t.s = reach.n"
+            "  WHERE t.o < 0)"
+            " SELECT n FROM reach)", (bid,)).rowcount
+        count += self._db.execute("DELETE FROM triples WHERE o = ?",
+                                  (bid,)).rowcount
+        return count
+
+    def list_walk(self, node, steps=None):
+        """
+        Follow at most `steps` ``rdf:rest`` arcs from `node`,
+        and return the list of nodes met, starting with `node`.
+
+        The walk stops early after ``rdf:nil``,
+        or on a node that has not exactly one ``rdf:rest``
+        (which is then the last node of the returned list).
+        """
+        nid = self._get_id(node)
+        if nid is None:
+            return [node]
+        if steps is None:
+            # a longer walk would be cyclic
+            steps = self._db.execute("SELECT count(*) FROM triples "
+                                     "WHERE p = ?", (self._rest,)).fetchone()[0]
+        rows = self._db.execute(
+            "WITH RECURSIVE walk(depth, n) AS ("
+            " SELECT 0, ? UNION"
+            " SELECT depth + 1, t.o FROM triples t JOIN walk"
+            " ON t.s = walk.n AND t.p = ?"
+            " WHERE walk.n != ? AND depth < ?)"
+            "SELECT depth, n FROM walk ORDER BY depth",
+            (nid, self._rest, self._nil, steps)).fetchall()
+        ids = []
+        for depth, termid in rows:
+            if depth < len(ids):
+                # the previous node has several rdf:rest
+                ids.pop()
+                break
+            ids.append(termid)
+        get_term = self._get_term
+        return [ get_term(i) for i in ids ]
+
+
+def _key(term):
+    """The key of `term` in the dictionary table"""
+    typterm = type(term)
+    if typterm is Literal:
+        return u"L{}\x00{}\x00{}".format(term.language or u"",
+                                         term.datatype or u"", term)
+    elif typterm is BNode:
+        return u"B" + term
+    else:
+        return u"U" + term
+
+def _term(key):
+    """The term with the given key in the dictionary table"""
+    kind = key[0]
+    if kind == u"L":
+        lang, datatype, value = key[1:].split(u"\x00", 2)
+        return Literal(value, lang=lang or None, datatype=datatype or None)
+    elif kind == u"B":
+        return BNode(key[1:])
+    else:
+        return URIRef(key[1:])
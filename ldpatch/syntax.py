@@ -44,7 +44,6 @@ from pyparsing import CaselessKeyword, Combine, Forward, Group, Keyword, Literal
 from re import compile as regex, VERBOSE
 
 import rdflib
-from rdflib.collection import Collection as RdfCollection
 
 from ldpatch.processor import InvIRI, Slice, PathConstraint, \
     UNICITY_CONSTRAINT as PARSED_UNICITY_CONSTRAINT, Variable
@@ -139,6 +138,10 @@ DELETE_CMD = Suppress(Literal("Delete") | Literal("D"))
 DELETEEXISTING_CMD = Suppress(Literal("DeleteExisting") | Literal("DE"))
 CUT_CMD = Suppress(Literal("Cut") | Literal("C"))
 UPDATELIST_CMD = Suppress(Literal("UpdateList") | Literal("UL"))
+# NB: COMMENT must be a unique Suppress instance, otherwise every new Parser
+# would add yet another copy of it to the ignored expressions
+# of the context-independant rules above
+COMMENT = Suppress('#' + restOfLine)
 
 
 @BLANK_NODE_LABEL.setParseAction
@@ -242,6 +245,11 @@ class Parser(object):
     * ``strict``: an optional flag to enable strict-mode
       (by default, the parser will be more tolerant than the specification,
       see below)
+    * ``chunk_size``: if provided, the triples of Add[New]/Delete[Existing]
+      statements are passed to the processor in chunks of (about)
+      that many triples while they are parsed, with the ``partial`` flag
+      (see `ldpatch.processor.PatchProcessor.add`),
+      rather than all at once at the end of the statement
 
     In non-strict mode:
     * Turtle comments can be used anywhere in the LD Patch document
@@ -249,11 +257,12 @@ class Parser(object):
     * empty graphs are allowed in Add[New]/Delete[Existing]
     """
 
-    def __init__(self, processor, baseiri, strict=False):
+    def __init__(self, processor, baseiri, strict=False, chunk_size=None):
         """
         See class docstring.
         """
         # pylint: disable=R0914,R0915
+        self.chunk_size = chunk_size
         self.reset(processor, baseiri, strict)
         PrefixedName = PNAME_LN | PNAME_NS
         Iri = IRIREF | PrefixedName
@@ -302,10 +311,20 @@ class Parser(object):
             SparqlPrefix = CaselessKeyword("prefix") + PNAME_NS + IRIREF
             Prefix = Prefix | SparqlPrefix
         Bind = BIND_CMD + VARIABLE + Value + Optional(Path) + PERIOD
-        Add = ADD_CMD + Graph + PERIOD
-        AddNew = ADDNEW_CMD + Graph + PERIOD
-        Delete = DELETE_CMD + Graph + PERIOD
-        DeleteExisting = DELETEEXISTING_CMD + Graph + PERIOD
+        def chunked(command, method, flag):
+            """
+            Return a copy of `command` recording that the graph
+            of the statement can be passed to `method` in chunks
+            """
+            def start(s, loc, toks):
+                # pylint: disable=C0111,W0613
+                self._chunked = (method, flag)
+            return command.copy().setParseAction(start)
+        Add = chunked(ADD_CMD, "add", False) + Graph + PERIOD
+        AddNew = chunked(ADDNEW_CMD, "add", True) + Graph + PERIOD
+        Delete = chunked(DELETE_CMD, "delete", False) + Graph + PERIOD
+        DeleteExisting = chunked(DELETEEXISTING_CMD, "delete", True) \
+                       + Graph + PERIOD
         Cut = CUT_CMD + VARIABLE + PERIOD
         UpdateList = UPDATELIST_CMD + Subject + Predicate + SLICE + Collection \
                    + PERIOD
@@ -313,7 +332,7 @@ class Parser(object):
         Statement = Prefix | Bind | Add | AddNew | Delete | DeleteExisting | Cut | UpdateList
         Patch = ZeroOrMore(Statement)
         if not strict:
-            Patch.ignore('#' + restOfLine) # Comment
+            Patch.ignore(COMMENT)
         Patch.parseWithTabs()
 
         self.grammar = Patch
@@ -344,22 +363,44 @@ class Parser(object):
         """Reset this parser to a fresh state"""
         self.processor = processor
         self._current_graph = None
+        # the (method, flag) of the current Add or Delete statement
+        self._chunked = None
+        # the number of triples of that statement already passed
+        self._flushed = 0
         self.baseiri = rdflib.URIRef(baseiri)
         self.strict = strict
         self.in_prologue = True
 
     def get_current_graph(self, clear=False, check_empty=False):
-        """Return the current graph, creating it if needed"""
+        """
+        Return the current graph, creating it if needed.
+
+        The graph is a plain list of triples,
+        which the processor only needs to iterate once.
+        """
         ret = self._current_graph
         if ret is None:
-            self._current_graph = ret = rdflib.Graph()
-        if clear:
-            self._current_graph = None
-        if check_empty and len(ret) == 0:
+            self._current_graph = ret = []
+        if check_empty and len(ret) == 0 and not self._flushed:
             if self.strict:
                 raise ParserError("Empty graph")
+        if clear:
+            self._current_graph = None
+            self._chunked = None
+            self._flushed = 0
         return ret
 
+    def _flush(self):
+        """
+        Pass the triples of the current Add or Delete statement
+        parsed so far to the processor
+        """
+        method, flag = self._chunked
+        graph = self._current_graph
+        self._current_graph = None
+        self._flushed += len(graph)
+        getattr(self.processor, method)(graph, flag, partial=True)
+
 
     def _parse_iri(self, s, loc, toks):
         # pylint: disable=C0111,W0613
@@ -389,17 +430,13 @@ class Parser(object):
         # pylint: disable=C0111,W0613
         items = toks.asList()
         if items:
-            graph = self.get_current_graph()
-            head = rdflib.BNode()
-            _ = RdfCollection(graph, head, items)
-            return head
+            return add_collection(self.get_current_graph(), items)
         else:
             return RDF_NIL
 
     def _parse_bnpl(self, s, loc, toks):
         # pylint: disable=C0111,W0613
-        graph = self.get_current_graph()
-        add = graph.add
+        add = self.get_current_graph().append
         subj = rdflib.BNode()
         property_list = iter(toks)
         for pred in property_list:
@@ -424,13 +461,16 @@ class Parser(object):
     def _parse_tss(self, s, loc, toks):
         # pylint: disable=C0111,W0613
         graph = self.get_current_graph()
-        add = graph.add
+        add = graph.append
         property_list = iter(toks.asList())
         subj = property_list.next()
         for pred in property_list:
             objlist = property_list.next()
             for obj in objlist:
                 add((subj, pred, obj))
+        if self.chunk_size and self._chunked is not None \
+           and len(graph) >= self.chunk_size:
+            self._flush()
         return []
 
     @staticmethod
@@ -516,6 +556,24 @@ class Parser(object):
         except ParseException, ex:
             raise ParserError(ex)
 
+def add_collection(triples, items):
+    """
+    Append the triples of an RDF collection of `items` to `triples` (a list),
+    and return its head
+    """
+    head = node = rdflib.BNode()
+    append = triples.append
+    last = len(items) - 1
+    for i, item in enumerate(items):
+        append((node, rdflib.RDF.first, item))
+        if i == last:
+            append((node, rdflib.RDF.rest, RDF_NIL))
+        else:
+            nextnode = rdflib.BNode()
+            append((node, rdflib.RDF.rest, nextnode))
+            node = nextnode
+    return head
+
 class ParserError(Exception):
     """Subclass of all errors raised by the LD Patch parser"""
-    pass
+    statusCode = 400
@@ -40,5 +40,7 @@ setup(name = 'ldpatch',
       url='http://github.com/pchampin/ld-patch-py',
       include_package_data=True,
       install_requires=INSTALL_REQ,
-      scripts=['bin/ldpatch-apply'],
+      extras_require={'csr': ['numpy']},
+      scripts=['bin/ldpatch-apply', 'bin/ldpatch-estimate',
+               'bin/ldpatch-import', 'bin/ldpatch-replay'],
      )
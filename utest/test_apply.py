@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Literal, Namespace
+
+from ldpatch import apply, iterapply
+from ldpatch.processor import AddNewError, Budget, ModifiedBudgetError, \
+    PatchProcessor
+from ldpatch.syntax import Parser, ParserError
+
+EX = Namespace("http://ex.co/")
+
+PATCH = """
+@prefix ex: <http://ex.co/> .
+Add { ex:a ex:b ex:c, ex:d, ex:e } .
+Delete { ex:a ex:b ex:c } .
+Bind ?x ex:a .
+Add { ?x ex:f ex:g } .
+"""
+
+class TestIterApply(object):
+
+    def test_same_result_as_apply(self):
+        g1 = Graph()
+        apply(PATCH, g1, EX[''])
+        g2 = Graph()
+        for _ in iterapply(PATCH, g2, EX['']):
+            pass
+        eq_(set(g1), set(g2))
+        eq_(3, len(g2))
+
+    def test_yields_every_statement(self):
+        steps = list(iterapply(PATCH, Graph(), EX['']))
+        eq_([(1, 5), (2, 5), (3, 5), (4, 5), (5, 5)], steps)
+
+    def test_yields_every_n_statements(self):
+        steps = list(iterapply(PATCH, Graph(), EX[''], statements=2))
+        eq_([(2, 5), (4, 5), (5, 5)], steps)
+
+    def test_progressive(self):
+        g = Graph()
+        steps = iterapply(PATCH, g, EX[''])
+        eq_(0, len(g))
+        next(steps) # prefix
+        next(steps)
+        eq_(3, len(g))
+        next(steps)
+        eq_(2, len(g))
+
+    def test_chunks(self):
+        patch = "Add { %s } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(10))
+        g = Graph()
+        steps = list(iterapply(patch, g, EX[''], triples=3))
+        eq_([(0, 1)] * 3 + [(1, 1)], steps)
+        eq_(set(Literal(i) for i in range(10)), set(g.objects()))
+
+    def test_chunks_bnodes(self):
+        patch = "Add { %s } ." % " ".join(
+            "_:x <b> %s ." % i for i in range(10))
+        g = Graph()
+        list(iterapply(patch, g, EX[''], triples=3))
+        eq_(1, len(set(g.subjects())))
+
+    def test_parse_error_before_first_step(self):
+        g = Graph()
+        with assert_raises(ParserError):
+            iterapply(PATCH + "Foo", g, EX['']).next()
+        eq_(0, len(g))
+
+    def test_addnew_in_chunks(self):
+        patch = "AddNew { %s } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(10))
+        g = Graph()
+        g.add((EX.a, EX.b, Literal(7)))
+        with assert_raises(AddNewError):
+            list(iterapply(patch, g, EX[''], triples=3))
+
+    def test_addnew_in_chunks_duplicate_triples(self):
+        patch = "AddNew { %s } ." % " ".join(
+            "<a> <b> %s ." % (i % 4) for i in range(10))
+        g = Graph()
+        list(iterapply(patch, g, EX[''], triples=3))
+        eq_(4, len(g))
+
+
+class TestApply(object):
+
+    def test_addnew_duplicate_triples(self):
+        g = Graph()
+        apply("AddNew { <a> <b> <c> . <a> <b> <c> } .", g, EX[''])
+        eq_(set(g), {(EX.a, EX.b, EX.c)})
+
+    def test_deleteexisting_duplicate_triples(self):
+        g = Graph()
+        g.add((EX.a, EX.b, EX.c))
+        apply("DeleteExisting { <a> <b> <c> . <a> <b> <c> } .", g, EX[''])
+        eq_(0, len(g))
+
+    def test_chunks(self):
+        g = Graph()
+        processor = PatchProcessor(g)
+        calls = []
+        add = processor.add
+        def recording_add(graph, addnew=False, keep_bnodes=False,
+                          partial=False):
+            calls.append((len(graph), len(g), partial))
+            add(graph, addnew, keep_bnodes, partial)
+        processor.add = recording_add
+        patch = "Add { %s } ." % " ".join(
+            "_:x <b> %s ." % i for i in range(10))
+        Parser(processor, EX[''], chunk_size=3).parseString(patch)
+        eq_([(3, 0, True), (3, 3, True), (3, 6, True), (1, 9, False)], calls)
+        eq_(set(Literal(i) for i in range(10)), set(g.objects()))
+        eq_(1, len(set(g.subjects())))
+        eq_(1, processor.counts["add"])
+
+    def test_addnew_chunks_duplicate_triples(self):
+        g = Graph()
+        patch = "AddNew { %s } ." % " ".join(
+            "<a> <b> %s ." % (i % 4) for i in range(10))
+        apply(patch, g, EX[''], chunk_size=3)
+        eq_(4, len(g))
+
+    def test_addnew_chunks_existing_triple(self):
+        g = Graph()
+        g.add((EX.a, EX.b, Literal(7)))
+        patch = "AddNew { %s } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(10))
+        with assert_raises(AddNewError):
+            apply(patch, g, EX[''], chunk_size=3)
+
+    def test_deleteexisting_chunks_duplicate_triples(self):
+        g = Graph()
+        for i in range(4):
+            g.add((EX.a, EX.b, Literal(i)))
+        patch = "DeleteExisting { %s } ." % " ".join(
+            "<a> <b> %s ." % (i % 4) for i in range(10))
+        apply(patch, g, EX[''], chunk_size=3)
+        eq_(0, len(g))
+
+    def test_chunks_max_modified(self):
+        g = Graph()
+        patch = "Add { %s } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(25))
+        with assert_raises(ModifiedBudgetError):
+            apply(patch, g, EX[''], budget=Budget(max_modified=20),
+                  chunk_size=10)
+        eq_(0, len(g)) # nothing written
+        apply(patch, g, EX[''], budget=Budget(max_modified=25), chunk_size=10)
+        eq_(25, len(g))
+
+    def test_chunks_rollback(self):
+        g = Graph(store="SQLite")
+        g.open(":memory:", create=True)
+        g.add((EX.a, EX.b, EX.c))
+        g.commit()
+        # syntax error in the middle of the statement
+        patch = "Add { %s <a> <b> } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(10))
+        with assert_raises(ParserError):
+            try:
+                apply(patch, g, EX[''], chunk_size=3)
+            except:
+                assert len(g) > 1 # some chunks were applied
+                g.rollback()
+                raise
+        eq_({(EX.a, EX.b, EX.c)}, set(g))
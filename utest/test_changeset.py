@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from StringIO import StringIO
+
+from nose.tools import assert_set_equal, eq_
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.compare import isomorphic
+
+from ldpatch import apply, iterapply
+from ldpatch.changeset import Changeset, TrackingGraph, write_changeset, \
+    write_nquads, write_ntriples
+
+EX = Namespace("http://ex.co/")
+
+class TestTrackingGraph(object):
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.add((EX.a, EX.b, EX.c))
+        self.tracking = TrackingGraph(self.graph)
+        self.changes = self.tracking.changeset
+
+    def test_add(self):
+        self.tracking.add((EX.a, EX.b, EX.d))
+        assert_set_equal({(EX.a, EX.b, EX.d)}, self.changes.added)
+        assert_set_equal(set(), self.changes.removed)
+        assert (EX.a, EX.b, EX.d) in self.graph
+
+    def test_add_existing(self):
+        self.tracking.add((EX.a, EX.b, EX.c))
+        eq_(0, len(self.changes))
+
+    def test_remove(self):
+        self.tracking.remove((EX.a, EX.b, EX.c))
+        assert_set_equal({(EX.a, EX.b, EX.c)}, self.changes.removed)
+        eq_(0, len(self.graph))
+
+    def test_remove_missing(self):
+        self.tracking.remove((EX.a, EX.b, EX.d))
+        eq_(0, len(self.changes))
+
+    def test_remove_then_add(self):
+        self.tracking.remove((EX.a, EX.b, EX.c))
+        self.tracking.add((EX.a, EX.b, EX.c))
+        eq_(0, len(self.changes))
+
+    def test_add_then_remove(self):
+        self.tracking.add((EX.a, EX.b, EX.d))
+        self.tracking.remove((EX.a, EX.b, EX.d))
+        eq_(0, len(self.changes))
+
+    def test_set(self):
+        self.tracking.set((EX.a, EX.b, EX.d))
+        assert_set_equal({(EX.a, EX.b, EX.d)}, self.changes.added)
+        assert_set_equal({(EX.a, EX.b, EX.c)}, self.changes.removed)
+
+    def test_apply(self):
+        apply("""@prefix ex: <http://ex.co/> .
+                 Delete { ex:a ex:b ex:c } .
+                 Add { ex:a ex:b ex:c, ex:d ; ex:list () } .
+                 UpdateList ex:a ex:list 0.. ( 1 2 ) .
+              """, self.tracking, EX[''])
+        eq_(0, len(self.changes.removed))
+        # ex:list () was added, then replaced
+        eq_(1 + 1 + 4, len(self.changes.added)) # ex:d, ex:list, 2 cells
+
+
+class TestReplication(object):
+
+    def setUp(self):
+        self.primary = Graph()
+        self.primary.parse(data="""
+            @prefix ex: <http://ex.co/> .
+            ex:a ex:name "a" ; ex:addr [ ex:city "Lyon" ; ex:geo [ ex:lat 45 ] ] ;
+                 ex:list ( [ ex:v 1 ] [ ex:v 2 ] [ ex:v 3 ] ) .
+        """, format="turtle")
+        # a replica shares the blank node labels of the primary
+        self.replica = Graph()
+        for triple in self.primary:
+            self.replica.add(triple)
+
+    def _replicate(self, patch):
+        changeset = Changeset()
+        apply(patch, self.primary, EX[''], changeset=changeset)
+        out = StringIO()
+        write_changeset(changeset, out)
+        apply(out.getvalue(), self.replica, EX[''], syntax="rdfpatch")
+        assert_set_equal(set(self.primary), set(self.replica))
+        return changeset
+
+    def test_cut(self):
+        changeset = self._replicate("""
+            @prefix ex: <http://ex.co/> .
+            Bind ?addr ex:a / ex:addr .
+            Cut ?addr .
+        """)
+        eq_(4, len(changeset.removed))
+
+    def test_updatelist(self):
+        changeset = self._replicate("""
+            @prefix ex: <http://ex.co/> .
+            UpdateList ex:a ex:list 1..2 ( [ ex:v 4 ] 5 ) .
+        """)
+        eq_(0, len([ t for t in changeset.added | changeset.removed
+                     if t[1] == EX.name ]))
+
+    def test_bnodes(self):
+        self._replicate("""
+            @prefix ex: <http://ex.co/> .
+            Bind ?geo ex:a / ex:addr / ex:geo .
+            Add { ?geo ex:long 4 ; ex:src [ ex:name "gps" ] } .
+        """)
+
+    def test_iterapply(self):
+        changeset = Changeset()
+        for _ in iterapply("""
+            @prefix ex: <http://ex.co/> .
+            Delete { ex:a ex:name "a" } .
+            Add { ex:a ex:name "b" } .
+        """, self.primary, EX[''], changeset=changeset):
+            pass
+        eq_(1, len(changeset.added))
+        eq_(1, len(changeset.removed))
+
+    def test_native_operations(self):
+        from ldpatch.compactstore import CompactStore
+        graph = Graph(CompactStore())
+        tracking = TrackingGraph(graph)
+        eq_(graph.store.path_step, tracking.path_step)
+        eq_(graph.store.list_walk, tracking.list_walk)
+        assert not hasattr(tracking, "cut")
+
+
+class TestWriters(object):
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.add((EX.a, EX.b, BNode()))
+        self.graph.add((EX.a, EX.b, Literal(u'say "h\xe9"\n')))
+        self.graph.add((EX.a, EX.b, Literal("chat", lang="fr")))
+        self.graph.add((EX.a, EX.b, Literal(42)))
+
+    def test_ntriples(self):
+        out = StringIO()
+        write_ntriples(self.graph.triples((None, None, None)), out)
+        eq_(4, len(out.getvalue().splitlines()))
+        parsed = Graph()
+        parsed.parse(data=out.getvalue(), format="nt")
+        assert isomorphic(self.graph, parsed)
+
+    def test_nquads(self):
+        out = StringIO()
+        write_nquads([(EX.a, EX.b, Literal(1), None),
+                      (EX.a, EX.b, Literal(2), URIRef("http://ex.co/g"))],
+                     out)
+        eq_(['<http://ex.co/a> <http://ex.co/b> '
+             '"1"^^<http://www.w3.org/2001/XMLSchema#integer> .',
+             '<http://ex.co/a> <http://ex.co/b> '
+             '"2"^^<http://www.w3.org/2001/XMLSchema#integer> <http://ex.co/g> .'],
+            out.getvalue().splitlines())
+
+    def test_changeset(self):
+        changeset = Changeset()
+        changeset.added.add((EX.a, EX.b, EX.c))
+        changeset.removed.add((EX.a, EX.b, EX.d))
+        out = StringIO()
+        write_changeset(changeset, out)
+        eq_(['D <http://ex.co/a> <http://ex.co/b> <http://ex.co/d> .',
+             'A <http://ex.co/a> <http://ex.co/b> <http://ex.co/c> .'],
+            out.getvalue().splitlines())
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from random import Random
+
+from nose.tools import assert_set_equal, eq_
+from rdflib import BNode, Graph, Literal, Namespace, RDF
+from rdflib.collection import Collection
+from rdflib.compare import isomorphic
+
+import ldpatch # registers the Compact plugin
+from ldpatch import compactstore
+from ldpatch.processor import IRI, PatchProcessor
+
+import test_processor
+
+EX = Namespace("http://ex.co/")
+
+def C(data=None):
+    g = Graph(store="Compact")
+    if data is not None:
+        g.parse(data=data, format="turtle")
+    return g
+
+class TestCompactStore(object):
+
+    def setUp(self):
+        self.g = C(test_processor.INITIAL)
+
+    def test_roundtrip(self):
+        assert isomorphic(self.g, test_processor.G(test_processor.INITIAL))
+        self.g.store.compact()
+        assert isomorphic(self.g, test_processor.G(test_processor.INITIAL))
+
+    def test_patterns(self):
+        ref = test_processor.G(test_processor.INITIAL)
+        self.g = C()
+        for triple in ref:
+            self.g.add(triple)
+        for compact in (False, True):
+            if compact:
+                self.g.store.compact()
+            for s, p, o in ref:
+                for pattern in [(s, p, o), (s, p, None), (s, None, o),
+                                (s, None, None), (None, p, o),
+                                (None, p, None), (None, None, o)]:
+                    assert_set_equal(set(ref.triples(pattern)),
+                                     set(self.g.triples(pattern)))
+
+    def test_remove_pattern(self):
+        g = C()
+        g.add((EX.a, EX.b, EX.c))
+        g.add((EX.a, EX.b, EX.d))
+        g.store.compact()
+        g.add((EX.a, EX.b, EX.e))
+        g.add((EX.a, EX.f, EX.d))
+        g.remove((EX.a, EX.b, None))
+        eq_([(EX.a, EX.f, EX.d)], list(g))
+        eq_(1, len(g))
+
+    def test_unknown_term(self):
+        eq_([], list(self.g.triples((EX.unknown, None, None))))
+
+    def test_random_consistency(self):
+        rand = Random(42)
+        old_min = compactstore._MIN_DELTA
+        compactstore._MIN_DELTA = 10
+        try:
+            ref = Graph()
+            g = C()
+            nodes = [EX["n%s" % i] for i in range(8)]
+            for _ in range(2000):
+                triple = (rand.choice(nodes), rand.choice(nodes[:3]),
+                          rand.choice(nodes))
+                if rand.random() < 0.6:
+                    ref.add(triple)
+                    g.add(triple)
+                else:
+                    ref.remove(triple)
+                    g.remove(triple)
+                eq_(len(ref), len(g))
+            assert_set_equal(set(ref), set(g))
+            for node in nodes:
+                assert_set_equal(set(ref.triples((node, None, None))),
+                                 set(g.triples((node, None, None))))
+                assert_set_equal(set(ref.triples((None, None, node))),
+                                 set(g.triples((None, None, node))))
+        finally:
+            compactstore._MIN_DELTA = old_min
+
+    def test_path_step(self):
+        store = self.g.store
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = store.path_step([pa], knows)
+        eq_(2, len(friends))
+        eq_({pa}, store.path_step(friends, knows, inverse=True))
+        eq_(set(), store.path_step([pa], EX.unknown))
+
+    def test_list_walk(self):
+        store = self.g.store
+        lst = self.g.value(test_processor.PA, test_processor.VOCAB.prefLang)
+        cells = store.list_walk(lst)
+        eq_(4, len(cells))
+        eq_(RDF.nil, cells[-1])
+        eq_(cells[:2], store.list_walk(lst, 1))
+
+    def test_list_walk_malformed(self):
+        g = C()
+        Collection(g, BNode("l"), [Literal(i) for i in range(3)])
+        g.add((BNode("l"), RDF.rest, BNode("other")))
+        eq_([BNode("l")], g.store.list_walk(BNode("l")))
+
+    def test_cut(self):
+        g = C()
+        g.add((EX.a, EX.b, BNode("x")))
+        g.add((BNode("x"), EX.c, BNode("y")))
+        g.store.compact()
+        g.add((BNode("y"), EX.c, BNode("x")))
+        g.add((BNode("y"), EX.d, EX.e))
+        g.add((EX.a, EX.b, EX.c))
+        eq_(4, g.store.cut(BNode("x")))
+        eq_([(EX.a, EX.b, EX.c)], list(g))
+
+
+class TestPatchProcessorCompact(test_processor.TestPatchProcessor):
+    """Run the processor tests against the Compact store"""
+
+    def setUp(self):
+        self.g = C(test_processor.INITIAL)
+        self.g.store.compact()
+        self.e = PatchProcessor(self.g, {"foaf": IRI(test_processor.FOAF),
+                                         "vocab": IRI(test_processor.VOCAB)})
+        self.my_friends = { t[2] for t in self.g.triples(
+            (test_processor.PA, test_processor.FOAF.knows, None)) }
+        self.ucbl = self.g.value(None, test_processor.FOAF.member,
+                                 test_processor.PA)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import eq_
+from rdflib import Graph, Namespace, Variable
+from rdflib.compare import isomorphic
+
+from ldpatch import apply
+from ldpatch.compose import compose
+
+EX = Namespace("http://ex.co/")
+
+DATA = """
+@prefix ex: <http://ex.co/> .
+ex:a ex:name "a" ; ex:knows ex:b, ex:c ; ex:list ( 1 2 3 ) .
+ex:b ex:name "b" .
+ex:c ex:name "c" ; ex:addr [ ex:city "Lyon" ] .
+"""
+
+PREFIX = "@prefix ex: <http://ex.co/> .\n"
+
+
+def _graph():
+    g = Graph()
+    g.parse(data=DATA, format="turtle")
+    return g
+
+def check_compose(patches, **kw):
+    """Check that the composed patch is equivalent, and return it"""
+    patches = [ PREFIX + patch for patch in patches ]
+    expected = _graph()
+    for patch in patches:
+        apply(patch, expected, EX[''], **kw)
+    composed = compose(patches, EX[''], **kw)
+    got = _graph()
+    apply(composed, got, EX[''], **kw)
+    assert isomorphic(expected, got), composed
+    return composed
+
+
+class TestCompose(object):
+
+    def test_add_then_delete(self):
+        composed = check_compose([
+            'Add { ex:a ex:tag "x", "y" } .',
+            'Delete { ex:a ex:tag "x" } .',
+        ])
+        eq_(1, composed.count('"x"'))
+
+    def test_delete_then_add(self):
+        composed = check_compose([
+            'Delete { ex:a ex:name "a" } .',
+            'Add { ex:a ex:name "a" } .',
+        ])
+        assert "Delete" not in composed
+
+    def test_read_in_between(self):
+        composed = check_compose([
+            'Add { ex:a ex:knows ex:d . ex:d ex:name "d" } .',
+            'Bind ?x ex:a / ex:knows [ / ex:name = "d" ] .',
+            'Delete { ex:a ex:knows ex:d } .',
+        ])
+        eq_(2, composed.count("<http://ex.co/d> ."))
+
+    def test_addnew_not_squashed(self):
+        composed = check_compose([
+            'Add { ex:a ex:tag "x" } .',
+            'DeleteExisting { ex:a ex:tag "x" } .',
+        ])
+        assert "Add" in composed
+
+    def test_appends(self):
+        composed = check_compose([
+            'UpdateList ex:a ex:list .. ( 4 ) .',
+            'UpdateList ex:a ex:list .. ( 5 [ ex:p 6 ] ) .',
+            'UpdateList ex:a ex:list .. ( 7 ) .',
+        ])
+        eq_(1, composed.count("UpdateList"))
+
+    def test_overlapping_slices(self):
+        for slices in [("1..2 ( 4 5 )", "2..3 ( 6 )"),
+                       ("1..2 ( 4 5 )", "0..2 ( 6 )"),
+                       ("1..1 ( 4 5 )", "3..4 ( )"),
+                       ("0..3 ( )", "0..0 ( 7 8 )")]:
+            composed = check_compose([ 'UpdateList ex:a ex:list %s .' % aslice
+                                       for aslice in slices ])
+            eq_(1, composed.count("UpdateList"), composed)
+
+    def test_distant_slices(self):
+        composed = check_compose([
+            'UpdateList ex:a ex:list 0..1 ( 4 ) .',
+            'UpdateList ex:a ex:list 2..3 ( 5 ) .',
+        ])
+        eq_(2, composed.count("UpdateList"))
+
+    def test_list_variable_bound_in_between(self):
+        for later in ('( ?t )', '( [ ex:p ?t ] )'):
+            composed = check_compose([
+                'UpdateList ex:a ex:list 0..1 ( 4 ) .',
+                'Bind ?t ex:b . UpdateList ex:a ex:list 1..2 %s .' % later,
+            ])
+            eq_(2, composed.count("UpdateList"), composed)
+        composed = check_compose([
+            'UpdateList ex:a ex:list 0..1 ( 4 ) .',
+            'Bind ?s ex:a . UpdateList ?s ex:list 1..2 ( 5 ) .',
+        ])
+        eq_(2, composed.count("UpdateList"), composed)
+
+    def test_shared_bind(self):
+        composed = check_compose([
+            'Bind ?x ex:a / ex:knows [ / ex:name = "b" ] .\n'
+            'Add { ?x ex:tag "1" } .',
+            'Bind ?y ex:a / ex:knows [ / ex:name = "b" ] .\n'
+            'Add { ?y ex:tag "2" } .',
+        ])
+        eq_(1, composed.count("Bind"))
+
+    def test_bind_invalidated(self):
+        composed = check_compose([
+            'Bind ?x ex:a / ex:knows [ / ex:name = "b" ] .\n'
+            'Add { ?x ex:tag "1" } .',
+            'Delete { ex:b ex:name "b" } . Add { ex:c ex:name "b" } .',
+            'Bind ?x ex:a / ex:knows [ / ex:name = "b" ] .\n'
+            'Add { ?x ex:tag "2" } .',
+        ])
+        eq_(2, composed.count("Bind"))
+
+    def test_same_names(self):
+        check_compose([
+            'Bind ?x ex:a / ex:knows [ / ex:name = "b" ] .\n'
+            'Add { ?x ex:p _:n . _:n ex:q 1 } .',
+            'Bind ?x ex:a / ex:knows [ / ex:name = "c" ] .\n'
+            'Add { ?x ex:p _:n . _:n ex:q 2 } .',
+        ])
+
+    def test_cut(self):
+        check_compose([
+            'Bind ?addr ex:c / ex:addr .\nCut ?addr .',
+            'Add { ex:c ex:addr [ ex:city "Paris" ] } .',
+            'Bind ?addr ex:c / ex:addr .\nAdd { ?addr ex:zip "75000" } .',
+        ])
+
+    def test_init_var(self):
+        composed = check_compose([
+            'Add { ?me ex:tag "1" } .',
+            'Delete { ?me ex:tag "1" } .',
+        ], init_var={Variable("me"): EX.a})
+        assert "Add" not in composed
+
+    def test_consecutive_adds(self):
+        composed = check_compose([
+            'Add { ex:a ex:tag "1" } .',
+            'Add { ex:a ex:tag "2" } .',
+        ])
+        eq_(1, composed.count("Add"))
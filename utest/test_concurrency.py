@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Literal, Namespace
+from threading import Thread
+from time import sleep
+
+from ldpatch.changeset import Changeset
+from ldpatch.concurrency import ConcurrentPatcher, LockManager, lock_requests
+from ldpatch.footprint import footprint
+from ldpatch.metrics import METRICS
+from ldpatch.observer import Profile
+from ldpatch.processor import NoUniqueMatchError
+
+EX = Namespace("http://ex.co/")
+
+def F(patch):
+    return footprint(patch, EX[''])
+
+class TestLockRequests(object):
+
+    def test_subject(self):
+        reqs = lock_requests(F("Add { <a> <b> <c> } ."))
+        eq_([((), "IX"), ((EX.b,), "IX"), ((EX.b, EX.a), "X")], reqs)
+
+    def test_predicate(self):
+        reqs = lock_requests(F("Add { <a> <b> <c> } ."), "predicate")
+        eq_([((), "IX"), ((EX.b,), "X")], reqs)
+
+    def test_graph(self):
+        reqs = lock_requests(F("Add { <a> <b> <c> } ."), "graph")
+        eq_([((), "X")], reqs)
+
+    def test_read_and_write(self):
+        reqs = lock_requests(F("Bind ?x <a>/<b>/<c> . Delete { <a> <b> <c> } ."))
+        eq_([((), "IX"), ((EX.b,), "IX"), ((EX.c,), "S"), ((EX.b, EX.a), "X")],
+            reqs)
+
+    def test_read_and_write_any(self):
+        reqs = lock_requests(F("Bind ?x <a>/<b> . Delete { ?x <b> <c> } ."))
+        eq_([((), "IX"), ((EX.b,), "X")], reqs)
+
+    def test_cut(self):
+        reqs = lock_requests(F("Bind ?x <a>/<b> . Cut ?x ."))
+        eq_([((), "X")], reqs)
+
+
+class TestLockManager(object):
+
+    def setUp(self):
+        self.locks = LockManager()
+        self.log = []
+
+    def _acquire_in_thread(self, name, requests):
+        def run():
+            self.locks.acquire(requests)
+            self.log.append(name)
+        thread = Thread(target=run)
+        thread.start()
+        sleep(0.05)
+        return thread
+
+    def test_compatible(self):
+        self.locks.acquire([((), "IX"), ((EX.a,), "S")])
+        thread = self._acquire_in_thread("t", [((), "IX"), ((EX.a,), "S")])
+        thread.join(1)
+        eq_(["t"], self.log)
+
+    def test_incompatible(self):
+        reqs = [((), "IX"), ((EX.a,), "X")]
+        self.locks.acquire(reqs)
+        thread = self._acquire_in_thread("t", [((), "IS"), ((EX.a,), "S")])
+        eq_([], self.log)
+        self.locks.release(reqs)
+        thread.join(1)
+        eq_(["t"], self.log)
+
+    def test_intention_blocked_by_graph_lock(self):
+        self.locks.acquire([((), "S")])
+        thread = self._acquire_in_thread("t", [((), "IX")])
+        eq_([], self.log)
+        self.locks.release([((), "S")])
+        thread.join(1)
+        eq_(["t"], self.log)
+
+
+class TestConcurrentPatcher(object):
+
+    def test_bad_granularity(self):
+        with assert_raises(ValueError):
+            ConcurrentPatcher(Graph(), "foo")
+
+    def test_threads(self):
+        graph = Graph()
+        for i in range(10):
+            graph.add((EX["s%s" % i], EX.counter, Literal(0)))
+        patcher = ConcurrentPatcher(graph)
+        errors = []
+
+        def run(i):
+            try:
+                for j in range(3):
+                    patcher.apply("""
+                        Delete { <s%(i)s> <counter> %(j)s } .
+                        Add { <s%(i)s> <counter> %(k)s } .
+                    """ % { "i": i, "j": j, "k": j+1 }, EX[''])
+            except Exception, ex:
+                errors.append(ex)
+
+        threads = [ Thread(target=run, args=(i,)) for i in range(10) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        eq_([], errors)
+        eq_(10, len(graph))
+        eq_({Literal(3)}, set(graph.objects(None, EX.counter)))
+
+    def test_accounting(self):
+        METRICS.reset()
+        graph = Graph()
+        patcher = ConcurrentPatcher(graph)
+        changeset = Changeset()
+        profile = Profile()
+        patcher.apply("Add { <a> <b> <c> } .", EX[''], changeset=changeset,
+                      observers=[profile])
+        with assert_raises(NoUniqueMatchError):
+            patcher.apply("Bind ?x <a> / <nope> .", EX[''])
+        eq_({(EX.a, EX.b, EX.c)}, changeset.added)
+        eq_(1, len(profile.events))
+        assert profile.duration is not None
+        eq_({"success": 1, "error": 1}, METRICS.snapshot()["patches"])
+        # the locks were released, even after the error
+        patcher.apply("Delete { <a> <b> <c> } .", EX[''])
+        eq_(0, len(graph))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_set_equal, eq_
+from rdflib import BNode, Graph, Literal, Namespace, RDF
+
+try:
+    from ldpatch.csr import CSRGraph, NodeArray
+except ImportError:
+    raise SkipTest("numpy is not available")
+from ldpatch import apply
+from ldpatch.processor import IRI, PatchProcessor
+
+import test_processor
+
+EX = Namespace("http://ex.co/")
+
+class TestCSRGraph(object):
+
+    def setUp(self):
+        self.graph = test_processor.G(test_processor.INITIAL)
+        self.csr = CSRGraph(self.graph)
+
+    def test_path_step(self):
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = self.csr.path_step([pa], knows)
+        assert isinstance(friends, NodeArray)
+        assert_set_equal(set(self.graph.objects(pa, knows)), set(friends))
+        assert_set_equal({pa}, set(self.csr.path_step(friends, knows, True)))
+        eq_(0, len(self.csr.path_step([pa], EX.unknown)))
+        eq_(0, len(self.csr.path_step([EX.unknown], knows)))
+
+    def test_overlay(self):
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = set(self.graph.objects(pa, knows))
+        removed = next(iter(friends))
+        self.csr.remove((pa, knows, removed))
+        self.csr.add((pa, knows, EX.new))
+        self.csr.add((EX.other, knows, pa))
+        expected = friends - {removed} | {EX.new}
+        assert_set_equal(expected, set(self.csr.path_step([pa], knows)))
+        assert_set_equal({pa, EX.other},
+                         set(self.csr.path_step([EX.new, pa], knows, True)))
+        self.csr.rebuild()
+        assert_set_equal(expected, set(self.csr.path_step([pa], knows)))
+
+    def test_overlay_cancel(self):
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = set(self.graph.objects(pa, knows))
+        removed = next(iter(friends))
+        self.csr.remove((pa, knows, removed))
+        self.csr.add((pa, knows, removed))
+        assert_set_equal(friends, set(self.csr.path_step([pa], knows)))
+
+    def test_stale_frontier(self):
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = self.csr.path_step([pa], knows)
+        self.csr.rebuild()
+        assert_set_equal({pa}, set(self.csr.path_step(friends, knows, True)))
+
+    def test_apply(self):
+        apply("""@prefix f: <http://xmlns.com/foaf/0.1/> .
+                 Bind ?x <http://champin.net/#pa> / f:knows
+                    [ / f:name = "Andrei Sambra" ] .
+                 Add { ?x f:nick "deiu" } .
+                 Bind ?y ?x / ^f:knows / f:knows [ / f:nick = "deiu" ] .
+                 Add { ?y f:nick "deiu2" } .
+              """, self.csr, EX[""])
+        eq_(1, len(list(self.graph.triples((None, test_processor.FOAF.nick,
+                                            Literal("deiu2"))))))
+
+    def test_large_frontier(self):
+        graph = Graph()
+        for i in range(2000):
+            graph.add((EX.root, EX.child, EX["n%s" % i]))
+            graph.add((EX["n%s" % i], EX.parent, EX["p%s" % (i % 7)]))
+        csr = CSRGraph(graph)
+        children = csr.path_step([EX.root], EX.child)
+        eq_(2000, len(children))
+        eq_(7, len(csr.path_step(children, EX.parent)))
+
+
+class TestPatchProcessorCSR(test_processor.TestPatchProcessor):
+    """Run the processor tests with a CSRGraph"""
+
+    def setUp(self):
+        test_processor.TestPatchProcessor.setUp(self)
+        csr = CSRGraph(self.g)
+        self.e = PatchProcessor(csr, {"foaf": IRI(test_processor.FOAF),
+                                      "vocab": IRI(test_processor.VOCAB)})
+        # some tests modify the graph behind the CSRGraph
+        graph_add = self.g.add
+        def add(triple):
+            graph_add(triple)
+            csr.rebuild()
+        self.g.add = add
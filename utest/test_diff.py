@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from random import Random
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+from rdflib.compare import isomorphic
+
+from ldpatch import apply
+from ldpatch.changeset import Changeset
+from ldpatch.diff import DiffError, InverseError, diff, inverse
+
+EX = Namespace("http://ex.co/")
+
+PREFIX = "@prefix ex: <http://ex.co/> .\n"
+
+
+def _graph(data):
+    g = Graph()
+    g.parse(data=PREFIX + data, format="turtle")
+    return g
+
+def check_diff(old_data, new_data):
+    """Check that the diff transforms old into new, and return it"""
+    old = _graph(old_data)
+    new = _graph(new_data)
+    patch = diff(old, new)
+    apply(patch, old, EX[''])
+    assert isomorphic(old, new), patch
+    return patch
+
+def check_inverse(data, patch):
+    """Check that the inverse of patch restores data, and return it"""
+    graph = _graph(data)
+    undo = apply(PREFIX + patch, graph, EX[''], inverse=True)
+    assert not isomorphic(graph, _graph(data))
+    apply(undo, graph, EX[''])
+    assert isomorphic(graph, _graph(data)), undo
+    return undo
+
+
+class TestDiff(object):
+
+    def test_identical(self):
+        eq_(u"", check_diff('ex:a ex:p 1 ; ex:q [ ex:r ( 1 [] ) ] .',
+                            'ex:a ex:p 1 ; ex:q [ ex:r ( 1 [] ) ] .'))
+
+    def test_ground(self):
+        patch = check_diff('ex:a ex:p 1, 2 ; ex:q ex:b .',
+                           'ex:a ex:p 2, 3 ; ex:r ex:b .')
+        assert "Bind" not in patch
+        assert "Delete" in patch and "Add" in patch
+
+    def test_modified_bnode(self):
+        patch = check_diff(
+            'ex:a ex:addr [ ex:city "Lyon" ; ex:zip "69000" ] .',
+            'ex:a ex:addr [ ex:city "Paris" ; ex:zip "69000" ] .')
+        assert "Cut" not in patch
+        assert '"69000"' not in patch.split("Delete")[1]
+
+    def test_modified_bnode_among_siblings(self):
+        patch = check_diff(
+            'ex:a ex:addr [ ex:city "Lyon" ; ex:zip "1" ], '
+            '             [ ex:city "Paris" ; ex:zip "2" ], ex:b .',
+            'ex:a ex:addr [ ex:city "Lyon" ; ex:zip "3" ], '
+            '             [ ex:city "Paris" ; ex:zip "2" ], ex:b .')
+        assert "Cut" not in patch
+
+    def test_nested_bnodes(self):
+        patch = check_diff(
+            'ex:a ex:p [ ex:q [ ex:r 1 ; ex:s 2 ] ; ex:t 3 ] .',
+            'ex:a ex:p [ ex:q [ ex:r 1 ; ex:s 4 ] ; ex:t 3 ] .')
+        eq_(2, patch.count("Bind"))
+
+    def test_removed_bnode(self):
+        patch = check_diff('ex:a ex:p [ ex:q [ ex:r 1 ] ], ex:b .',
+                           'ex:a ex:p ex:b .')
+        eq_(1, patch.count("Cut"))
+
+    def test_added_bnode(self):
+        patch = check_diff('ex:a ex:p ex:b .',
+                           'ex:a ex:p ex:b, [ ex:q [ ex:r ( 1 2 ) ] ] .')
+        assert "Bind" not in patch
+
+    def test_list_edits(self):
+        for old, new in [
+            ("( 1 2 3 4 )", "( 1 5 3 4 )"),
+            ("( 1 2 3 4 )", "( 1 2 3 4 5 6 )"),
+            ("( 1 2 3 4 )", "( 0 1 2 3 4 )"),
+            ("( 1 2 3 4 )", "( 1 4 )"),
+            ("( 1 2 3 4 )", "( )"),
+            ("( )", "( 1 [ ex:p 2 ] )"),
+            ("( 1 [ ex:p 2 ] 3 )", "( 1 [ ex:p 4 ] 3 )"),
+        ]:
+            patch = check_diff('ex:a ex:list %s .' % old,
+                               'ex:a ex:list %s .' % new)
+            assert "UpdateList" in patch, patch
+            assert "Cut" not in patch, patch
+
+    def test_list_in_bnode(self):
+        patch = check_diff('ex:a ex:p [ ex:k 1 ; ex:list ( 1 2 3 ) ] .',
+                           'ex:a ex:p [ ex:k 1 ; ex:list ( 1 3 ) ] .')
+        assert "UpdateList ?b0" in patch
+
+    def test_root_bnodes(self):
+        check_diff('[ ex:id 1 ; ex:v 1 ] . [ ex:id 2 ; ex:v 2 ] . '
+                   '[ ex:id 3 ; ex:v 3 ] .',
+                   '[ ex:id 1 ; ex:v 1 ] . [ ex:id 2 ; ex:v 5 ] . '
+                   '[ ex:id 4 ; ex:v 4 ] .')
+
+    def test_unaddressable(self):
+        with assert_raises(DiffError):
+            diff(_graph('ex:a ex:p [], [] .'), _graph('ex:a ex:p [] .'))
+
+    def test_shared(self):
+        with assert_raises(DiffError):
+            diff(_graph('ex:a ex:p _:x . ex:b ex:p _:x . _:x ex:q 1 .'),
+                 _graph('ex:a ex:p _:x . ex:b ex:p _:x . _:x ex:q 2 .'))
+
+    def test_random(self):
+        rand = Random(42)
+        def make(size):
+            lines = []
+            for i in range(size):
+                line = "ex:r%s ex:p %s" % (i, rand.randrange(5))
+                if rand.random() < 0.5:
+                    line += ' ; ex:addr [ ex:city "c%s" ; ex:n %s ]' % (
+                        rand.randrange(3), i)
+                if rand.random() < 0.5:
+                    line += " ; ex:tags ( %s )" % " ".join(
+                        str(rand.randrange(4)) for _ in range(rand.randrange(5)))
+                lines.append(line + " .")
+            return "\n".join(lines)
+        for _ in range(3):
+            check_diff(make(30), make(30))
+
+
+class TestInverse(object):
+
+    def test_net_changes(self):
+        undo = check_inverse('ex:a ex:p 1 .', 'Add { ex:a ex:p 2 } . '
+                                              'Delete { ex:a ex:p 2 } . '
+                                              'Add { ex:b ex:p 3 } .')
+        assert "Add" not in undo
+
+    def test_ground(self):
+        undo = check_inverse('ex:a ex:p 1, 2 ; ex:q ex:b .',
+                             'Delete { ex:a ex:p 1 ; ex:q ex:b } . '
+                             'Add { ex:a ex:p 3 } .')
+        assert "Bind" not in undo
+
+    def test_cut(self):
+        undo = check_inverse(
+            'ex:a ex:p 1 ; ex:addr [ ex:city "Lyon" ; ex:geo [ ex:lat 45 ] ] .',
+            'Bind ?x ex:a / ex:addr . Cut ?x .')
+        assert "Bind" not in undo
+
+    def test_added_bnodes(self):
+        undo = check_inverse(
+            'ex:a ex:p 1 ; ex:addr [ ex:city "Lyon" ] .',
+            'Add { ex:a ex:addr [ ex:city "Paris" ; ex:geo [ ex:lat 48 ] ] } .')
+        assert "Cut" in undo
+
+    def test_modified_bnode(self):
+        check_inverse(
+            'ex:a ex:addr [ ex:city "Lyon" ; ex:zip "69000" ] .',
+            'Bind ?x ex:a / ex:addr . '
+            'Delete { ?x ex:city "Lyon" } . '
+            'Add { ?x ex:city "Paris" ; ex:geo [ ex:lat 48 ] } .')
+
+    def test_updatelist(self):
+        data = 'ex:a ex:l ( 1 [ ex:p 2 ] 3 [ ex:q [ ex:r 4 ] ] 5 ) .'
+        for patch in [
+                'UpdateList ex:a ex:l 1..2 ( "x" ) .',
+                'UpdateList ex:a ex:l 1..4 ( ) .',
+                'UpdateList ex:a ex:l 0..0 ( [ ex:p 0 ] ) .',
+                'UpdateList ex:a ex:l .. ( 6 [ ex:p 7 ] ) .',
+                'UpdateList ex:a ex:l 0.. ( ) .',
+                'UpdateList ex:a ex:l 3..4 ( 3 ) . '
+                'UpdateList ex:a ex:l 1..2 ( ( 8 ) ) .',
+                ]:
+            yield check_inverse, data, patch
+
+    def test_updatelist_in_bnode(self):
+        check_inverse('ex:a ex:b [ ex:l ( 1 2 3 ) ] .',
+                      'Bind ?b ex:a / ex:b . UpdateList ?b ex:l 1..2 ( ) .')
+
+    def test_not_invertible(self):
+        graph = _graph('ex:s ex:p [ ex:q 1 ] .')
+        with assert_raises(InverseError) as ctx:
+            apply(PREFIX + 'Add { ex:s ex:p [ ex:q 1 ] } .', graph, EX[''],
+                  inverse=True)
+        eq_(4, len(graph)) # the patch was applied
+        eq_(2, len(ctx.exception.changeset.added))
+        assert "applied" in str(ctx.exception)
+
+    def test_changeset(self):
+        graph = _graph('ex:a ex:p 1 .')
+        changeset = Changeset()
+        apply(PREFIX + 'Add { ex:a ex:p 2 } .', graph, EX[''],
+              changeset=changeset)
+        undo = inverse(changeset, graph)
+        apply(undo, graph, EX[''])
+        assert isomorphic(graph, _graph('ex:a ex:p 1 .'))
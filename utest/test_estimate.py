@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import eq_
+from rdflib import Graph, Literal, Namespace, RDF
+
+from ldpatch.estimate import estimate, GraphStatistics
+
+EX = Namespace("http://ex.co/")
+
+DATA = """
+@prefix : <http://ex.co/> .
+:a :p :b1, :b2, :b3, :b4 ; :l (1 2 3 4 5 6) .
+:c :p :b1 ; :l (1 2) .
+:b1 :q "x" .
+:b2 :q "x" .
+:b3 :q "x" .
+:b4 :q "x" .
+:d :r [ :s [ :t 1 ] ] .
+"""
+
+class TestEstimate(object):
+
+    def setUp(self):
+        self.g = Graph()
+        self.g.parse(data=DATA, format="turtle")
+        self.stats = GraphStatistics(self.g)
+
+    def test_statistics(self):
+        eq_(len(self.g), self.stats.size)
+        eq_(2.5, self.stats.fanout[EX.p])
+        eq_(1.25, self.stats.fanin[EX.p])
+        eq_(4.0, self.stats.fanin[EX.q])
+        eq_(4.0, self.stats.list_length)
+
+    def test_bind(self):
+        est = estimate("Bind ?x <a>/<p>/<q> .", self.stats, EX[''])
+        eq_(1, len(est.statements))
+        eq_([2.5, 2.5], est.statements[0].frontiers)
+        eq_(2.5 + 2.5, est.cost)
+        eq_([], est.warnings)
+
+    def test_graph(self):
+        est = estimate("Bind ?x <a>/<p> .", self.g, EX[''])
+        eq_(2.5, est.cost)
+
+    def test_add(self):
+        est = estimate("Add { <a> <b> <c>, <d> } . AddNew { <a> <b> <e> } .",
+                       self.stats, EX[''])
+        eq_([2, 2], [ i.cost for i in est.statements ])
+
+    def test_hot_leading_inverse(self):
+        est = estimate('Bind ?x "x"/^<q> .', self.stats, EX[''], hot_fanout=2)
+        eq_(1, len(est.warnings))
+        eq_(0, est.warnings[0].index)
+        assert "leading inverse" in est.warnings[0].message
+
+    def test_large_index(self):
+        est = estimate('Bind ?x <a>/<l>/5000 .', self.stats, EX[''])
+        eq_(1, len(est.warnings))
+
+    def test_updatelist_large_index(self):
+        est = estimate('UpdateList <a> <l> 2000..2001 () .',
+                       self.stats, EX[''])
+        eq_(1, len(est.warnings))
+
+    def test_updatelist_append(self):
+        est = estimate('UpdateList <a> <l> .. (7) .', self.stats, EX[''])
+        eq_(4 + 2, est.cost)
+
+    def test_cut(self):
+        est = estimate('Bind ?x <d>/<r> . Cut ?x .', self.stats, EX[''])
+        assert est.statements[1].cost > 0
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+import json
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+
+from ldpatch import apply
+from ldpatch.explain import Explanation
+from ldpatch.processor import NoUniqueMatchError
+
+EX = Namespace("http://ex.co/")
+
+DATA = """@prefix ex: <http://ex.co/> .
+ex:a ex:p ex:b, ex:c, ex:d ; ex:l ( 1 [ ex:q 2 ] 3 4 ) .
+ex:b ex:name "b" .
+ex:c ex:name "c" .
+"""
+
+
+class TestExplain(object):
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.parse(data=DATA, format="turtle")
+
+    def explain(self, patch):
+        return apply("@prefix ex: <http://ex.co/> .\n" + patch, self.graph,
+                     EX[""], explain=True)
+
+    def test_bind(self):
+        tree = self.explain(
+            'Bind ?x ex:a / ex:p [ / ex:name ] [ / ex:name = "c" ] ! .').tree()
+        eq_(2, len(tree))
+        bind = tree[1]
+        eq_('Bind ?x <http://ex.co/a> / <http://ex.co/p> '
+            '[ / <http://ex.co/name> ] [ / <http://ex.co/name> = "c" ] !',
+            bind["statement"])
+        eq_([("/ <http://ex.co/p>", 1, 3, None),
+             ("[ / <http://ex.co/name> ]", 3, 2, 1),
+             ('[ / <http://ex.co/name> = "c" ]', 2, 1, 1),
+             ("!", 1, 1, None)],
+            [ (step["step"], step["in"], step["out"], step.get("pruned"))
+              for step in bind["steps"] ])
+        json.dumps(tree)
+
+    def test_updatelist(self):
+        tree = self.explain('UpdateList ex:a ex:l 1..3 ( 5 ) . '
+                            'UpdateList ex:a ex:l -1.. ( ) . '
+                            'UpdateList ex:a ex:l .. ( 6 ) .').tree()
+        eq_([(1, 2), (3 + 2, 1), (2, 0)],
+            [ (node["cells_walked"], node["cells_removed"])
+              for node in tree[1:] ])
+        eq_("UpdateList <http://ex.co/a> <http://ex.co/l> -1..",
+            tree[2]["statement"])
+
+    def test_add_delete(self):
+        tree = self.explain('AddNew { ex:e ex:p 1, 2 } . '
+                            'Delete { ex:e ex:p 1 } .').tree()
+        eq_(["AddNew (2 triples)", "Delete (1 triples)"],
+            [ node["statement"] for node in tree[1:] ])
+
+    def test_error(self):
+        explanation = Explanation()
+        with assert_raises(NoUniqueMatchError):
+            apply("@prefix ex: <http://ex.co/> .\n"
+                  "Bind ?x ex:a / ex:p [ / ex:name ] ! .",
+                  self.graph, EX[""], observers=[explanation])
+        bind = explanation.tree()[1]
+        eq_("NoUniqueMatchError", bind["error"])
+        eq_(None, bind["steps"][-1]["out"])
+        assert "error: NoUniqueMatchError" in explanation.text()
+
+    def test_text(self):
+        text = self.explain('Bind ?x ex:a / ex:p [ / ex:name = "c" ] . '
+                            'UpdateList ex:a ex:l 1..2 ( ) .').text()
+        assert "pruned 2" in text
+        assert "cells walked 1, removed 1" in text
+
+    def test_inverse(self):
+        undo, explanation = apply(
+            "@prefix ex: <http://ex.co/> .\nAdd { ex:e ex:p 1 } .",
+            self.graph, EX[""], inverse=True, explain=True)
+        assert "Delete" in undo
+        eq_(2, len(explanation.events))
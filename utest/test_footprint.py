@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, assert_set_equal, eq_
+from rdflib import BNode, Literal, Namespace, RDF, URIRef, Variable as V
+
+from ldpatch.footprint import ANY, footprint, Footprint
+from ldpatch.processor import UndefinedPrefixError
+
+EX = Namespace("http://ex.co/")
+
+PROLOGUE = """
+@prefix ex: <http://ex.co/> .
+@prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
+"""
+
+def F(patch):
+    return footprint(PROLOGUE + patch, EX[''])
+
+class TestFootprint(object):
+
+    def test_empty(self):
+        fp = F("")
+        eq_(set(), fp.reads)
+        eq_(set(), fp.writes)
+
+    def test_add(self):
+        fp = F("Add { ex:a ex:b ex:c ; ex:d _:x . _:x ex:e 42 } .")
+        assert_set_equal(set(), fp.reads)
+        assert_set_equal({(EX.a, EX.b), (EX.a, EX.d), (ANY, EX.e)}, fp.writes)
+        eq_(3, len(fp.added))
+        eq_([], fp.deleted)
+
+    def test_addnew_reads(self):
+        fp = F("AddNew { ex:a ex:b ex:c } .")
+        assert_set_equal({(EX.a, EX.b)}, fp.reads)
+        assert_set_equal({(EX.a, EX.b)}, fp.writes)
+
+    def test_delete(self):
+        fp = F("Delete { ex:a ex:b ex:c } .")
+        assert_set_equal(set(), fp.reads)
+        assert_set_equal({(EX.a, EX.b)}, fp.writes)
+        eq_([(EX.a, EX.b, EX.c)], fp.deleted)
+
+    def test_bind_path(self):
+        fp = F("Bind ?x ex:a/ex:b/^ex:c[/ex:d=1]/2 .")
+        assert_set_equal({(EX.a, EX.b), (ANY, EX.c), (ANY, EX.d),
+                          (ANY, RDF.rest), (ANY, RDF.first)},
+                         fp.reads)
+        assert_set_equal(set(), fp.writes)
+
+    def test_bind_constant(self):
+        fp = F("Bind ?x ex:a [/ex:b] . Add { ?x ex:c ex:d } .")
+        assert_set_equal({(EX.a, EX.b)}, fp.reads)
+        assert_set_equal({(EX.a, EX.c)}, fp.writes)
+        eq_([(EX.a, EX.c, EX.d)], fp.added)
+
+    def test_bind_unknown(self):
+        fp = F("Bind ?x ex:a/ex:b . Add { ?x ex:c ex:d } .")
+        assert_set_equal({(ANY, EX.c)}, fp.writes)
+        eq_([(V("x"), EX.c, EX.d)], fp.added)
+
+    def test_init_var(self):
+        fp = footprint("Delete { ?x <c> <d> } .", EX[''],
+                       init_var={V("x"): EX.a})
+        assert_set_equal({(EX.a, EX.c)}, fp.writes)
+
+    def test_cut(self):
+        fp = F("Bind ?x ex:a/ex:b . Cut ?x .")
+        assert (ANY, ANY) in fp.writes
+
+    def test_updatelist_insert(self):
+        fp = F("UpdateList ex:a ex:b .. ( 1 2 ) .")
+        assert_set_equal({(EX.a, EX.b), (ANY, RDF.first), (ANY, RDF.rest)},
+                         fp.writes)
+        eq_({(EX.a, EX.b)}, fp.lists)
+        eq_(4, len(fp.added))
+
+    def test_updatelist_bnode_item(self):
+        fp = F("UpdateList ex:a ex:b 0..0 ( [ ex:p 1 ] ) .")
+        assert (ANY, EX.p) in fp.writes
+        assert fp.may_affect(predicate=EX.p)
+        assert fp.conflicts_with(F("Bind ?x 1 / ^ex:p ."))
+
+    def test_updatelist_remove(self):
+        fp = F("UpdateList ex:a ex:b 1..2 () .")
+        assert (ANY, ANY) in fp.writes
+
+    def test_undefined_prefix(self):
+        with assert_raises(UndefinedPrefixError):
+            footprint("Add { foo:a foo:b foo:c } .", EX[''])
+
+    def test_conflicts(self):
+        add_ab = F("Add { ex:a ex:b ex:c } .")
+        add_cb = F("Add { ex:c ex:b ex:c } .")
+        bind_b = F("Bind ?x ex:d/ex:e/ex:b .")
+        bind_e = F("Bind ?x ex:d/ex:e .")
+        cut = F("Bind ?x ex:d/ex:e . Cut ?x .")
+        assert not add_ab.conflicts_with(add_cb)
+        assert add_ab.conflicts_with(add_ab)
+        assert add_ab.conflicts_with(bind_b)
+        assert bind_b.conflicts_with(add_cb)
+        assert not add_ab.conflicts_with(bind_e)
+        assert not bind_b.conflicts_with(bind_e)
+        assert cut.conflicts_with(add_ab)
+
+    def test_may_affect(self):
+        fp = F("Add { ex:a ex:b ex:c } .")
+        assert fp.may_affect(EX.a, EX.b)
+        assert fp.may_affect(EX.a)
+        assert fp.may_affect(predicate=EX.b)
+        assert not fp.may_affect(EX.a, EX.c)
+        assert not fp.may_affect(EX.b)
+
+    def test_subjects_predicates(self):
+        fp = F("Bind ?x ex:a/ex:b . Add { ?x ex:c ex:d } .")
+        eq_({EX.a}, fp.subjects)
+        eq_({EX.b, EX.c}, fp.predicates)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+import json
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Literal, Namespace, XSD
+from rdflib.compare import isomorphic
+
+from ldpatch import apply
+from ldpatch.processor import AddNewError
+from ldpatch.syntax import ParserError
+
+EX = Namespace("http://ex.co/")
+
+DATA = """
+@prefix ex: <http://ex.co/> .
+ex:a ex:knows ex:b, ex:c ;
+     ex:list (1 2 3) .
+ex:b ex:name "Bob" ; ex:age 42 .
+ex:c ex:name "Carol" ; ex:addr [ ex:city "Lyon" ] .
+"""
+
+TEXT_PATCH = """
+@prefix ex: <http://ex.co/> .
+Bind ?b ex:a / ex:knows [ / ex:name = "Bob" ] ! .
+Bind ?addr ex:a / ex:knows [ / ex:name = "Carol" ] / ex:addr .
+Add { ?b ex:nick "bobby"@en ; ex:score 1.5, true ;
+         ex:tags ( "a" "b" ) ; ex:born "1970"^^ex:year } .
+Delete { ?b ex:age 42 } .
+Cut ?addr .
+UpdateList ex:a ex:list 1..2 ( 4 5 ) .
+"""
+
+JSON_PATCH = [
+    {"op": "Prefix", "prefix": "ex", "iri": "http://ex.co/"},
+    {"op": "Bind", "var": "b", "value": "ex:a",
+     "path": ["ex:knows", {"path": ["ex:name"], "value": {"@value": "Bob"}},
+              "!"]},
+    {"op": "Bind", "var": "addr", "value": "ex:a",
+     "path": ["ex:knows", {"path": ["ex:name"], "value": {"@value": "Carol"}},
+              "ex:addr"]},
+    {"op": "Add", "triples": [
+        ["?b", "ex:nick", {"@value": "bobby", "@language": "en"}],
+        ["?b", "ex:score", 1.5],
+        ["?b", "ex:score", True],
+        ["?b", "ex:tags", {"@list": [{"@value": "a"}, {"@value": "b"}]}],
+        ["?b", "ex:born", {"@value": "1970", "@type": "ex:year"}],
+    ]},
+    {"op": "Delete", "triples": [["?b", "ex:age", 42]]},
+    {"op": "Cut", "var": "addr"},
+    {"op": "UpdateList", "subject": "ex:a", "predicate": "ex:list",
+     "slice": [1, 2], "list": [4, 5]},
+]
+
+
+def _graph():
+    g = Graph()
+    g.parse(data=DATA, format="turtle")
+    return g
+
+class TestJsonSyntax(object):
+
+    def test_same_as_text(self):
+        g1 = _graph()
+        apply(TEXT_PATCH, g1, EX[''])
+        g2 = _graph()
+        apply(json.dumps(JSON_PATCH), g2, EX[''], syntax="json")
+        assert isomorphic(g1, g2)
+
+    def test_numbers(self):
+        g = Graph()
+        apply('[{"op": "Add", "triples": [["<a>", "<b>", 1], ["<a>", "<b>", '
+              '1.50], ["<a>", "<b>", 2e1], ["<a>", "<b>", 0.0000001], '
+              '["<a>", "<b>", -1.5E-3]]}]', g, EX[''], syntax="json")
+        eq_(set([Literal("1", datatype=XSD.integer),
+                 Literal("1.50", datatype=XSD.decimal),
+                 Literal("2e1", datatype=XSD.double),
+                 Literal("0.0000001", datatype=XSD.decimal),
+                 Literal("-1.5E-3", datatype=XSD.double)]),
+            set(g.objects()))
+
+    def test_relative_iri_and_inverse(self):
+        g = _graph()
+        patch = [
+            {"op": "Bind", "var": "x", "value": "<b>", "path": ["^<knows>"]},
+            {"op": "Add", "triples": [["?x", "<p>", "_:n"],
+                                      ["_:n", "<q>", "<c>"]]},
+        ]
+        apply(json.dumps(patch), g, EX[''], syntax="json")
+        node = g.value(EX.a, EX.p)
+        eq_(EX.c, g.value(node, EX.q))
+
+    def test_index_and_append(self):
+        g = _graph()
+        patch = [
+            {"op": "Bind", "var": "x", "value": "<a>",
+             "path": ["<list>", 2]},
+            {"op": "UpdateList", "subject": "<a>", "predicate": "<list>",
+             "slice": [None, None], "list": ["?x"]},
+        ]
+        apply(json.dumps(patch), g, EX[''], syntax="json")
+        items = list(g.items(g.value(EX.a, EX.list)))
+        eq_([Literal(i) for i in (1, 2, 3, 3)], items)
+
+    def test_addnew(self):
+        patch = [{"op": "AddNew", "triples": [["<a>", "<knows>", "<b>"]]}]
+        with assert_raises(AddNewError):
+            apply(json.dumps(patch), _graph(), EX[''], syntax="json")
+
+    def test_errors(self):
+        for patch in [
+            '[{"op": "Add"',
+            '{"op": "Add", "triples": []}',
+            '[{"op": "Frobnicate"}]',
+            '[{"op": "Add", "triples": [["<a>", "<b>"]]}]',
+            '[{"op": "Add", "triples": [["<a>", "<b>", "c"]]}]',
+            '[{"op": "Add", "triples": [["<a>", "<b>", [1]]]}]',
+            '[{"op": "Bind", "value": "<a>"}]',
+            '[{"op": "UpdateList", "subject": "<a>", "predicate": "<list>", '
+            '"slice": [1], "list": []}]',
+        ]:
+            g = _graph()
+            with assert_raises(ParserError):
+                apply(patch, g, EX[''], syntax="json")
+            eq_(len(_graph()), len(g))
+
+    def test_strict(self):
+        from ldpatch.jsonsyntax import JsonParser
+        from ldpatch.processor import PatchProcessor
+        parser = JsonParser(PatchProcessor(Graph()), EX[''], strict=True)
+        with assert_raises(ParserError):
+            parser.parseString('[{"op": "Add", "triples": []}]')
+        with assert_raises(ParserError):
+            parser.parseString(
+                '[{"op": "Bind", "var": "x", "value": "<a>"}, '
+                '{"op": "Prefix", "prefix": "ex", "iri": "http://ex.co/"}]')
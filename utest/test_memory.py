@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.plugins.skip import SkipTest
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+
+try:
+    import tracemalloc
+    from ldpatch.memory import MemoryProfile
+except ImportError:
+    raise SkipTest("tracemalloc is not available")
+from ldpatch import apply
+from ldpatch.processor import NoUniqueMatchError
+
+EX = Namespace("http://ex.co/")
+
+PATCH = """@prefix ex: <http://ex.co/> .
+Add { %s } .
+Bind ?x ex:n0 .
+Delete { ?x ex:label "0" } .
+""" % " ".join('ex:n%s ex:label "%s" .' % (i, i) for i in range(1000))
+
+
+class TestMemoryProfile(object):
+
+    def test_phases(self):
+        profile = MemoryProfile()
+        graph = Graph()
+        apply(PATCH, graph, EX[""], observers=[profile])
+        eq_([ event.statement for event, _, _ in profile.statements ],
+            ["prefix", "add", "bind", "delete"])
+        add = profile.statements[1]
+        assert add[2] > 0 # the triples were added to the store
+        assert add[1] >= add[2]
+        assert profile.parsing[0] > 0
+        eq_(profile.by_statement()["add"], (1, add[1], add[2]))
+        eq_(profile.peak, max([profile.parsing[0]] + [
+            peak for _, peak, _ in profile.statements ]))
+        assert not tracemalloc.is_tracing()
+
+    def test_already_tracing(self):
+        tracemalloc.start()
+        try:
+            apply(PATCH, Graph(), EX[""], observers=[MemoryProfile()])
+            assert tracemalloc.is_tracing()
+        finally:
+            tracemalloc.stop()
+
+    def test_error(self):
+        profile = MemoryProfile()
+        with assert_raises(NoUniqueMatchError):
+            apply("Bind ?x <http://ex.co/a> / <http://ex.co/p> .", Graph(),
+                  EX[""], observers=[profile])
+        eq_(len(profile.statements), 1)
+        assert not tracemalloc.is_tracing()
+
+    def test_report(self):
+        profile = MemoryProfile(top_lines=3)
+        apply(PATCH, Graph(), EX[""], observers=[profile])
+        eq_(len(profile.top), len(profile.statements))
+        assert all(len(stats) <= 3 for stats in profile.top)
+        report = profile.report()
+        for phase in ("parsing", "add", "bind", "delete", "total"):
+            assert "\n%s " % phase in "\n" + report, phase
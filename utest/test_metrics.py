@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+
+from ldpatch import apply, iterapply
+from ldpatch.metrics import BUCKETS, METRICS, Histogram
+from ldpatch.processor import NoUniqueMatchError
+from ldpatch.syntax import ParserError
+
+EX = Namespace("http://ex.co/")
+
+DATA = """@prefix ex: <http://ex.co/> .
+ex:a ex:p ex:b ; ex:l ( 1 [ ex:q 2 ] 3 ) .
+"""
+
+PATCH = """@prefix ex: <http://ex.co/> .
+Bind ?x ex:a / ex:p .
+Add { ?x ex:q 1, 2 } .
+Delete { ?x ex:q 1 } .
+UpdateList ex:a ex:l 1..2 ( 4 5 ) .
+"""
+
+
+class TestMetrics(object):
+
+    def setUp(self):
+        METRICS.reset()
+        self.graph = Graph()
+        self.graph.parse(data=DATA, format="turtle")
+
+    def test_apply(self):
+        apply(PATCH, self.graph, EX[""])
+        snapshot = METRICS.snapshot()
+        eq_({"success": 1, "error": 0}, snapshot["patches"])
+        eq_({"prefix": 1, "bind": 1, "add": 1, "delete": 1, "cut": 0,
+             "updatelist": 1}, snapshot["statements"])
+        # Add, then UpdateList: 2 new cells (4 triples) and 2 links
+        eq_(2 + 4 + 2, snapshot["triples"]["added"])
+        # Delete, then UpdateList: 1 cell (2 triples), 2 links,
+        # and the cut bnode item (its arc, and its rdf:first arc again)
+        eq_(1 + 2 + 2 + 2, snapshot["triples"]["removed"])
+        assert snapshot["store_calls"]["triples"] > 0
+        assert snapshot["store_calls"]["value"] > 0
+        eq_({}, snapshot["errors"])
+        eq_(1, snapshot["parse_seconds"]["count"])
+        eq_(1, snapshot["execute_seconds"]["count"])
+
+    def test_errors(self):
+        with assert_raises(NoUniqueMatchError):
+            apply(PATCH.replace("ex:p", "ex:nope"), self.graph, EX[""])
+        with assert_raises(ParserError):
+            apply("Bind ?x", self.graph, EX[""])
+        with assert_raises(ParserError):
+            for _ in iterapply("Bind ?x", self.graph, EX[""]):
+                pass
+        snapshot = METRICS.snapshot()
+        eq_({"success": 0, "error": 3}, snapshot["patches"])
+        eq_({("NoUniqueMatchError", 422): 1, ("ParserError", 400): 2},
+            snapshot["errors"])
+        eq_(2, snapshot["execute_seconds"]["count"])
+
+    def test_iterapply(self):
+        for _ in iterapply(PATCH, self.graph, EX[""]):
+            pass
+        snapshot = METRICS.snapshot()
+        eq_({"success": 1, "error": 0}, snapshot["patches"])
+        eq_(1, snapshot["statements"]["updatelist"])
+
+    def test_prometheus(self):
+        apply(PATCH, self.graph, EX[""])
+        with assert_raises(NoUniqueMatchError):
+            apply(PATCH.replace("ex:p", "ex:nope"), self.graph, EX[""])
+        text = METRICS.prometheus()
+        assert '\nldpatch_patches_total{outcome="success"} 1\n' in text
+        # only successful statements are counted
+        assert '\nldpatch_statements_total{statement="bind"} 1\n' in text
+        assert 'ldpatch_errors_total{error="NoUniqueMatchError",' \
+               'status_code="422"} 1\n' in text
+        assert '\nldpatch_parse_seconds_bucket{le="+Inf"} 2\n' in text
+        assert "# TYPE ldpatch_execute_seconds histogram\n" in text
+        assert text.endswith("\n")
+
+    def test_histogram(self):
+        histogram = Histogram()
+        histogram.observe(0.002)
+        histogram.observe(20)
+        snapshot = histogram.snapshot()
+        eq_(0, snapshot["buckets"][BUCKETS[0]])
+        eq_(1, snapshot["buckets"][BUCKETS[1]])
+        eq_(1, snapshot["buckets"][BUCKETS[-1]])
+        eq_(2, snapshot["count"])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+
+from ldpatch import apply, iterapply
+from ldpatch.observer import Observer, Profile
+from ldpatch.processor import NoUniqueMatchError, PatchProcessor
+
+EX = Namespace("http://ex.co/")
+
+DATA = """@prefix ex: <http://ex.co/> .
+ex:a ex:p ex:b, ex:c ; ex:l ( 1 [ ex:q 2 ] 3 ) .
+ex:b ex:name "b" .
+ex:c ex:name "c" .
+"""
+
+PATCH = """@prefix ex: <http://ex.co/> .
+Bind ?x ex:a / ex:p [ / ex:name = "c" ] .
+Add { ?x ex:name "C" ; ex:r [ ex:s 1 ] } .
+Delete { ?x ex:name "c" } .
+UpdateList ex:a ex:l 1..2 ( 4 5 ) .
+"""
+
+
+class Recorder(Observer):
+
+    def __init__(self):
+        self.calls = []
+
+    def patch_started(self):
+        self.calls.append("patch_started")
+
+    def patch_ended(self, error=None):
+        self.calls.append(("patch_ended", error.__class__.__name__
+                           if error else None))
+
+    def statement_started(self, event):
+        self.calls.append(("started", event.statement))
+
+    def statement_ended(self, event):
+        self.calls.append(("ended", event.statement))
+
+
+class TestObserver(object):
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.parse(data=DATA, format="turtle")
+
+    def test_events(self):
+        recorder = Recorder()
+        apply(PATCH, self.graph, EX[""], observers=[recorder])
+        eq_(["patch_started",
+             ("started", "prefix"), ("ended", "prefix"),
+             ("started", "bind"), ("ended", "bind"),
+             ("started", "add"), ("ended", "add"),
+             ("started", "delete"), ("ended", "delete"),
+             # no nested events for the add and cut inside updatelist
+             ("started", "updatelist"), ("ended", "updatelist"),
+             ("patch_ended", None)],
+            recorder.calls)
+
+    def test_error(self):
+        recorder = Recorder()
+        profile = Profile()
+        with assert_raises(NoUniqueMatchError):
+            apply(PATCH.replace('"c"', '"d"', 1), self.graph, EX[""],
+                  observers=[recorder, profile])
+        eq_(("patch_ended", "NoUniqueMatchError"), recorder.calls[-1])
+        assert isinstance(profile.events[-1].error, NoUniqueMatchError)
+        assert profile.duration is not None
+
+    def test_profile(self):
+        profile = Profile()
+        apply(PATCH, self.graph, EX[""], observers=[profile])
+        eq_(["prefix", "bind", "add", "delete", "updatelist"],
+            [ event.statement for event in profile.events ])
+        bind = profile.events[1]
+        eq_([2, 1], bind.frontiers)
+        assert bind.visited > 0
+        eq_(3, profile.events[2].modified)
+        eq_(1, profile.events[3].modified)
+        # the removed cell, its bnode item, the new cells
+        assert profile.events[4].modified > 4
+        eq_((1, profile.events[2].duration, 0, 3),
+            profile.by_statement()["add"])
+        assert profile.duration >= profile.executing
+        assert profile.parsing >= 0
+        report = profile.report()
+        assert "parsing" in report
+        assert "frontiers: 2 1" in report
+
+    def test_iterapply(self):
+        profile = Profile()
+        for _ in iterapply(PATCH, self.graph, EX[""], observers=[profile]):
+            pass
+        eq_(5, len(profile.events))
+        eq_(None, profile.duration)
+
+    def test_no_observers(self):
+        processor = PatchProcessor(self.graph)
+        # statements are not wrapped
+        eq_(PatchProcessor.add.__func__, processor.add.__func__)
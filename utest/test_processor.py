@@ -421,6 +421,23 @@ class TestPatchProcessor(object):
         got = self.g
         assert isomorphic(got, exp), got.serialize(format="turtle")
 
+    def test_updatelist_value_calls(self):
+        calls = []
+        value = self.g.value
+        def counting_value(*args, **kw):
+            calls.append(args)
+            return value(*args, **kw)
+        self.g.value = counting_value
+        graph_lst = Graph()
+        items = [ BNode(), BNode() ]
+        for item in items:
+            for i in range(3):
+                graph_lst.add((item, VOCAB.p, Literal(i)))
+        lst = BNode()
+        Collection(graph_lst, lst, items)
+        self.e.updatelist(graph_lst, PA, VOCAB.prefLang, Slice(1, 2), lst)
+        eq_(len(calls), self.e.value_calls)
+
     def test_updatelist_item_with_several(self):
         self._my_updatelist(PA, VOCAB.prefLang, Slice(1, 2), [ Literal("en-US"), Literal("en-GB") ])
         exp = G(INITIAL.replace("""( "fr" "en" "tlh" )""",
@@ -685,3 +702,92 @@ class TestPatchProcessor(object):
         exp = self.g.value(None, FOAF.accountName, Literal("bertails"))
         eq_(exp, self.e.get_node(Variable("ab")))
 
+
+
+class TestBudget(object):
+    def setUp(self):
+        self.g = G(INITIAL)
+
+    def tearDown(self):
+        self.g = None
+
+    def _processor(self, **kw):
+        return PatchProcessor(self.g, {"foaf": IRI(FOAF), "vocab": IRI(VOCAB)},
+                              budget=Budget(**kw))
+
+    def test_no_budget_counts(self):
+        e = PatchProcessor(self.g)
+        eq_(2, len(e.do_path_step({PA}, FOAF.knows)))
+        eq_(2, e.visited)
+        e.add(G([(PA, RDF.type, FOAF.Person)]))
+        eq_(1, e.modified)
+
+    def test_frontier(self):
+        e = self._processor(max_frontier=1)
+        with assert_raises(FrontierBudgetError):
+            e.bind(V("x"), PA, [FOAF.knows, FOAF.name])
+
+    def test_frontier_ok(self):
+        e = self._processor(max_frontier=2)
+        e.bind(V("x"), PA, [InvIRI(FOAF.member)])
+
+    def test_visited(self):
+        e = self._processor(max_visited=3)
+        with assert_raises(VisitedBudgetError):
+            e.bind(V("x"), PA, [FOAF.knows, FOAF.name])
+
+    def test_frontier_stops_early(self):
+        g = G([])
+        for i in range(100):
+            for j in range(10):
+                g.add((VOCAB["n%s" % i], VOCAB.p, VOCAB["m%s_%s" % (i, j)]))
+        e = PatchProcessor(g, budget=Budget(max_frontier=5))
+        with assert_raises(FrontierBudgetError):
+            e.do_path_step({ VOCAB["n%s" % i] for i in range(100) }, VOCAB.p)
+        # only the triples of the first node were read
+        eq_(10, e.visited)
+        eq_(1, e.triples_calls)
+
+    def test_visited_counts_triples(self):
+        g = G([])
+        for i in range(3):
+            g.add((VOCAB["n%s" % i], VOCAB.p, VOCAB.m))
+        e = PatchProcessor(g)
+        eq_({VOCAB.m}, e.do_path_step({ VOCAB["n%s" % i] for i in range(3) }, VOCAB.p))
+        eq_(3, e.visited)
+
+    def test_modified_add(self):
+        e = self._processor(max_modified=1)
+        with assert_raises(ModifiedBudgetError):
+            e.add(G([(PA, RDF.type, FOAF.Person),
+                     (PA, RDF.type, FOAF.Agent)]))
+        # nothing was added
+        assert (PA, RDF.type, FOAF.Person) not in self.g
+
+    def test_modified_cut(self):
+        e = self._processor(max_modified=2)
+        e.bind(V("x"), PA, [FOAF.knows, PathConstraint([VOCAB.prefLang])])
+        with assert_raises(ModifiedBudgetError):
+            e.cut(V("x"))
+
+    def test_modified_updatelist(self):
+        e = self._processor(max_modified=2)
+        with assert_raises(ModifiedBudgetError):
+            e.updatelist(Graph(), PA, VOCAB.prefLang, Slice(0, None), RDF.nil)
+
+    def test_deadline(self):
+        e = self._processor(timeout=-1)
+        with assert_raises(DeadlineExceededError):
+            e.bind(V("x"), PA)
+
+    def test_cancel(self):
+        e = PatchProcessor(self.g)
+        e.cancel()
+        with assert_raises(PatchCancelledError):
+            e.bind(V("x"), PA, [FOAF.knows])
+
+    def test_status_codes(self):
+        eq_(422, FrontierBudgetError(2, 1).statusCode)
+        eq_(422, VisitedBudgetError(2, 1).statusCode)
+        eq_(413, ModifiedBudgetError(2, 1).statusCode)
+        eq_(503, DeadlineExceededError(1).statusCode)
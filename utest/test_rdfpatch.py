@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from StringIO import StringIO
+
+from nose.tools import assert_raises, eq_
+from rdflib import BNode, Graph, Literal, Namespace
+
+from ldpatch import apply
+from ldpatch.changeset import TrackingGraph, write_changeset
+from ldpatch.footprint import footprint
+from ldpatch.processor import PatchProcessor
+from ldpatch.syntax import ParserError
+
+EX = Namespace("http://ex.co/")
+
+
+class TestRdfPatch(object):
+
+    def test_add_delete(self):
+        g = Graph()
+        g.add((EX.a, EX.p, Literal("old")))
+        apply(u"""
+        # a comment
+        @prefix ex: <http://ex.co/> .
+        D <http://ex.co/a> <http://ex.co/p> "old" .
+        A ex:a ex:p "new\\n\\"line\\"\\u00e9"@en .
+        A <a> ex:q "1"^^<http://www.w3.org/2001/XMLSchema#integer> .
+        @prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+        A <a> ex:q "2"^^xsd:integer .
+        """, g, EX[''], syntax="rdfpatch")
+        eq_(set([(EX.a, EX.p, Literal(u'new\n"line"\xe9', lang="en")),
+                 (EX.a, EX.q, Literal(1)),
+                 (EX.a, EX.q, Literal(2))]),
+            set(g))
+
+    def test_order(self):
+        g = Graph()
+        apply("A <a> <p> <b> .\nD <a> <p> <b> .\nA <a> <p> <c> .\n",
+              g, EX[''], syntax="rdfpatch")
+        eq_([(EX.a, EX.p, EX.c)], list(g))
+
+    def test_bnodes_are_kept(self):
+        g = Graph()
+        b = BNode("b1")
+        g.add((b, EX.p, Literal("x")))
+        apply("D _:b1 <p> \"x\" .\nA _:b1 <p> \"y\" .\n",
+              g, EX[''], syntax="rdfpatch")
+        eq_([(b, EX.p, Literal("y"))], list(g))
+
+    def test_round_trip(self):
+        primary = Graph()
+        primary.parse(data="""
+            @prefix ex: <http://ex.co/> .
+            ex:a ex:p "v1", "v2" ; ex:q [ ex:r "x y" ] .
+        """, format="turtle")
+        replica = Graph()
+        for triple in primary:
+            replica.add(triple)
+        tracked = TrackingGraph(primary)
+        apply("""
+            @prefix ex: <http://ex.co/> .
+            Bind ?x ex:a / ex:q .
+            Delete { ex:a ex:p "v1" } .
+            Add { ?x ex:s "tab\\there" ; ex:t [ ex:u 42 ] } .
+        """, tracked, EX[''])
+        delta = StringIO()
+        write_changeset(tracked.changeset, delta)
+        apply(delta.getvalue(), replica, EX[''], syntax="rdfpatch")
+        eq_(set(primary), set(replica))
+
+    def test_batches(self):
+        from ldpatch import rdfpatch
+        calls = []
+        class Recorder(object):
+            def add(self, triples, keep_bnodes=False):
+                calls.append(("add", len(triples), keep_bnodes))
+            def delete(self, triples, keep_bnodes=False):
+                calls.append(("delete", len(triples), keep_bnodes))
+        old = rdfpatch.BATCH_SIZE
+        rdfpatch.BATCH_SIZE = 2
+        try:
+            rdfpatch.RdfPatchParser(Recorder(), EX['']).parseString(
+                "".join(
+                    "%s <a> <p> <o%s> .\n" % (op, i)
+                    for i, op in enumerate("AAADDA")))
+        finally:
+            rdfpatch.BATCH_SIZE = old
+        eq_([("add", 2, True), ("add", 1, True), ("delete", 2, True),
+             ("add", 1, True)], calls)
+
+    def test_cache_is_bounded(self):
+        from ldpatch import rdfpatch
+        old = rdfpatch.CACHE_SIZE
+        rdfpatch.CACHE_SIZE = 3
+        try:
+            g = Graph()
+            parser = rdfpatch.RdfPatchParser(PatchProcessor(g), EX[''])
+            for i in range(10):
+                parser.parseString("A _:b <p> <o%s> .\n" % i)
+                assert len(parser._nodes) <= 3
+        finally:
+            rdfpatch.CACHE_SIZE = old
+        eq_(set([BNode("b")]), set(g.subjects()))
+
+    def test_footprint(self):
+        fp = footprint("A <a> <p> <b> .\nD _:x <q> <b> .\n", EX[''],
+                       syntax="rdfpatch")
+        eq_(set([(EX.a, EX.p)]), set(key for key in fp.writes
+                                     if key[1] == EX.p))
+        eq_(2, len(fp.writes))
+
+    def test_errors(self):
+        for patch in [
+            "A <a> <p> .\n",
+            "A <a> <p> <b>\n",
+            "X <a> <p> <b> .\n",
+            "A <a> <p> \"b .\n",
+            "A <a> <p> \"b\"^^ .\n",
+            "A <a> <p> \"b\\q\" .\n",
+            "A <a> <p> b .\n",
+        ]:
+            with assert_raises(ParserError):
+                apply(patch, Graph(), EX[''], syntax="rdfpatch")
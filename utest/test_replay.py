@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os import listdir
+from os.path import abspath, dirname, join
+sys.path.append(dirname(dirname(__file__)))
+
+from StringIO import StringIO
+
+from nose.tools import eq_
+from rdflib import Graph, Literal, Namespace
+
+from ldpatch.replay import Capture, CapturedRequest, ReplayReport, \
+    read_capture, replay
+
+EX = Namespace("http://ex.co/")
+
+PATCH = """@prefix ex: <http://ex.co/> .
+Bind ?x ex:a / ex:p .
+Add { ?x ex:q "é" } .
+"""
+
+SNAPSHOTS = {
+    "one": [(EX.a, EX.p, EX.b)],
+    "two": [(EX.a, EX.p, EX.b), (EX.a, EX.p, EX.c)],
+}
+
+def get_graph(snapshot):
+    ret = Graph()
+    for triple in SNAPSHOTS.get(snapshot, ()):
+        ret.add(triple)
+    return ret
+
+
+class TestCapture(object):
+
+    def test_round_trip(self):
+        out = StringIO()
+        capture = Capture(out)
+        capture.record(PATCH, EX[""], "one")
+        capture.record(u"", EX[""], syntax="json")
+        requests = list(read_capture(StringIO(out.getvalue())))
+        eq_(2, len(requests))
+        eq_(PATCH.decode("utf8"), requests[0].patch)
+        eq_(unicode(EX[""]), requests[0].baseiri)
+        eq_("one", requests[0].snapshot)
+        eq_("default", requests[0].syntax)
+        eq_("json", requests[1].syntax)
+        eq_(None, requests[1].snapshot)
+
+    def test_apply(self):
+        out = StringIO()
+        graph = get_graph("one")
+        Capture(out).apply(StringIO(PATCH), graph, EX[""], "one")
+        assert (EX.b, EX.q, Literal(u"é")) in graph
+        eq_(1, len(list(read_capture(StringIO(out.getvalue())))))
+
+
+class TestReplay(object):
+
+    def test_replay(self):
+        requests = [ CapturedRequest(PATCH, EX[""], "default", snapshot, None)
+                     for snapshot in ("one", "two", "one", "three") ] * 5
+        report = replay(requests, get_graph, concurrency=3)
+        eq_(20, report.count)
+        eq_(20, len(report.latencies))
+        eq_({"NoUniqueMatchError": 10}, report.errors)
+        assert report.throughput > 0
+        assert report.percentile(50) <= report.percentile(99)
+
+    def test_replay_examples_concurrently(self):
+        examples = join(dirname(dirname(abspath(__file__))), "examples")
+        requests = []
+        for filename in sorted(listdir(examples)):
+            if filename.endswith(".ldpatch"):
+                with open(join(examples, filename)) as infile:
+                    requests.append(CapturedRequest(
+                        infile.read(), "file://" + join(examples, filename),
+                        "default", "persons", None))
+        with open(join(examples, "persons.ttl")) as infile:
+            persons = infile.read()
+        def get_persons(_):
+            return Graph().parse(data=persons, format="turtle")
+        report = replay(requests * 40, get_persons, concurrency=8)
+        eq_(40 * len(requests), report.count)
+        assert set(report.errors) <= {"NoUniqueMatchError"}, report.errors
+
+    def test_get_graph_error(self):
+        def get_graph_or_fail(snapshot):
+            if snapshot is None:
+                raise KeyError(snapshot)
+            return get_graph(snapshot)
+        requests = [ CapturedRequest(PATCH, EX[""], "default", snapshot, None)
+                     for snapshot in ("one", None, "one") ]
+        report = replay(requests, get_graph_or_fail)
+        eq_(3, report.count)
+        eq_(2, len(report.latencies))
+        eq_({"KeyError": 1}, report.errors)
+
+    def test_percentile(self):
+        report = ReplayReport()
+        eq_(0.0, report.percentile(50))
+        report.latencies = [ float(i) for i in range(101) ]
+        eq_(50.0, report.percentile(50))
+        eq_(99.0, report.percentile(99))
+        eq_(100.0, report.percentile(100))
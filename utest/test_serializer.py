@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+import re
+
+from nose.tools import eq_
+from rdflib import Namespace
+
+from ldpatch.footprint import RecordingProcessor
+from ldpatch.serializer import serialize
+from ldpatch.syntax import Parser
+
+EX = Namespace("http://ex.co/")
+
+PATCH = u"""
+@prefix ex: <http://ex.co/> .
+Bind ?x ex:a / ex:b / ^ex:c [ / ex:d / 2 = "d\\n\\"\\u00e9"@fr ] [ / ex:e ] ! .
+Add { ?x ex:f _:b1 . _:b1 ex:g ( 1 [ ex:h 2.5 ] ) } .
+AddNew { ex:a ex:i true } .
+Delete { ?x ex:j "j"^^ex:type } .
+DeleteExisting { ex:a ex:k ex:l } .
+Cut ?x .
+UpdateList ex:a ex:m 1..2 ( 3 [ ex:n ( 4 ) ] [] ) .
+UpdateList ex:a ex:m .. () .
+UpdateList ?x ex:m -2.. ( 5 ) .
+"""
+
+def _normalize(text):
+    return sorted(re.sub(r"_:\w+", "_:", text).split("\n"))
+
+def _record(patch):
+    recorder = RecordingProcessor()
+    Parser(recorder, EX['']).parseString(patch)
+    return recorder.statements
+
+class TestSerializer(object):
+
+    def test_round_trip(self):
+        statements = _record(PATCH)
+        text = serialize(statements)
+        statements2 = _record(text)
+        # blank node labels and the order of triples can change
+        eq_(_normalize(text), _normalize(serialize(statements2)))
+        eq_([ name for name, _, _ in statements if name != "prefix" ],
+            [ name for name, _, _ in statements2 if name != "prefix" ])
+        eq_(1, text.count("@prefix"))
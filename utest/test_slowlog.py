@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname, join
+sys.path.append(dirname(dirname(__file__)))
+
+import json
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from nose.tools import assert_raises, eq_
+from rdflib import Graph, Namespace
+
+from ldpatch import apply
+from ldpatch.processor import NoUniqueMatchError
+from ldpatch.slowlog import SlowPatchLog, install, installed
+
+EX = Namespace("http://ex.co/")
+
+PATCH = u"""@prefix ex: <http://ex.co/> .
+Bind ?x ex:a / ex:p .
+Add { ?x ex:q "é" } .
+"""
+
+
+class TestSlowPatchLog(object):
+
+    def setUp(self):
+        self.graph = Graph()
+        self.graph.add((EX.a, EX.p, EX.b))
+        self.records = []
+
+    def tearDown(self):
+        install(None)
+
+    def test_slow(self):
+        slowlog = SlowPatchLog(0, self.records.append, max_length=20)
+        apply(PATCH, self.graph, EX[""], slowlog=slowlog)
+        eq_(1, len(self.records))
+        record = self.records[0]
+        eq_(EX[""], record["baseiri"])
+        eq_(PATCH[:20] + "...", record["patch"])
+        eq_(len(PATCH), record["patch_length"])
+        eq_(None, record["error"])
+        assert record["duration"] >= record["parsing"]
+        eq_(["prefix", "bind", "add"],
+            [ stmt["statement"].split()[0].lstrip("@").lower()
+              for stmt in record["statements"] ])
+        eq_([(1, 1)], [ (step["in"], step["out"])
+                        for step in record["statements"][1]["steps"] ])
+
+    def test_chunks_not_retained(self):
+        slowlog = SlowPatchLog(0, self.records.append)
+        observer = slowlog.observer(u"", EX[""])
+        patch = "Add { %s } ." % " ".join(
+            "<a> <b> %s ." % i for i in range(30))
+        apply(patch, self.graph, EX[""], observers=[observer], slowlog=slowlog,
+              chunk_size=10)
+        # the last chunk (closing the statement) is empty
+        eq_(4, len(observer.events))
+        assert all(event.args is None and event.kw is None
+                   for event in observer.events)
+        eq_(["Add (10 triples)"] * 3 + ["Add (0 triples)"],
+            [ stmt["statement"] for stmt in self.records[-1]["statements"] ])
+
+    def test_fast(self):
+        slowlog = SlowPatchLog(60, self.records.append)
+        apply(PATCH, self.graph, EX[""], slowlog=slowlog)
+        eq_([], self.records)
+
+    def test_error(self):
+        slowlog = SlowPatchLog(0, self.records.append)
+        with assert_raises(NoUniqueMatchError):
+            apply(PATCH.replace("ex:p", "ex:nope"), self.graph, EX[""],
+                  slowlog=slowlog)
+        eq_("NoUniqueMatchError", self.records[0]["error"])
+
+    def test_install(self):
+        eq_(None, installed())
+        install(SlowPatchLog(0, self.records.append))
+        apply(PATCH, self.graph, EX[""])
+        install(None)
+        apply(PATCH, self.graph, EX[""])
+        eq_(1, len(self.records))
+
+    def test_file(self):
+        tmpdir = mkdtemp()
+        try:
+            filename = join(tmpdir, "slow.log")
+            slowlog = SlowPatchLog(0, filename=filename, max_bytes=3000,
+                                   backup_count=1)
+            for _ in range(10):
+                apply(PATCH, self.graph, EX[""], slowlog=slowlog)
+            slowlog.close()
+            with open(filename) as logfile:
+                lines = logfile.readlines()
+            assert 0 < len(lines) < 10
+            eq_(PATCH, json.loads(lines[0])["patch"])
+            with open(filename + ".1") as logfile:
+                assert logfile.read()
+        finally:
+            rmtree(tmpdir)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+#    This file is part of LD-PATCH-PY
+#    Copyright (C) 2013-2015 Pierre-Antoine Champin <pchampin@liris.cnrs.fr> /
+#    Universite de Lyon <http://www.universite-lyon.fr>
+#
+#    LD-PATCH-PY is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Lesser General Public License as published
+#    by the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    LD-PATCH-PY is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public License
+#    along with LD-PATCH-PY.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import sys
+from os.path import dirname
+sys.path.append(dirname(dirname(__file__)))
+
+from nose.tools import assert_raises, assert_set_equal, eq_
+from rdflib import BNode, Graph, Literal, Namespace, RDF
+from rdflib.collection import Collection
+from rdflib.compare import isomorphic
+
+import ldpatch # registers the SQLite plugin
+from ldpatch.processor import IRI, MalformedListError, PatchProcessor, \
+    Slice
+
+import test_processor
+
+EX = Namespace("http://ex.co/")
+
+def S(data=None):
+    g = Graph(store="SQLite")
+    g.open(":memory:", create=True)
+    if data is not None:
+        g.parse(data=data, format="turtle")
+    return g
+
+class TestSQLiteStore(object):
+
+    def setUp(self):
+        self.g = S(test_processor.INITIAL)
+
+    def test_roundtrip(self):
+        assert isomorphic(self.g, test_processor.G(test_processor.INITIAL))
+
+    def test_terms(self):
+        g = S()
+        triples = [(EX.a, EX.b, Literal("chat", lang="fr")),
+                   (EX.a, EX.b, Literal(u"h\xe9\x00llo")),
+                   (EX.a, EX.b, Literal(42)),
+                   (BNode("x"), EX.b, BNode("y"))]
+        for triple in triples:
+            g.add(triple)
+        assert_set_equal(set(triples), set(g))
+
+    def test_remove_pattern(self):
+        g = S()
+        g.add((EX.a, EX.b, EX.c))
+        g.add((EX.a, EX.b, EX.d))
+        g.add((EX.a, EX.e, EX.d))
+        g.remove((EX.a, EX.b, None))
+        eq_([(EX.a, EX.e, EX.d)], list(g))
+
+    def test_unknown_term(self):
+        eq_([], list(self.g.triples((EX.unknown, None, None))))
+
+    def test_rollback(self):
+        self.g.commit()
+        length = len(self.g)
+        self.g.add((EX.a, EX.b, EX.c))
+        self.g.remove((None, test_processor.FOAF.name, None))
+        self.g.rollback()
+        eq_(length, len(self.g))
+        assert (EX.a, EX.b, EX.c) not in self.g
+
+    def test_persistence(self):
+        from os.path import join
+        from shutil import rmtree
+        from tempfile import mkdtemp
+        tmpdir = mkdtemp()
+        try:
+            path = join(tmpdir, "test.db")
+            g = Graph(store="SQLite")
+            g.open(path, create=True)
+            g.add((EX.a, EX.b, EX.c))
+            g.commit()
+            g.close()
+            g = Graph(store="SQLite")
+            eq_(ldpatch.sqlitestore.NO_STORE,
+                g.open(join(tmpdir, "other.db"), create=False))
+            eq_(ldpatch.sqlitestore.VALID_STORE, g.open(path, create=False))
+            eq_([(EX.a, EX.b, EX.c)], list(g))
+            g.close()
+        finally:
+            rmtree(tmpdir)
+
+    def test_path_step(self):
+        store = self.g.store
+        pa = test_processor.PA
+        knows = test_processor.FOAF.knows
+        friends = store.path_step([pa], knows)
+        eq_(2, len(friends))
+        eq_({pa}, store.path_step(friends, knows, inverse=True))
+        eq_(set(), store.path_step([pa], EX.unknown))
+
+    def test_list_walk(self):
+        store = self.g.store
+        lst = self.g.value(test_processor.PA, test_processor.VOCAB.prefLang)
+        cells = store.list_walk(lst)
+        eq_(4, len(cells))
+        eq_(RDF.nil, cells[-1])
+        eq_(cells[:2], store.list_walk(lst, 1))
+
+    def test_list_walk_malformed(self):
+        g = S()
+        Collection(g, BNode("l"), [Literal(i) for i in range(3)])
+        g.add((BNode("l"), RDF.rest, BNode("other")))
+        eq_([BNode("l")], g.store.list_walk(BNode("l")))
+        g.remove((BNode("l"), RDF.rest, BNode("other")))
+        second = g.value(BNode("l"), RDF.rest)
+        g.remove((second, RDF.rest, None))
+        eq_([BNode("l"), second], g.store.list_walk(BNode("l")))
+
+    def test_cut(self):
+        g = S()
+        g.add((EX.a, EX.b, BNode("x")))
+        g.add((BNode("x"), EX.c, BNode("y")))
+        g.add((BNode("y"), EX.c, BNode("x")))
+        g.add((BNode("y"), EX.d, EX.e))
+        g.add((EX.a, EX.b, EX.c))
+        eq_(4, g.store.cut(BNode("x")))
+        eq_([(EX.a, EX.b, EX.c)], list(g))
+
+
+class TestPatchProcessorSQLite(test_processor.TestPatchProcessor):
+    """Run the processor tests against the SQLite store"""
+
+    def setUp(self):
+        self.g = S(test_processor.INITIAL)
+        self.e = PatchProcessor(self.g, {"foaf": IRI(test_processor.FOAF),
+                                         "vocab": IRI(test_processor.VOCAB)})
+        assert self.e._path_step is not None
+        self.my_friends = { t[2] for t in self.g.triples(
+            (test_processor.PA, test_processor.FOAF.knows, None)) }
+        self.ucbl = self.g.value(None, test_processor.FOAF.member,
+                                 test_processor.PA)
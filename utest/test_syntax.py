@@ -40,6 +40,14 @@ def eqg_(got, expected):
     
 def _s(graph):
     return graph.serialize(format="n3")
+
+def _g(triples):
+    """Convert the list of triples passed by the parser to a Graph"""
+    assert type(triples) is list, triples
+    ret = Graph()
+    for triple in triples:
+        ret.add(triple)
+    return ret
     
 class DummyProcessor(object):
     def __init__(self):
@@ -62,17 +70,18 @@ class DummyProcessor(object):
 
     def add(self, graph, addnew=False):
         self.operations.append(("add" + ("new" if addnew else ""),
-                                graph))
+                                _g(graph)))
 
     def delete(self, graph, delex=False):
         self.operations.append(("delete" + ("existing" if delex else ""),
-                                graph))
+                                _g(graph)))
 
     def cut(self, variable):
         self.operations.append(("cut", variable))
 
     def updatelist(self, graph, subject, predicate, slice, lst):
-        self.operations.append(("updatelist", subject, predicate, slice, lst, graph))
+        self.operations.append(("updatelist", subject, predicate, slice, lst,
+                                _g(graph)))
 
 
 class TestStrictParser(object):